@@ -6,4 +6,19 @@ load_dotenv()
 DB_HOST = os.getenv("DB_HOST")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_NAME = os.getenv("DB_NAME")
\ No newline at end of file
+DB_NAME = os.getenv("DB_NAME")
+# ngram_token_size do MySQL, termos menores não entram no índice full-text
+NGRAM_TOKEN_SIZE = int(os.getenv("NGRAM_TOKEN_SIZE", 2))
+
+# índice das operadoras em memória, a busca não consulta o banco
+OPERATOR_INDEX = os.getenv("OPERATOR_INDEX", "false").lower() == "true"
+OPERATOR_INDEX_POLL = float(os.getenv("OPERATOR_INDEX_POLL", 30))
+OPERATOR_INDEX_REFRESH = float(os.getenv("OPERATOR_INDEX_REFRESH", 86400))
+
+# cache das respostas de /search, SEARCH_CACHE_SIZE = 0 desliga
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 1024))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 300))
+SEARCH_CACHE_POLL = float(os.getenv("SEARCH_CACHE_POLL", 30))
+
+# linhas lidas do banco por vez nos endpoints de exportação
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 5000))
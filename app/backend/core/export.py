@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only the arrow and parquet exports need it
+    pa = None
+    pq = None
+
+# media type and file extension of each export format
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def supported(fmt: str) -> bool:
+    """
+    Whether a format can be exported with the installed libraries
+
+    Args:
+        fmt (str): format
+
+    Returns:
+        bool: True for a known format whose dependencies are installed
+    """
+    return fmt in FORMATS and (fmt in ("ndjson", "csv") or pa is not None)
+
+
+class ChunkSink:
+    """Write-only file that hands the written bytes over with take"""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.buffer.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = self.buffer.getvalue()
+        self.buffer = io.BytesIO()
+        return data
+
+
+def arrow_schema(columns: dict[str, str]) -> "pa.Schema":
+    """
+    Arrow schema of an export, fixed so that every chunk has the same types
+    even when a column is null in the first rows
+
+    Args:
+        columns (dict[str, str]): column name and type (string, date or decimal)
+
+    Returns:
+        pa.Schema: schema
+    """
+    types = {"string": pa.string(), "date": pa.date32(), "decimal": pa.decimal128(15, 2)}
+    return pa.schema([(name, types[kind]) for name, kind in columns.items()])
+
+
+async def fetch_chunks(cursor, chunk_size: int) -> AsyncIterator[list[tuple]]:
+    """
+    Rows of an executed server-side cursor, chunk_size at a time
+
+    Args:
+        cursor (aiomysql.SSCursor): executed cursor
+        chunk_size (int): rows per chunk
+
+    Yields:
+        list[tuple]: rows
+    """
+    while True:
+        rows = await cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+async def encode(
+    fmt: str, columns: dict[str, str], chunks: AsyncIterator[list[tuple]]
+) -> AsyncIterator[bytes]:
+    """
+    Encode chunks of rows as they arrive, only one chunk is in memory at a time
+
+    Args:
+        fmt (str): one of FORMATS
+        columns (dict[str, str]): column name and type, in the order of the rows
+        chunks (AsyncIterator[list[tuple]]): rows
+
+    Raises:
+        ImportError: arrow or parquet without pyarrow installed
+
+    Yields:
+        bytes: encoded chunk
+    """
+    names = list(columns)
+    if fmt == "ndjson":
+        async for rows in chunks:
+            yield "".join(
+                json.dumps(dict(zip(names, row)), default=str, ensure_ascii=False) + "\n"
+                for row in rows
+            ).encode()
+        return
+
+    if fmt == "csv":
+        text = io.StringIO()
+        writer = csv.writer(text, delimiter=";")
+        writer.writerow(names)
+        async for rows in chunks:
+            writer.writerows(rows)
+            yield text.getvalue().encode()
+            text.seek(0)
+            text.truncate()
+        if text.tell():
+            yield text.getvalue().encode()
+        return
+
+    if pa is None:
+        raise ImportError(
+            f"pyarrow is required by the {fmt} export, install it with `uv sync --extra parquet`"
+        )
+    schema = arrow_schema(columns)
+    sink = ChunkSink()
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+    else:
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    async for rows in chunks:
+        # every chunk is a record batch / row group, written as soon as it is read
+        arrays = [
+            pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)
+        ]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import unicodedata
+from datetime import date
+
+from .pagination import follows
+
+log = logging.getLogger(__name__)
+
+# columns of the operadoras table created by scripts/populate_database.py
+OPERADORAS_COLUMNS = (
+    "registro_ans",
+    "cnpj",
+    "razao_social",
+    "nome_fantasia",
+    "modalidade",
+    "logradouro",
+    "numero",
+    "complemento",
+    "bairro",
+    "cidade",
+    "uf",
+    "cep",
+    "ddd",
+    "telefone",
+    "fax",
+    "endereco_eletronico",
+    "representante",
+    "cargo_representante",
+    "Regiao_de_Comercializacao",
+    "data_registro_ans",
+)
+
+# files loaded by the ETL, a new load changes this version
+VERSION_QUERY = """SELECT MAX(carregado_em) AS carregado_em, COUNT(*) AS arquivos
+    FROM arquivos_carregados"""
+
+
+async def load_version(db) -> tuple | None:
+    """
+    Version of the data loaded by the ETL, changes with every new load
+
+    Args:
+        db (databases.Database): connected database
+
+    Returns:
+        tuple | None: last load time and number of loaded files, None
+        before the first load
+    """
+    try:
+        row = await db.fetch_one(VERSION_QUERY)
+    except Exception as e:
+        # no ETL load yet, the table is created by scripts/populate_database.py
+        log.warning(f"Could not read the load version: {e}")
+        return None
+    return tuple(row._mapping.values()) if row else None
+
+
+def normalize(text: str | None) -> str:
+    """
+    Lowercase text without accents, the same matching as the
+    utf8mb4_0900_ai_ci collation of the searched columns
+
+    Args:
+        text (str | None): text
+
+    Returns:
+        str: normalized text
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Three character substrings of a normalized text
+
+    Args:
+        text (str): normalized text
+
+    Returns:
+        set[str]: trigrams
+    """
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class Operator:
+    """Row of the operadoras table"""
+
+    __slots__ = OPERADORAS_COLUMNS
+
+    def __init__(self, row: dict):
+        for column in OPERADORAS_COLUMNS:
+            setattr(self, column, row.get(column))
+
+    def as_dict(self) -> dict:
+        return {column: getattr(self, column) for column in OPERADORAS_COLUMNS}
+
+
+class TextIndex:
+    """
+    Trigram index over a text per operator. A term is looked up by
+    intersecting the operators of its trigrams and confirming the substring,
+    terms shorter than a trigram scan the texts
+    """
+
+    __slots__ = ("texts", "grams")
+
+    def __init__(self, texts: list[str]):
+        """
+        Args:
+            texts (list[str]): normalized text of each operator, by position
+        """
+        self.texts = texts
+        self.grams: dict[str, set[int]] = {}
+        for position, text in enumerate(texts):
+            for gram in trigrams(text):
+                self.grams.setdefault(gram, set()).add(position)
+
+    def find(self, term: str) -> dict[int, int]:
+        """
+        Operators whose text contains the term
+
+        Args:
+            term (str): normalized term
+
+        Returns:
+            dict[int, int]: rank of each matching position, 0 when the text
+            starts with the term, 1 when a word does and 2 otherwise
+        """
+        grams = trigrams(term)
+        if grams:
+            postings = sorted((self.grams.get(gram, set()) for gram in grams), key=len)
+            candidates = set.intersection(*postings)
+        else:
+            candidates = range(len(self.texts))
+
+        ranks = {}
+        for position in candidates:
+            text = self.texts[position]
+            index = text.find(term)
+            if index == 0:
+                ranks[position] = 0
+            elif index > 0:
+                ranks[position] = 1 if not text[index - 1].isalnum() else 2
+        return ranks
+
+
+class OperatorIndex:
+    """
+    Read-only copy of the operadoras table with hash indexes on registro_ans
+    and cnpj and trigram indexes on the names and cities. Answers the same
+    filters as queries.build_query
+    """
+
+    def __init__(self, rows: list[dict]):
+        """
+        Args:
+            rows (list[dict]): operadoras rows
+        """
+        # newest first, so a lower position is the build_query sort order
+        self.operators = sorted(
+            (Operator(row) for row in rows),
+            key=lambda op: (
+                op.data_registro_ans is not None,
+                op.data_registro_ans or date.min,
+                op.registro_ans or "",
+            ),
+            reverse=True,
+        )
+        self.by_registro_ans: dict[str, list[int]] = {}
+        self.by_cnpj: dict[str, list[int]] = {}
+        for position, op in enumerate(self.operators):
+            self.by_registro_ans.setdefault(op.registro_ans, []).append(position)
+            self.by_cnpj.setdefault(op.cnpj, []).append(position)
+        # razao_social and nome_fantasia are searched together, as in the
+        # full-text index, the line break keeps a term from spanning both
+        self.names = TextIndex(
+            [f"{normalize(op.razao_social)}\n{normalize(op.nome_fantasia)}" for op in self.operators]
+        )
+        self.cities = TextIndex([normalize(op.cidade) for op in self.operators])
+
+    def __len__(self) -> int:
+        return len(self.operators)
+
+    def search(
+        self,
+        registro_ans: str | None = None,
+        cnpj: str | None = None,
+        razao_social: str | None = None,
+        cidade: str | None = None,
+        after: dict | None = None,
+        limit: int = 10,
+    ) -> list[dict]:
+        """
+        Operators matching every given filter, best text matches first and
+        then the newest registrations
+
+        Args:
+            registro_ans (str, optional): exact registro_ans. Defaults to None.
+            cnpj (str, optional): exact cnpj. Defaults to None.
+            razao_social (str, optional): term of the razao_social or nome_fantasia. Defaults to None.
+            cidade (str, optional): term of the city. Defaults to None.
+            after (dict, optional): start after this position of
+            pagination.decode_cursor. Defaults to the first page.
+            limit (int, optional): maximum number of operators. Defaults to 10.
+
+        Returns:
+            list[dict]: operadoras rows, with the relevancia of the text
+            filters when there are any
+        """
+        candidates: set[int] | None = None
+        if registro_ans:
+            candidates = set(self.by_registro_ans.get(registro_ans, []))
+        if cnpj:
+            matches = set(self.by_cnpj.get(cnpj, []))
+            candidates = matches if candidates is None else candidates & matches
+
+        # relevance of each term, 2 when the text starts with it, 1 when a
+        # word does and 0 otherwise
+        scores: dict[int, int] | None = None
+        for term, index in ((razao_social, self.names), (cidade, self.cities)):
+            if not term:
+                continue
+            found = index.find(normalize(term))
+            candidates = set(found) if candidates is None else candidates & set(found)
+            scores = {
+                position: (scores or {}).get(position, 0) + 2 - found[position]
+                for position in candidates
+            }
+
+        if candidates is None:
+            candidates = range(len(self.operators))
+        ordered = sorted(candidates, key=lambda p: (-(scores or {}).get(p, 0), p))
+
+        page = []
+        for position in ordered:
+            row = self.operators[position].as_dict()
+            if scores is not None:
+                row["relevancia"] = float(scores[position])
+            if after and not follows(row, after):
+                continue
+            page.append(row)
+            if len(page) == limit:
+                break
+        return page
+
+
+class OperatorIndexService:
+    """
+    Keeps an OperatorIndex of the db up to date. The index is rebuilt in a
+    thread and swapped in one assignment, so searches never see a partial
+    index, whenever the version of the ETL loads (arquivos_carregados)
+    changes or refresh_interval seconds pass
+    """
+
+    def __init__(self, db, poll_interval: float = 30.0, refresh_interval: float = 86400.0):
+        """
+        Args:
+            db (databases.Database): connected database
+            poll_interval (float, optional): seconds between checks of the
+            load version. Defaults to 30.0.
+            refresh_interval (float, optional): seconds after which the index
+            is rebuilt even without a new load. Defaults to 86400.0.
+        """
+        self.db = db
+        self.poll_interval = poll_interval
+        self.refresh_interval = refresh_interval
+        self.index: OperatorIndex | None = None
+        self.version = None
+        self.loaded_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def refresh(self, force: bool = False) -> bool:
+        """
+        Rebuild the index if the load version changed
+
+        Args:
+            force (bool, optional): rebuild even if it did not. Defaults to False.
+
+        Returns:
+            bool: True when the index was rebuilt
+        """
+        loop = asyncio.get_running_loop()
+        version = await load_version(self.db)
+        expired = loop.time() - self.loaded_at >= self.refresh_interval
+        if not (force or expired or self.index is None) and version == self.version:
+            return False
+
+        rows = await self.db.fetch_all("SELECT * FROM operadoras")
+        index = await asyncio.to_thread(OperatorIndex, [dict(row._mapping) for row in rows])
+        self.index, self.version, self.loaded_at = index, version, loop.time()
+        log.info(f"Operator index loaded with {len(index)} operators")
+        return True
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                log.error(f"Operator index refresh failed, keeping the current one: {e}")
+
+    async def start(self) -> None:
+        """Load the index and start refreshing it in the background"""
+        try:
+            await self.refresh(force=True)
+        except Exception as e:
+            log.error(f"Operator index not loaded, searching the db: {e}")
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        """Stop the background refresh"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def search(self, **filters) -> list[dict] | None:
+        """
+        Search the current index
+
+        Returns:
+            list[dict] | None: operadoras rows, None while no index is loaded
+        """
+        index = self.index
+        return None if index is None else index.search(**filters)
@@ -0,0 +1,106 @@
+import base64
+import binascii
+import json
+from datetime import date
+
+# columns of the search order, after the relevance of the text filters
+KEY_COLUMNS = ("data_registro_ans", "registro_ans")
+
+# engines of the search, the relevance of each has its own scale: MATCH
+# scores in the db and 0 to 4 points in the OperatorIndex
+SOURCES = ("db", "index")
+
+
+class InvalidCursor(ValueError):
+    """Cursor not created by encode_cursor"""
+
+
+def encode_cursor(row: dict, source: str) -> str:
+    """
+    Opaque cursor of the last row of a page, the next page starts after it
+
+    Args:
+        row (dict): last row, with the KEY_COLUMNS and relevancia when the
+        search has text filters
+        source (str): engine of the page, one of SOURCES
+
+    Returns:
+        str: cursor
+    """
+    data = row["data_registro_ans"]
+    key = [
+        source,
+        row.get("relevancia"),
+        data.isoformat() if data else None,
+        row["registro_ans"],
+    ]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Position encoded by encode_cursor
+
+    Args:
+        cursor (str): cursor
+
+    Raises:
+        InvalidCursor: malformed cursor
+
+    Returns:
+        dict: source of the cursor and relevancia, data_registro_ans and
+        registro_ans of the last row
+    """
+    try:
+        cursor_source, relevancia, data, registro_ans = json.loads(
+            base64.urlsafe_b64decode(cursor)
+        )
+        if cursor_source not in SOURCES:
+            raise ValueError(f"Unknown source: {cursor_source}")
+        return {
+            "source": cursor_source,
+            "relevancia": None if relevancia is None else float(relevancia),
+            "data_registro_ans": date.fromisoformat(data) if data else None,
+            "registro_ans": str(registro_ans),
+        }
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def follows(row: dict, after: dict) -> bool:
+    """
+    Whether a row comes after the cursor position in the search order:
+    relevancia DESC, data_registro_ans DESC with nulls last, registro_ans DESC
+
+    Args:
+        row (dict): row with the KEY_COLUMNS and relevancia
+        after (dict): position from decode_cursor
+
+    Returns:
+        bool: True when the row belongs to a later page
+    """
+    relevancia, last = row.get("relevancia"), after["relevancia"]
+    if relevancia is not None and last is not None and relevancia != last:
+        return relevancia < last
+    data, last = row["data_registro_ans"], after["data_registro_ans"]
+    if data != last:
+        if data is None or last is None:
+            return data is None
+        return data < last
+    return row["registro_ans"] < after["registro_ans"]
+
+
+def project(row: dict, fields: list[str] | None) -> dict:
+    """
+    Only the requested columns of a row
+
+    Args:
+        row (dict): row
+        fields (list[str] | None): columns, every column when None
+
+    Returns:
+        dict: projected row
+    """
+    if not fields:
+        return row
+    return {field: row[field] for field in fields}
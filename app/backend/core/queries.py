@@ -0,0 +1,150 @@
+from .pagination import KEY_COLUMNS
+
+# columns of each ngram full-text index of operadoras (scripts/populate_database.py)
+FULLTEXT_COLUMNS = {
+    "razao_social": "razao_social, nome_fantasia",
+    "cidade": "cidade",
+}
+
+
+def fulltext_term(term: str) -> str | None:
+    """
+    Phrase for BOOLEAN MODE without the full-text operators +-<>()~*"@
+
+    Args:
+        term (str): search term
+
+    Returns:
+        str | None: quoted phrase, None when the term has no word
+    """
+    words = "".join(c if c.isalnum() else " " for c in term).split()
+    return '"' + " ".join(words) + '"' if words else None
+
+
+def text_condition(
+    field: str, term: str, params: dict, relevance: list[str], ngram_token_size: int = 2
+) -> str:
+    """
+    Search in the full-text index, or LIKE for terms shorter than the ngram
+
+    Args:
+        field (str): key of FULLTEXT_COLUMNS
+        term (str): search term
+        params (dict): query params, the term is added
+        relevance (list[str]): relevance expressions, the MATCH is added
+        ngram_token_size (int, optional): ngram_token_size of MySQL. Defaults to 2.
+
+    Returns:
+        str: condition
+    """
+    columns = FULLTEXT_COLUMNS[field]
+    phrase = fulltext_term(term)
+    if phrase and min(len(word) for word in phrase.strip('"').split()) >= ngram_token_size:
+        match = f"MATCH({columns}) AGAINST (:{field} IN BOOLEAN MODE)"
+        params[field] = phrase
+        relevance.append(match)
+        return match
+
+    params[field] = f"%{term}%"
+    return "(" + " OR ".join(f"{c} LIKE :{field}" for c in columns.split(", ")) + ")"
+
+
+def keyset_condition(after: dict, params: dict, relevance: str | None) -> str:
+    """
+    Rows after the cursor in the order relevancia, data_registro_ans and registro_ans
+
+    Args:
+        after (dict): position from pagination.decode_cursor
+        params (dict): query params, the position is added
+        relevance (str | None): relevance expression of the text filters
+
+    Returns:
+        str: condition
+    """
+    params["after_registro_ans"] = after["registro_ans"]
+    if after["data_registro_ans"] is None:
+        condition = "(data_registro_ans IS NULL AND registro_ans < :after_registro_ans)"
+    else:
+        params["after_data_registro_ans"] = after["data_registro_ans"]
+        condition = (
+            "(data_registro_ans < :after_data_registro_ans"
+            " OR (data_registro_ans = :after_data_registro_ans"
+            " AND registro_ans < :after_registro_ans)"
+            " OR data_registro_ans IS NULL)"
+        )
+    if relevance and after["relevancia"] is not None:
+        params["after_relevancia"] = after["relevancia"]
+        condition = (
+            f"({relevance} < :after_relevancia"
+            f" OR ({relevance} = :after_relevancia AND {condition}))"
+        )
+    return condition
+
+
+def build_query(
+    registro_ans: str | None = None,
+    cnpj: str | None = None,
+    razao_social: str | None = None,
+    cidade: str | None = None,
+    fields: list[str] | None = None,
+    after: dict | None = None,
+    limit: int = 10,
+    ngram_token_size: int = 2,
+) -> tuple[str, dict]:
+    """
+    Query of a page of the operadoras search
+
+    Args:
+        registro_ans (str, optional): exact registro_ans. Defaults to None.
+        cnpj (str, optional): exact cnpj. Defaults to None.
+        razao_social (str, optional): term of the razao_social or nome_fantasia. Defaults to None.
+        cidade (str, optional): term of the city. Defaults to None.
+        fields (list[str], optional): columns, every column when None. Defaults to None.
+        after (dict, optional): start after this position of
+        pagination.decode_cursor. Defaults to the first page.
+        limit (int, optional): maximum number of rows. Defaults to 10.
+        ngram_token_size (int, optional): ngram_token_size of MySQL. Defaults to 2.
+
+    Returns:
+        tuple[str, dict]: query and its params
+    """
+    conditions = []
+    params = {}
+    relevance = []
+
+    if registro_ans:
+        conditions.append("registro_ans = :registro_ans")
+        params["registro_ans"] = registro_ans
+
+    if cnpj:
+        conditions.append("cnpj = :cnpj")
+        params["cnpj"] = cnpj
+
+    if razao_social:
+        conditions.append(
+            text_condition("razao_social", razao_social, params, relevance, ngram_token_size)
+        )
+
+    if cidade:
+        conditions.append(text_condition("cidade", cidade, params, relevance, ngram_token_size))
+
+    # the cursor needs the key columns even if they were not requested
+    columns = ", ".join(dict.fromkeys([*fields, *KEY_COLUMNS])) if fields else "*"
+    # rounded so the relevance of the cursor compares equal on the next page
+    relevance = f"ROUND({' + '.join(relevance)}, 6)" if relevance else None
+    if relevance:
+        base_query = f"SELECT {columns}, {relevance} AS relevancia FROM operadoras"
+        order_by = "relevancia DESC, data_registro_ans DESC, registro_ans DESC"
+    else:
+        base_query = f"SELECT {columns} FROM operadoras"
+        order_by = "data_registro_ans DESC, registro_ans DESC"
+
+    if after:
+        conditions.append(keyset_condition(after, params, relevance))
+
+    if conditions:
+        base_query += " WHERE " + " AND ".join(conditions)
+
+    base_query += f" ORDER BY {order_by} LIMIT {int(limit)}"
+
+    return base_query, params
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+
+class SearchCache:
+    """
+    Bounded LRU cache of search responses with a time to live. Concurrent
+    requests for a key that is being computed wait for that computation
+    instead of starting their own (single-flight). invalidate drops every
+    entry and makes the computations in flight not be stored
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        """
+        Args:
+            maxsize (int, optional): maximum number of responses, 0 disables
+            the cache but keeps the single-flight. Defaults to 1024.
+            ttl (float, optional): seconds a response is served. Defaults to 300.0.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self.inflight: dict[Hashable, asyncio.Future] = {}
+        self.generation = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[object]]) -> object:
+        """
+        Cached response of a key, computed once if missing or expired
+
+        Args:
+            key (Hashable): normalized request
+            compute (Callable[[], Awaitable[object]]): coroutine function of the response
+
+        Returns:
+            object: response
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # a cancelled waiter must not cancel the shared computation
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        generation = self.generation
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            value = await compute()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved, the waiters get it from await
+            raise
+        finally:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+
+        future.set_result(value)
+        if self.maxsize > 0 and generation == self.generation:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self) -> None:
+        """Drop every response, used when the ETL loads new data"""
+        self.entries.clear()
+        # the computations in flight may have read the old data
+        self.inflight.clear()
+        self.generation += 1
+        self.invalidations += 1
+
+    def set_version(self, version) -> bool:
+        """
+        Invalidate the cache when the version of the loaded data changes
+
+        Args:
+            version: version from load_version
+
+        Returns:
+            bool: True when the cache was invalidated
+        """
+        if version == self.version:
+            return False
+        first = self.version is None and not self.entries
+        self.version = version
+        if not first:
+            self.invalidate()
+        return not first
+
+    def stats(self) -> dict:
+        """
+        Counters to size the cache
+
+        Returns:
+            dict: entries, hits, misses, coalesced requests, evictions,
+            invalidations and hit ratio
+        """
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self.entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "inflight": len(self.inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
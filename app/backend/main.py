@@ -1,8 +1,40 @@
-from config import DB_USER, DB_PASSWORD, DB_NAME, DB_HOST
-from fastapi import FastAPI
+import asyncio
+from config import (
+    DB_USER,
+    DB_PASSWORD,
+    DB_NAME,
+    DB_HOST,
+    NGRAM_TOKEN_SIZE,
+    OPERATOR_INDEX,
+    OPERATOR_INDEX_POLL,
+    OPERATOR_INDEX_REFRESH,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_POLL,
+    EXPORT_CHUNK_SIZE,
+)
+from datetime import date
+from core.operator_index import (
+    OPERADORAS_COLUMNS,
+    OperatorIndexService,
+    load_version,
+    normalize,
+)
+from core.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    project,
+)
+from core import export
+from core.queries import build_query
+from core.search_cache import SearchCache
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import aiomysql
 import databases
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 
 app = FastAPI()
 
@@ -22,41 +54,53 @@ DATABASE_URL = f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 
 db = databases.Database(DATABASE_URL)
 
+operator_index = (
+    OperatorIndexService(db, OPERATOR_INDEX_POLL, OPERATOR_INDEX_REFRESH)
+    if OPERATOR_INDEX
+    else None
+)
+
+search_cache = SearchCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+MAX_PAGE_SIZE = 100
+
 
 class Search(BaseModel):
     registro_ans: str | None = None
     cnpj: str | None = None
     razao_social: str | None = None
     cidade: str | None = None
+    page_size: int = Field(10, ge=1, le=MAX_PAGE_SIZE)
+    cursor: str | None = None
+    fields: list[str] | None = None
 
+    @field_validator("fields")
+    @classmethod
+    def known_fields(cls, fields):
+        """Aceita só colunas da tabela operadoras"""
+        unknown = [field for field in fields or [] if field not in OPERADORAS_COLUMNS]
+        if unknown:
+            raise ValueError(f"Colunas desconhecidas: {unknown}")
+        return list(dict.fromkeys(fields)) if fields else None
 
-def build_query(registro_ans=None, cnpj=None, razao_social=None, cidade=None):
-    base_query = "SELECT * FROM operadoras"
-    conditions = []
-    params = {}
-
-    if registro_ans:
-        conditions.append("registro_ans = :registro_ans")
-        params["registro_ans"] = registro_ans
-
-    if cnpj:
-        conditions.append("cnpj = :cnpj")
-        params["cnpj"] = cnpj
-
-    if razao_social:
-        conditions.append("razao_social LIKE :razao_social")
-        params["razao_social"] = f"%{razao_social}%"  
+    def cache_key(self):
+        """Chave do cache, os termos de texto são buscados sem acento e maiúsculas"""
+        return (
+            self.registro_ans or None,
+            self.cnpj or None,
+            normalize(self.razao_social) or None,
+            normalize(self.cidade) or None,
+            self.page_size,
+            self.cursor or None,
+            tuple(self.fields) if self.fields else None,
+        )
 
-    if cidade:
-        conditions.append("cidade LIKE :cidade")
-        params["cidade"] = f"%{cidade}%"
 
-    if conditions:
-        base_query += " WHERE " + " AND ".join(conditions)
-
-    base_query += " ORDER BY data_registro_ans DESC LIMIT 10"
-
-    return base_query, params
+async def watch_loads():
+    """Invalida o cache de /search quando o ETL carrega novos dados"""
+    while True:
+        search_cache.set_version(await load_version(db))
+        await asyncio.sleep(SEARCH_CACHE_POLL)
 
 
 @app.on_event("startup")
@@ -70,6 +114,11 @@ async def startup():
         result = await db.fetch_one(query)
         print("Teste de consulta:", result)
 
+        if operator_index:
+            await operator_index.start()
+
+        app.state.watch_loads = asyncio.create_task(watch_loads())
+
     except Exception as e:
         print("❌ Erro na conexão:", str(e))
 
@@ -77,6 +126,10 @@ async def startup():
 @app.on_event("shutdown")
 async def shutdown():
     """Desconecta do banco de dados ao desligar a API"""
+    if operator_index:
+        await operator_index.stop()
+    if getattr(app.state, "watch_loads", None):
+        app.state.watch_loads.cancel()
     await db.disconnect()
     print("🔌 Conexão com o banco encerrada.")
 
@@ -88,17 +141,167 @@ def read_root():
 
 @app.post("/search")
 async def search(search: Search):
-    """Retorna os primeiros 10 registros da tabela operadoras"""
+    """Retorna uma página dos registros da tabela operadoras e o cursor da próxima"""
+    try:
+        after = decode_cursor(search.cursor) if search.cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await search_cache.get(search.cache_key(), lambda: run_search(search, after))
+
 
-    query, params = build_query(
+@app.get("/search/stats")
+def search_stats():
+    """Contadores do cache de /search"""
+    return search_cache.stats()
+
+
+async def run_search(search: Search, after=None):
+    # one extra row tells whether there is a next page
+    filters = dict(
         registro_ans=search.registro_ans,
         cnpj=search.cnpj,
         razao_social=search.razao_social,
         cidade=search.cidade,
+        after=after,
+        limit=search.page_size + 1,
+    )
+    # a cursor continues in the engine that created it, the relevances of
+    # the db and of the index have different scales
+    source = after["source"] if after else None
+    rows = None
+    if operator_index and source != "db":
+        rows = operator_index.search(**filters)
+    if rows is None and source == "index":
+        raise HTTPException(
+            status_code=400, detail="Cursor do índice em memória, que não está carregado"
+        )
+    if rows is not None:
+        source = "index"
+    else:
+        source = "db"
+        query, params = build_query(
+            fields=search.fields, ngram_token_size=NGRAM_TOKEN_SIZE, **filters
+        )
+        rows = [dict(row._mapping) for row in await db.fetch_all(query=query, values=params)]
+
+    page = rows[: search.page_size]
+    next_cursor = encode_cursor(page[-1], source) if len(rows) > search.page_size else None
+    return {
+        "message": [project(row, search.fields) for row in page],
+        "next_cursor": next_cursor,
+    }
+
+
+# colunas e tipos de cada exportação, na ordem do SELECT
+EXPORT_COLUMNS = {
+    "operadoras": {
+        column: "date" if column == "data_registro_ans" else "string"
+        for column in OPERADORAS_COLUMNS
+    },
+    "demonstracoes_contabeis": {
+        "data": "date",
+        "reg_ans": "string",
+        "cd_conta_contabil": "string",
+        "descricao": "string",
+        "categoria": "string",
+        "vl_saldo_inicial": "decimal",
+        "vl_saldo_final": "decimal",
+    },
+}
+
+
+def where(conditions):
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def build_operadoras_export(uf=None, cidade=None, modalidade=None):
+    conditions = []
+    params = {}
+    for column, value in (("uf", uf), ("cidade", cidade), ("modalidade", modalidade)):
+        if value:
+            conditions.append(f"{column} = %({column})s")
+            params[column] = value
+
+    columns = ", ".join(EXPORT_COLUMNS["operadoras"])
+    query = f"SELECT {columns} FROM operadoras{where(conditions)} ORDER BY registro_ans"
+    return query, params
+
+
+def build_demonstracoes_export(reg_ans=None, inicio=None, fim=None, categoria=None):
+    conditions = []
+    params = {}
+
+    if reg_ans:
+        conditions.append("d.reg_ans = %(reg_ans)s")
+        params["reg_ans"] = reg_ans
+
+    if inicio:
+        conditions.append("d.data >= %(inicio)s")
+        params["inicio"] = inicio
+
+    if fim:
+        conditions.append("d.data <= %(fim)s")
+        params["fim"] = fim
+
+    if categoria:
+        conditions.append("c.categoria = %(categoria)s")
+        params["categoria"] = categoria
+
+    # no ORDER BY, the rows go out in the order of the index range scan
+    query = f"""SELECT d.data, d.reg_ans, d.cd_conta_contabil, c.descricao,
+            c.categoria, d.vl_saldo_inicial, d.vl_saldo_final
+        FROM demonstracoes_contabeis d
+        LEFT JOIN contas c ON c.cd_conta_contabil = d.cd_conta_contabil
+        {where(conditions)}"""
+    return query, params
+
+
+async def stream_export(fmt, columns, query, params):
+    """Lê com cursor do lado do servidor e envia cada bloco assim que chega"""
+    # the connection is opened in the generator, the task that streams the response
+    async with db.connection() as connection:
+        raw_connection = connection.raw_connection
+        async with raw_connection.cursor(aiomysql.SSCursor) as cursor:
+            await cursor.execute(query, params)
+            chunks = export.fetch_chunks(cursor, EXPORT_CHUNK_SIZE)
+            async for data in export.encode(fmt, columns, chunks):
+                yield data
+
+
+def export_response(table, fmt, query, params):
+    if not export.supported(fmt):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato {fmt} indisponível, use um de {list(export.FORMATS)}",
+        )
+    media_type, extension = export.FORMATS[fmt]
+    return StreamingResponse(
+        stream_export(fmt, EXPORT_COLUMNS[table], query, params),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{extension}"'},
     )
 
-    if not query:
-        return {"message": "fail"}
 
-    result = await db.fetch_all(query=query, values=params)
-    return {"message": result}
+@app.get("/export/operadoras")
+async def export_operadoras(
+    fmt: str = Query("ndjson", alias="format"),
+    uf: str | None = None,
+    cidade: str | None = None,
+    modalidade: str | None = None,
+):
+    """Exporta as operadoras filtradas em ndjson, csv, arrow ou parquet"""
+    query, params = build_operadoras_export(uf, cidade, modalidade)
+    return export_response("operadoras", fmt, query, params)
+
+
+@app.get("/export/demonstracoes")
+async def export_demonstracoes(
+    fmt: str = Query("ndjson", alias="format"),
+    reg_ans: str | None = None,
+    inicio: date | None = None,
+    fim: date | None = None,
+    categoria: str | None = None,
+):
+    """Exporta as demonstrações contábeis filtradas em ndjson, csv, arrow ou parquet"""
+    query, params = build_demonstracoes_export(reg_ans, inicio, fim, categoria)
+    return export_response("demonstracoes_contabeis", fmt, query, params)
@@ -0,0 +1,36 @@
+"""
+Compares serial and concurrent downloads against a local HTTP server
+
+    uv run python -m benchmarks.bench_downloads
+"""
+import logging
+import os
+import tempfile
+import time
+
+from tests.local_http_server import LocalHTTPServer
+from utils.scraper import Scraper
+
+N_FILES = 24
+FILE_SIZE = 512 * 1024
+LATENCY = 0.2
+WORKERS = [1, 2, 4, 8]
+
+
+def main() -> None:
+    files = {f"{i}T2024.zip": os.urandom(FILE_SIZE) for i in range(N_FILES)}
+    log = logging.getLogger("bench_downloads")
+
+    with LocalHTTPServer(files, latency=LATENCY) as server:
+        urls = [f"{server.url}/{name}" for name in files]
+        for workers in WORKERS:
+            scraper = Scraper(log, max_workers=workers, pool_maxsize=workers)
+            with tempfile.TemporaryDirectory() as tmp:
+                start = time.perf_counter()
+                scraper.dowload_files(urls, tmp)
+                elapsed = time.perf_counter() - start
+            print(f"workers={workers:<3} {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Compares the table extraction with 1..N worker processes on a generated PDF
+
+    uv run python -m benchmarks.bench_extract_tables_pdf
+"""
+import os
+import tempfile
+import time
+
+from scripts.extract_tables_pdf import extract_tables_pdf
+from tests.pdf_fixture import build_table_pdf
+
+N_PAGES = 60
+
+
+def main() -> None:
+    max_workers = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "anexo.pdf")
+        build_table_pdf(pdf_path, N_PAGES)
+
+        workers = 1
+        while workers <= max_workers:
+            output_file = os.path.join(tmp, f"tables_{workers}.csv")
+            start = time.perf_counter()
+            extract_tables_pdf(pdf_path, output_file, {}, workers)
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers:<3} {elapsed:.2f}s")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares the bulk load engines on a local MySQL (docker compose up)
+
+    uv run python -m benchmarks.bench_load_engines
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import pymysql
+
+from settings import DB_HOST, DB_NAME, DB_PASSWORD, DB_USER, LOAD_BATCH_SIZE
+from scripts.populate_database import DEMONSTRACOES_COLUMNS
+from utils.bulk_load import LOAD_ENGINES
+
+N_ROWS = 500_000
+TABLE = "bench_demonstracoes_contabeis"
+
+
+def synthetic_frame(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "DATA": "2024-01-01",
+            "REG_ANS": rng.integers(300000, 430000, n_rows).astype(str),
+            "CD_CONTA_CONTABIL": rng.integers(1, 500, n_rows).astype(str),
+            "VL_SALDO_INICIAL": rng.random(n_rows).round(2) * 1e6,
+            "VL_SALDO_FINAL": rng.random(n_rows).round(2) * 1e6,
+        }
+    )
+
+
+def main() -> None:
+    df = synthetic_frame(N_ROWS)
+    conn = pymysql.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        charset="utf8mb4",
+        local_infile=True,
+    )
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cursor.execute(f"CREATE TABLE {TABLE} ({DEMONSTRACOES_COLUMNS})")
+            for name, engine in LOAD_ENGINES.items():
+                cursor.execute(f"TRUNCATE TABLE {TABLE}")
+                start = time.perf_counter()
+                if name == "batch":
+                    engine(cursor, df, TABLE, batch_size=LOAD_BATCH_SIZE)
+                else:
+                    engine(cursor, df, TABLE)
+                conn.commit()
+                elapsed = time.perf_counter() - start
+                print(f"{name:<12} {elapsed:.2f}s  {N_ROWS / elapsed:,.0f} rows/s")
+            cursor.execute(f"DROP TABLE {TABLE}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares the previous string based transform with the vectorised parsing of
+extract_data/transform_data on a synthetic quarterly file
+
+    uv run python -m benchmarks.bench_transform
+"""
+import importlib.util
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.populate_database import extract_data, transform_data
+
+N_ROWS = 1_000_000
+VALUE_COLUMNS = ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"]
+
+
+def write_quarter(path: str, n_rows: int) -> None:
+    rng = np.random.default_rng(0)
+    values = rng.random((n_rows, 2)) * 1e7
+    df = pd.DataFrame(
+        {
+            "DATA": "2024-01-01",
+            "REG_ANS": rng.integers(300000, 430000, n_rows).astype(str),
+            "CD_CONTA_CONTABIL": rng.integers(1, 500, n_rows).astype(str),
+            "DESCRICAO": "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS",
+        }
+    )
+    for i, column in enumerate(VALUE_COLUMNS):
+        df[column] = [f"{value:,.2f}" for value in values[:, i]]
+        df[column] = df[column].str.translate(str.maketrans(",.", ".,"))
+    df.to_csv(path, sep=";", index=False, quoting=1)
+
+
+def legacy_transform(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path, sep=";", decimal=",", quotechar='"', dtype=str)
+    for col in VALUE_COLUMNS:
+        df[col] = df[col].str.replace(".", "", regex=False)
+        df[col] = df[col].str.replace(",", ".", regex=False)
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["DATA"] = pd.to_datetime(df["DATA"], errors="coerce").dt.strftime("%Y-%m-%d")
+    return df.replace({np.nan: None})
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "1T2024.csv")
+        write_quarter(path, N_ROWS)
+        print(f"{N_ROWS:,} rows, {os.path.getsize(path) / 2**20:.0f} MiB")
+
+        runs = {"legacy": lambda: legacy_transform(path)}
+        backends = ["numpy"]
+        if importlib.util.find_spec("pyarrow"):
+            backends.append("pyarrow")
+        for backend in backends:
+            runs[backend] = lambda backend=backend: transform_data(
+                extract_data(path, dtype_backend=backend),
+                VALUE_COLUMNS,
+            )
+
+        for name, run in runs.items():
+            start = time.perf_counter()
+            df = run()
+            elapsed = time.perf_counter() - start
+            memory = df.memory_usage(deep=True).sum() / 2**20
+            print(f"{name:<8} {elapsed:.2f}s  {N_ROWS / elapsed:,.0f} rows/s  {memory:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,97 @@
-from scripts import scraper_gov_docs, extract_tables_pdf, scraper_operators_docs, populate_database
+import argparse
+from settings import (
+    logger,
+    DIR_DATA,
+    PARQUET_DIR,
+    PIPELINE_STATE,
+    DB_HOST,
+    DB_NAME,
+    ETL_INPUT_MODE,
+    ETL_BULK_MODE,
+    ETL_PARTITIONED,
+)
+from scripts import (
+    scraper_gov_docs,
+    extract_tables_pdf,
+    scraper_operators_docs,
+    convert_to_parquet,
+    populate_database,
+)
+from utils.pipeline import Pipeline, Stage
+
+log = logger(__file__)
+
+
+def build_stages() -> list[Stage]:
+    """
+    Pipeline stages. The ANS documents branch (scrape and extract the pdf
+    tables) and the operators branch (scrape and load the db) are independent
+
+    Returns:
+        list[Stage]: stages
+    """
+    load_inputs = [
+        f"{DIR_DATA}/{populate_database.OPERADORAS_FILE}",
+        f"{DIR_DATA}/[1-4]T*.zip",
+        f"{DIR_DATA}/[1-4]T*.csv",
+    ]
+    stages = [
+        Stage("scraper_gov_docs", scraper_gov_docs.main),
+        Stage(
+            "extract_tables_pdf",
+            extract_tables_pdf.main,
+            ["scraper_gov_docs"],
+            inputs=[extract_tables_pdf.PATH_FILE],
+        ),
+        Stage("scraper_operators_docs", scraper_operators_docs.main),
+    ]
+    load_after = "scraper_operators_docs"
+    if ETL_INPUT_MODE == "parquet":
+        stages.append(
+            Stage(
+                "convert_to_parquet",
+                convert_to_parquet.main,
+                [load_after],
+                inputs=load_inputs,
+            )
+        )
+        load_after, load_inputs = "convert_to_parquet", [f"{PARQUET_DIR}/*.parquet"]
+    stages.append(
+        Stage(
+            "populate_database",
+            populate_database.main,
+            [load_after],
+            inputs=load_inputs,
+            settings={
+                "db": f"{DB_HOST}/{DB_NAME}",
+                "input_mode": ETL_INPUT_MODE,
+                "bulk": ETL_BULK_MODE,
+                "partitioned": ETL_PARTITIONED,
+            },
+        )
+    )
+    return stages
 
 
 if __name__ == "__main__":
-    scraper_gov_docs.main()
-    extract_tables_pdf.main()
-    scraper_operators_docs.main()
-    populate_database.main()
+    stages = build_stages()
+    parser = argparse.ArgumentParser(description="Intuitive challenge pipeline")
+    parser.add_argument(
+        "--stage",
+        action="append",
+        choices=[stage.name for stage in stages],
+        help="run only this stage, even if its inputs did not change (repeatable)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="run every stage, ignoring the saved inputs"
+    )
+    parser.add_argument(
+        "--max-parallel", type=int, default=None, help="stages running at the same time"
+    )
+    args = parser.parse_args()
+
+    results = Pipeline(stages, PIPELINE_STATE, log).run(
+        args.stage, args.force, args.max_parallel
+    )
+    if any(result["status"] in ("failed", "blocked") for result in results.values()):
+        raise SystemExit(1)
@@ -0,0 +1,82 @@
+from settings import logger, DIR_DATA, PARQUET_DIR, ETL_CHUNKSIZE
+import os
+import time
+from scripts.populate_database import (
+    OPERADORAS_FILE,
+    extract_data,
+    file_hash,
+    list_sources,
+    open_source,
+    parquet_path,
+    transform_data,
+)
+from utils.parquet_store import parquet_metadata, write_parquet
+
+log = logger(__file__)
+
+VALUE_COLUMNS = ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"]
+
+
+def convert_file(
+    file: str,
+    path: str,
+    member: str | None = None,
+    parquet_dir: str = PARQUET_DIR,
+    value_columns: list[str] | None = None,
+    chunksize: int = ETL_CHUNKSIZE,
+) -> str:
+    """
+    Convert a source csv into a typed Parquet file, unless the existing
+    conversion was made from the same content
+
+    Args:
+        file (str): source file name
+        path (str): file path
+        member (str, optional): zip member. Defaults to None.
+        parquet_dir (str, optional): output folder. Defaults to PARQUET_DIR.
+        value_columns (list[str] | None, optional): see transform_data. Defaults to None.
+        chunksize (int, optional): rows per row group. Defaults to ETL_CHUNKSIZE.
+
+    Returns:
+        str: parquet file path
+    """
+    output = parquet_path(file, parquet_dir)
+    source_hash = file_hash(path, member)
+    if (
+        os.path.exists(output)
+        and parquet_metadata(output).get("source_sha256") == source_hash
+    ):
+        log.info(f"{file} unchanged since its conversion. Skipping.")
+        return output
+
+    start = time.perf_counter()
+    with open_source(path, member) as source:
+        rows = write_parquet(
+            (
+                transform_data(df, value_columns)
+                for df in extract_data(source, chunksize)
+            ),
+            output,
+            {"source": file, "source_sha256": source_hash},
+        )
+    size = os.path.getsize(output) / 2**20
+    log.info(
+        f"{file} converted to {output} ({rows} rows, {size:.1f} MiB) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    return output
+
+
+def main(dir_data: str = DIR_DATA, parquet_dir: str = PARQUET_DIR):
+    os.makedirs(parquet_dir, exist_ok=True)
+    convert_file(
+        OPERADORAS_FILE, f"{dir_data}/{OPERADORAS_FILE}", parquet_dir=parquet_dir
+    )
+    # the quarterly files are read from the zips when they were not extracted
+    sources = list_sources(dir_data, "zip") or list_sources(dir_data, "csv")
+    for file, path, member in sources:
+        convert_file(file, path, member, parquet_dir, VALUE_COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
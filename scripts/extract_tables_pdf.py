@@ -1,8 +1,18 @@
 import os
-from settings import logger
+import csv
+from settings import (
+    logger,
+    EXTRACT_WORKERS,
+    EXTRACT_STREAMING,
+    EXTRACT_CACHE_DIR,
+)
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Iterator
 import pdfplumber
 import pandas as pd
 from utils.file_handler import compress_file
+from utils.page_cache import PageTableCache
 
 log = logger(__file__)
 
@@ -11,9 +21,163 @@ PATH_FILE = f"{DIR_DATA}/Anexo_I_Rol_2021RN_465.2021_RN627L.2024.pdf"
 FILENAME_ZIP = "./data/tables_ans"
 
 
+Table = list[list[str | None]]
+
+
+def _extract_pages(pdf_path: str, page_numbers: list[int]) -> list[list[Table]]:
+    """
+    Extract the tables of some pages, opening the pdf independently so it
+    can run in a worker process
+
+    Args:
+        pdf_path (str): file path
+        page_numbers (list[int]): zero-based page numbers
+
+    Returns:
+        list[list[Table]]: tables of each page, in the given order
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return [pdf.pages[number].extract_tables() for number in page_numbers]
+
+
+def _iter_extracted(
+    pdf: pdfplumber.PDF, pdf_path: str, page_numbers: list[int], workers: int
+) -> Iterator[list[Table]]:
+    """
+    Extract the tables of the given pages, in the given order
+
+    Args:
+        pdf (pdfplumber.PDF): pdf already opened, used by the serial path
+        pdf_path (str): file path, opened again by each worker
+        page_numbers (list[int]): zero-based page numbers
+        workers (int): worker processes, 1 extracts in this process
+
+    Yields:
+        list[Table]: tables of one page
+    """
+    if workers <= 1:
+        for number in page_numbers:
+            yield pdf.pages[number].extract_tables()
+        return
+
+    # contiguous page ranges, several per worker to balance uneven pages
+    size = max(1, len(page_numbers) // (workers * 4))
+    ranges = [
+        page_numbers[start : start + size]
+        for start in range(0, len(page_numbers), size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for pages in executor.map(_extract_pages, repeat(pdf_path), ranges):
+            yield from pages
+
+
+def iter_page_tables(
+    pdf_path: str, workers: int = 1, cache_dir: str | None = None
+) -> Iterator[list[Table]]:
+    """
+    Extract the tables of every page, in page order
+
+    Args:
+        pdf_path (str): file path
+        workers (int, optional): worker processes, 1 extracts in this process. Defaults to 1.
+        cache_dir (str, optional): page cache folder, unchanged pages are read
+        from it instead of being extracted again. Defaults to None.
+
+    Yields:
+        list[Table]: tables of one page
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        if not cache_dir and workers <= 1:
+            for page in pdf.pages:
+                yield page.extract_tables()
+            return
+
+        cache = PageTableCache(cache_dir) if cache_dir else None
+        hits = 0
+        if workers <= 1:
+            # one page at a time: key, cache lookup, extraction
+            for page in pdf.pages:
+                key = cache.key(page)
+                tables = cache.get(key)
+                if tables is None:
+                    tables = page.extract_tables()
+                    cache.put(key, tables)
+                else:
+                    hits += 1
+                yield tables
+            log.info(f"Page cache: {hits} hits, {len(pdf.pages) - hits} misses")
+            return
+
+        # the workers need the missing pages up front, only the keys are kept,
+        # the cached tables are read when their page is reached
+        keys = [cache.key(page) if cache else None for page in pdf.pages]
+        cached = {number for number, key in enumerate(keys) if cache and cache.has(key)}
+        if cache:
+            log.info(f"Page cache: {len(cached)} hits, {len(keys) - len(cached)} misses")
+
+        missing = [number for number in range(len(keys)) if number not in cached]
+        extracted = _iter_extracted(pdf, pdf_path, missing, workers)
+        for number, key in enumerate(keys):
+            if number in cached:
+                tables = cache.get(key)
+                if tables is None:  # entry removed since the lookup
+                    tables = pdf.pages[number].extract_tables()
+                yield tables
+                continue
+            tables = next(extracted)
+            if cache:
+                cache.put(key, tables)
+            yield tables
+
+
+def write_tables_csv(
+    page_tables: Iterator[list[Table]],
+    output_file: str,
+    replace_column_names: dict[str, str],
+) -> int:
+    """
+    Append the rows of each page to the csv as soon as the page is extracted.
+    The first row of the first table is the header, as in the DataFrame path
+
+    Args:
+        page_tables (Iterator[list[Table]]): tables of each page, in page order
+        output_file (str): file output path
+        replace_column_names (dict[str, str]): columns to be renamed
+
+    Returns:
+        int: number of data rows written
+    """
+    n_rows = 0
+    header: list | None = None
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        for page_number, tables in enumerate(page_tables, start=1):
+            for table in tables:
+                rows = iter(table)
+                if header is None:
+                    header = [
+                        replace_column_names.get(column, column)
+                        for column in next(rows, [])
+                    ]
+                    writer.writerow(header)
+                for row in rows:
+                    if len(row) < len(header):
+                        row = row + [None] * (len(header) - len(row))
+                    writer.writerow(row)
+                    n_rows += 1
+            f.flush()
+            log.debug(f"Page {page_number}: {len(tables)} tables, {n_rows} rows written")
+    return n_rows
+
+
 def extract_tables_pdf(
-    pdf_path: str, output_file: str, replace_column_names: dict[str, str]
-) -> None:
+    pdf_path: str,
+    output_file: str,
+    replace_column_names: dict[str, str],
+    workers: int = 1,
+    stream: bool = False,
+    cache_dir: str | None = None,
+) -> bool:
     # TODO: estudar se posso melhorar o desempenho e ver se consigo usar a lib polar para aumentar performance
     """
     Extract tables from pdf
@@ -21,16 +185,31 @@ def extract_tables_pdf(
     Args:
         pdf_path (str): file path
         output_file (str): file output path
+        replace_column_names (dict[str, str]): columns to be renamed
+        workers (int, optional): worker processes splitting the pages. Defaults to 1.
+        stream (bool, optional): write the rows page by page instead of building
+        a single DataFrame, keeping memory constant. Defaults to False.
+        cache_dir (str, optional): per-page extraction cache folder. Defaults to None.
+
+    Returns:
+        bool: True when the tables were extracted
     """
     try:
+        if stream:
+            n_rows = write_tables_csv(
+                iter_page_tables(pdf_path, workers, cache_dir),
+                output_file,
+                replace_column_names,
+            )
+            log.info(f"Tables extracted successfully ({n_rows} rows)")
+            return True
+
         list_tables = []
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                for table in tables:
-                    df = pd.DataFrame(table)
-                    list_tables.append(df)
-                    log.debug(df)
+        for tables in iter_page_tables(pdf_path, workers, cache_dir):
+            for table in tables:
+                df = pd.DataFrame(table)
+                list_tables.append(df)
+                log.debug(df)
 
         end_df = pd.concat(list_tables, ignore_index=True)
         end_df.columns = end_df.iloc[0]
@@ -38,22 +217,31 @@ def extract_tables_pdf(
         end_df = end_df.rename(columns=replace_column_names)
         end_df.to_csv(output_file, index=False, header=True)
         log.info("Tables extracted successfully")
+        return True
     except Exception as e:
         log.error(e)
+        return False
 
 
 def main(
     dir_data: str = DIR_DATA,
     path_doc_extract: str = PATH_FILE,
     filename_zip: str = FILENAME_ZIP,
-):
+) -> bool:
     os.makedirs(dir_data, exist_ok=True)
-    extract_tables_pdf(
+    extracted = extract_tables_pdf(
         path_doc_extract,
         f"{dir_data}/tables_ans.csv",
         {"OD": "Seg. Odontológica", "AMB": "Seg. Ambulatorial"},
+        EXTRACT_WORKERS,
+        EXTRACT_STREAMING,
+        EXTRACT_CACHE_DIR,
     )
-    compress_file(dir_data, filename_zip, [".csv"])
+    if not extracted:
+        return False
+    # the quarterly csv files of the other pipeline branch share the folder
+    compress_file(dir_data, filename_zip, [".csv"], ["tables_ans.csv"])
+    return True
 
 
 if __name__ == "__main__":
@@ -0,0 +1,291 @@
+from settings import (
+    logger,
+    DIR_DATA,
+    PARQUET_DIR,
+    ACCOUNT_CATEGORIES,
+    DB_HOST,
+    DB_NAME,
+    DB_PASSWORD,
+    DB_USER,
+)
+from datetime import date
+import os
+import sys
+import pymysql
+from pymysql.cursors import Cursor
+from scripts import reports
+from scripts.populate_database import (
+    OPERADORAS_FILE,
+    list_sources,
+    normalize_text,
+    parquet_path,
+)
+from scripts.reports import EVENTOS_SINISTROS
+
+try:
+    import duckdb
+except ImportError:  # optional, only the reports without db need it
+    duckdb = None
+
+log = logger(__file__)
+
+# same reports as scripts/reports.py, over the despesas view of connect()
+QUERY_TOP_EXPENSES = """
+    SELECT
+        razao_social,
+        nome_fantasia,
+        SUM(vl_saldo_final) AS total_despesas
+    FROM
+        despesas
+    WHERE
+        categoria = $categoria
+        AND data >= {inicio}
+        AND data <= {fim}
+    GROUP BY
+        razao_social, nome_fantasia
+    HAVING
+        SUM(vl_saldo_final) > 0
+    ORDER BY
+        total_despesas DESC
+    LIMIT $limit;
+"""
+
+LAST_DATE = "(SELECT MAX(data) FROM despesas)"
+
+
+def sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def connect(
+    dir_data: str = DIR_DATA, parquet_dir: str = PARQUET_DIR, threads: int | None = None
+) -> "duckdb.DuckDBPyConnection":
+    """
+    In-memory DuckDB connection with a despesas view over the downloaded
+    files, the converted Parquet files when there are any and the extracted
+    csv files otherwise. The view applies the rules of the db load: only
+    rows of known operators, values as DECIMAL and the account categories
+    of ACCOUNT_CATEGORIES
+
+    Args:
+        dir_data (str, optional): data folder. Defaults to DIR_DATA.
+        parquet_dir (str, optional): converted files folder. Defaults to PARQUET_DIR.
+        threads (int, optional): DuckDB threads. Defaults to every core.
+
+    Raises:
+        ImportError: duckdb is not installed
+        FileNotFoundError: no quarterly file to read
+
+    Returns:
+        duckdb.DuckDBPyConnection: connection
+    """
+    if duckdb is None:
+        raise ImportError(
+            "duckdb is required by the local reports, install it with `uv sync --extra local`"
+        )
+    con = duckdb.connect()
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+
+    operadoras_parquet = parquet_path(OPERADORAS_FILE, parquet_dir)
+    if os.path.exists(operadoras_parquet):
+        paths = [path for _, path, _ in list_sources(dir_data, "parquet", parquet_dir)]
+        operadoras = f"read_parquet({sql_literal(operadoras_parquet)})"
+        demonstracoes = f"""
+            SELECT DATA AS data, REG_ANS AS reg_ans, DESCRICAO AS descricao,
+                CAST(VL_SALDO_FINAL AS DECIMAL(15,2)) AS vl_saldo_final
+            FROM read_parquet([{", ".join(map(sql_literal, paths))}])"""
+    else:
+        paths = [path for _, path, _ in list_sources(dir_data, "csv")]
+        csv_options = "delim = ';', quote = '\"', header = true, all_varchar = true"
+        operadoras = (
+            f"read_csv({sql_literal(f'{dir_data}/{OPERADORAS_FILE}')}, {csv_options})"
+        )
+        demonstracoes = f"""
+            SELECT
+                CAST(try_strptime(DATA, ['%Y-%m-%d', '%d/%m/%Y']) AS DATE) AS data,
+                REG_ANS AS reg_ans,
+                DESCRICAO AS descricao,
+                TRY_CAST(
+                    replace(replace(VL_SALDO_FINAL, '.', ''), ',', '.') AS DECIMAL(15,2)
+                ) AS vl_saldo_final
+            FROM read_csv([{", ".join(map(sql_literal, paths))}], {csv_options})"""
+    if not paths:
+        raise FileNotFoundError(
+            f"No quarterly files in {parquet_dir} or {dir_data}, the local "
+            "reports need the extracted csv files or convert_to_parquet"
+        )
+
+    # same case and accent insensitive match as AccountDimension.classify
+    cases = " ".join(
+        f"WHEN strip_accents(upper(d.descricao)) "
+        f"LIKE {sql_literal(normalize_text(pattern))} THEN {sql_literal(categoria)}"
+        for categoria, pattern in ACCOUNT_CATEGORIES.items()
+    )
+    con.execute(
+        f"""CREATE VIEW despesas AS
+        SELECT
+            d.data,
+            d.reg_ans,
+            CASE {cases} END AS categoria,
+            d.vl_saldo_final,
+            o.Razao_Social AS razao_social,
+            o.Nome_Fantasia AS nome_fantasia
+        FROM ({demonstracoes}) d
+        JOIN {operadoras} o ON d.reg_ans = o.Registro_ANS"""
+    )
+    log.info(f"Local reports over {len(paths)} quarterly files")
+    return con
+
+
+def _fetch(con: "duckdb.DuckDBPyConnection", query: str, params: dict) -> list[dict]:
+    result = con.execute(query, params)
+    columns = [column[0] for column in result.description]
+    return [dict(zip(columns, row)) for row in result.fetchall()]
+
+
+def top_expenses(
+    con: "duckdb.DuckDBPyConnection",
+    start: date,
+    end: date,
+    categoria: str = EVENTOS_SINISTROS,
+    limit: int = 10,
+) -> list[dict]:
+    """
+    Operators with the highest expenses of an account category in a period
+
+    Args:
+        con (duckdb.DuckDBPyConnection): connection from connect
+        start (date): first day of the period
+        end (date): last day of the period
+        categoria (str, optional): account category. Defaults to EVENTOS_SINISTROS.
+        limit (int, optional): number of operators. Defaults to 10.
+
+    Returns:
+        list[dict]: razao_social, nome_fantasia and total_despesas
+    """
+    query = QUERY_TOP_EXPENSES.format(inicio="$inicio", fim="$fim")
+    return _fetch(
+        con, query, {"categoria": categoria, "inicio": start, "fim": end, "limit": limit}
+    )
+
+
+def top_expenses_last_quarter(
+    con: "duckdb.DuckDBPyConnection", categoria: str = EVENTOS_SINISTROS, limit: int = 10
+) -> list[dict]:
+    """
+    Operators with the highest expenses in the last quarter, same window as
+    reports.top_expenses_last_quarter
+
+    Args:
+        con (duckdb.DuckDBPyConnection): connection from connect
+        categoria (str, optional): account category. Defaults to EVENTOS_SINISTROS.
+        limit (int, optional): number of operators. Defaults to 10.
+
+    Returns:
+        list[dict]: razao_social, nome_fantasia and total_despesas
+    """
+    query = QUERY_TOP_EXPENSES.format(
+        inicio=f"CAST({LAST_DATE} - INTERVAL 3 MONTH AS DATE)", fim=LAST_DATE
+    )
+    return _fetch(con, query, {"categoria": categoria, "limit": limit})
+
+
+def top_expenses_last_year(
+    con: "duckdb.DuckDBPyConnection", categoria: str = EVENTOS_SINISTROS, limit: int = 10
+) -> list[dict]:
+    """
+    Operators with the highest expenses in the last year, same window as
+    reports.top_expenses_last_year
+
+    Args:
+        con (duckdb.DuckDBPyConnection): connection from connect
+        categoria (str, optional): account category. Defaults to EVENTOS_SINISTROS.
+        limit (int, optional): number of operators. Defaults to 10.
+
+    Returns:
+        list[dict]: razao_social, nome_fantasia and total_despesas
+    """
+    query = QUERY_TOP_EXPENSES.format(
+        inicio=f"make_date(year({LAST_DATE}) - 1, 1, 1)",
+        fim=f"make_date(year({LAST_DATE}), 12, 31)",
+    )
+    return _fetch(con, query, {"categoria": categoria, "limit": limit})
+
+
+def same_report(local: list[dict], sql: list[dict]) -> bool:
+    """
+    Compare a local report with its db version. Operators with the same
+    total may come in any order, so rows are compared as sorted lists
+
+    Args:
+        local (list[dict]): rows of a report of this module
+        sql (list[dict]): rows of the same report of scripts/reports.py
+
+    Returns:
+        bool: True when both have the same operators and totals
+    """
+
+    def rows(report: list[dict]) -> list[tuple]:
+        return sorted(
+            (row["razao_social"], row["nome_fantasia"], row["total_despesas"])
+            for row in report
+        )
+
+    return rows(local) == rows(sql)
+
+
+def verify(con: "duckdb.DuckDBPyConnection", cursor: Cursor) -> bool:
+    """
+    Check that the local reports match the reports of the loaded db
+
+    Args:
+        con (duckdb.DuckDBPyConnection): connection from connect
+        cursor (Cursor): an instance of courses from the db connection lib
+
+    Returns:
+        bool: True when every report matches
+    """
+    pairs = [
+        ("last quarter", top_expenses_last_quarter, reports.top_expenses_last_quarter),
+        ("last year", top_expenses_last_year, reports.top_expenses_last_year),
+    ]
+    matches = True
+    for name, local_report, sql_report in pairs:
+        if same_report(local_report(con), sql_report(cursor)):
+            log.info(f"Report of the {name}: local report matches the db")
+        else:
+            log.error(f"Report of the {name}: local report differs from the db")
+            matches = False
+    return matches
+
+
+def main(dir_data: str = DIR_DATA, parquet_dir: str = PARQUET_DIR) -> None:
+    con = connect(dir_data, parquet_dir)
+    try:
+        for report in [top_expenses_last_quarter, top_expenses_last_year]:
+            for row in report(con):
+                print(row)
+            print("=" * 100)
+
+        if "--verify" in sys.argv:
+            conn = pymysql.connect(
+                host=DB_HOST,
+                user=DB_USER,
+                password=DB_PASSWORD,
+                database=DB_NAME,
+                charset="utf8mb4",
+                cursorclass=pymysql.cursors.DictCursor,
+            )
+            try:
+                with conn.cursor() as cursor:
+                    if not verify(con, cursor):
+                        sys.exit(1)
+            finally:
+                conn.close()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,163 @@
-from settings import logger, DIR_DATA, DB_HOST, DB_NAME, DB_PASSWORD, DB_USER
+from settings import (
+    logger,
+    DIR_DATA,
+    DB_HOST,
+    DB_NAME,
+    DB_PASSWORD,
+    DB_USER,
+    ETL_INPUT_MODE,
+    PARQUET_DIR,
+    TABLE_LOAD_ENGINES,
+    LOAD_BATCH_SIZE,
+    ETL_CHUNKSIZE,
+    ETL_DTYPE_BACKEND,
+    ETL_WORKERS,
+    ETL_DB_CONNECTIONS,
+    REJECTS_DIR,
+    ETL_BULK_MODE,
+    ETL_PARTITIONED,
+    ACCOUNT_CATEGORIES,
+)
 import pymysql
 from pymysql.cursors import Cursor
 import pandas as pd
-from utils.file_handler import get_files
-import numpy as np
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
+from datetime import date
+from functools import partial
+from typing import IO, Callable, Iterable, Iterator
+from utils.file_handler import get_files, list_zip_members, open_zip_member
+from utils.bulk_load import LOAD_ENGINES
+from utils.parquet_store import parquet_metadata, read_parquet
+from scripts.reports import top_expenses_last_quarter, top_expenses_last_year
 
 log = logger(__file__)
 
-IGNORE_FILES = ["Relatorio_cadop.csv", "tables_ans.csv"]
-
-QUERY1 = """
-    -- 10 operadoras com maiores despesas no último trimestre
-    SELECT 
-        o.razao_social,
-        o.nome_fantasia,
-        SUM(d.vl_saldo_final) AS total_despesas
-    FROM 
-        demonstracoes_contabeis d
-    JOIN 
-        operadoras o ON d.reg_ans = o.registro_ans
-    WHERE 
-        d.descricao LIKE '%EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS  DE ASSIST%'
-        AND d.data >= DATE_SUB(
-            (SELECT MAX(data) FROM demonstracoes_contabeis), 
-            INTERVAL 3 MONTH
-        )
-    GROUP BY 
-        o.razao_social, o.nome_fantasia
-    HAVING 
-        total_despesas > 0
-    ORDER BY 
-        total_despesas DESC
-    LIMIT 10;
+OPERADORAS_FILE = "Relatorio_cadop.csv"
+IGNORE_FILES = [OPERADORAS_FILE, "tables_ans.csv"]
+# tables reloaded with INSERT ... ON DUPLICATE KEY UPDATE
+UPSERT_TABLES = {"operadoras"}
+
+STAGING_TABLE = "demonstracoes_contabeis_staging"
+
+# formats of the DATA column, tried in order
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y")
+
+DEMONSTRACOES_COLUMNS = """
+    id SERIAL PRIMARY KEY,
+    data DATE,
+    reg_ans VARCHAR(20),
+    cd_conta_contabil VARCHAR(50),
+    vl_saldo_inicial DECIMAL(15,2),
+    vl_saldo_final DECIMAL(15,2)
 """
 
-QUERY2 = """
-    -- 10 operadoras com maiores despesas no último ano
-    WITH ultimo_ano AS (
-        SELECT 
-            DATE_FORMAT(DATE_SUB(MAX(data), INTERVAL 1 YEAR), '%Y-01-01') AS inicio_ano,
-            DATE_FORMAT(MAX(data), '%Y-12-31') AS fim_ano
-        FROM demonstracoes_contabeis
-    )
-    SELECT 
-        o.razao_social,
-        o.nome_fantasia,
-        SUM(d.vl_saldo_final) AS total_despesas
-    FROM 
-        demonstracoes_contabeis d
-    JOIN 
-        operadoras o ON d.reg_ans = o.registro_ans
-    JOIN 
-        ultimo_ano p
-    WHERE 
-        d.descricao LIKE '%EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS  DE ASSIST%'
-        AND d.data >= p.inicio_ano
-        AND d.data <= p.fim_ano
-    GROUP BY 
-        o.razao_social, o.nome_fantasia
-    HAVING 
-        total_despesas > 0
-    ORDER BY 
-        total_despesas DESC
-    LIMIT 10;
-    
+# partitioned tables need the partition column in every unique key and cannot
+# have foreign keys, the operator registry checks reg_ans instead
+DEMONSTRACOES_PARTITIONED_COLUMNS = """
+    id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    data DATE NOT NULL,
+    reg_ans VARCHAR(20),
+    cd_conta_contabil VARCHAR(50),
+    vl_saldo_inicial DECIMAL(15,2),
+    vl_saldo_final DECIMAL(15,2),
+    PRIMARY KEY (id, data)
 """
 
+# last partition of a partitioned table, split as new quarters are loaded
+PARTITION_MAX = "PARTITION pmax VALUES LESS THAN (MAXVALUE)"
+
+# serializes the partition DDL of the loading threads
+partition_lock = threading.Lock()
 
-def create_db(cursor: Cursor, db_name: str) -> None:
+# secondary indexes of the account and date filters of refresh_aggregates,
+# (reg_ans, data) also backs the foreign key to operadoras
+DEMONSTRACOES_INDEXES = {
+    "idx_conta_data_reg_ans": "(cd_conta_contabil, data, reg_ans)",
+    "idx_data": "(data)",
+    "idx_reg_ans_data": "(reg_ans, data)",
+}
+
+# the primary key leads with categoria, idx_data lets refresh_aggregates
+# delete one quarter without scanning and locking the whole table
+AGREGADAS_INDEXES = {
+    "idx_data": "(data)",
+}
+
+# columns searched by the /search endpoint of app/backend, with an accent and
+# case insensitive collation that the ngram full-text indexes below follow
+SEARCH_COLLATION = "utf8mb4_0900_ai_ci"
+SEARCH_COLUMNS = {
+    "razao_social": "VARCHAR(255)",
+    "nome_fantasia": "VARCHAR(255)",
+    "cidade": "VARCHAR(100)",
+}
+OPERADORAS_SEARCH_INDEXES = {
+    "ft_nome": "(razao_social, nome_fantasia)",
+    "ft_cidade": "(cidade)",
+}
+
+
+def create_db(
+    cursor: Cursor, db_name: str, partitioned: bool = ETL_PARTITIONED
+) -> None:
     """
     Creates the operator and accounting statement tables of a database
 
     Args:
         cursor (Cursor): an instance of courses from the db connection lib
         db_name (str): database name
+        partitioned (bool, optional): create demonstracoes_contabeis with one
+        partition per quarter. Defaults to ETL_PARTITIONED.
 
     """
     try:
+        indexes = ", ".join(
+            f"INDEX {name} {columns}" for name, columns in DEMONSTRACOES_INDEXES.items()
+        )
+        if partitioned:
+            demonstracoes_sql = f"""CREATE TABLE IF NOT EXISTS demonstracoes_contabeis (
+                {DEMONSTRACOES_PARTITIONED_COLUMNS},
+                {indexes}
+            ) PARTITION BY RANGE COLUMNS(data) ({PARTITION_MAX});"""
+        else:
+            demonstracoes_sql = f"""CREATE TABLE IF NOT EXISTS demonstracoes_contabeis (
+                {DEMONSTRACOES_COLUMNS},
+                {indexes},
+                FOREIGN KEY (reg_ans) REFERENCES operadoras(registro_ans)
+            );"""
+        search_indexes = ", ".join(
+            f"FULLTEXT INDEX {name} {columns} WITH PARSER ngram"
+            for name, columns in OPERADORAS_SEARCH_INDEXES.items()
+        )
         schema_sql = [
             f"CREATE DATABASE IF NOT EXISTS {db_name};",
             f"USE {db_name};",
-            """CREATE TABLE IF NOT EXISTS operadoras (
+            f"""CREATE TABLE IF NOT EXISTS operadoras (
                 registro_ans VARCHAR(20) PRIMARY KEY,
                 cnpj VARCHAR(14),
-                razao_social VARCHAR(255),
-                nome_fantasia VARCHAR(255),
+                razao_social VARCHAR(255) COLLATE {SEARCH_COLLATION},
+                nome_fantasia VARCHAR(255) COLLATE {SEARCH_COLLATION},
                 modalidade VARCHAR(100),
                 logradouro VARCHAR(255),
                 numero VARCHAR(20),
                 complemento VARCHAR(100),
                 bairro VARCHAR(100),
-                cidade VARCHAR(100),
+                cidade VARCHAR(100) COLLATE {SEARCH_COLLATION},
                 uf VARCHAR(2),
                 cep VARCHAR(8),
                 ddd VARCHAR(2),
@@ -100,85 +167,526 @@ def create_db(cursor: Cursor, db_name: str) -> None:
                 representante VARCHAR(255),
                 cargo_representante VARCHAR(100),
                 Regiao_de_Comercializacao VARCHAR(100),
-                data_registro_ans DATE
+                data_registro_ans DATE,
+                INDEX idx_data_registro_ans (data_registro_ans),
+                {search_indexes}
+            );""",
+            """CREATE TABLE IF NOT EXISTS contas (
+                cd_conta_contabil VARCHAR(50) PRIMARY KEY,
+                descricao TEXT,
+                categoria VARCHAR(50),
+                INDEX idx_categoria (categoria)
             );""",
-            """CREATE TABLE IF NOT EXISTS demonstracoes_contabeis (
-                id SERIAL PRIMARY KEY,
+            demonstracoes_sql,
+            """CREATE TABLE IF NOT EXISTS despesas_agregadas (
+                categoria VARCHAR(50),
                 data DATE,
                 reg_ans VARCHAR(20),
-                cd_conta_contabil VARCHAR(50),
-                descricao TEXT,
-                vl_saldo_inicial DECIMAL(15,2),
-                vl_saldo_final DECIMAL(15,2),
-                FOREIGN KEY (reg_ans) REFERENCES operadoras(registro_ans)
+                total_despesas DECIMAL(18,2) NOT NULL,
+                PRIMARY KEY (categoria, data, reg_ans),
+                INDEX idx_data (data)
+            );""",
+            """CREATE TABLE IF NOT EXISTS arquivos_carregados (
+                arquivo VARCHAR(255) PRIMARY KEY,
+                hash CHAR(64) NOT NULL,
+                linhas INT NOT NULL,
+                carregado_em DATETIME NOT NULL
             );""",
         ]
 
         for query in schema_sql:
             cursor.execute(query)
+        # tables created before the contas dimension and the indexes existed
+        move_descricao_to_contas(cursor)
+        add_missing_indexes(cursor, "demonstracoes_contabeis")
+        add_missing_indexes(cursor, "despesas_agregadas", AGREGADAS_INDEXES)
+        add_search_indexes(cursor)
 
         log.info(f"Database {db_name} created sucessfully")
     except Exception as e:
         raise Exception(e)
 
 
-def extract_data(file_path: str) -> pd.DataFrame:
+def move_descricao_to_contas(cursor: Cursor) -> None:
+    """
+    Move the account descriptions of a demonstracoes_contabeis table created
+    before the contas dimension into it, then drop the descricao column and
+    its indexes. The categories are filled by AccountDimension.reclassify
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+    """
+    cursor.execute(
+        """SELECT DISTINCT index_name AS index_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE()
+            AND table_name = 'demonstracoes_contabeis'
+            AND column_name = 'descricao'"""
+    )
+    indexes = [row["index_name"] for row in cursor.fetchall()]
+    cursor.execute(
+        """SELECT COUNT(*) AS total
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+            AND table_name = 'demonstracoes_contabeis'
+            AND column_name = 'descricao'"""
+    )
+    if not cursor.fetchone()["total"]:
+        return
+
+    start = time.perf_counter()
+    cursor.execute(
+        """INSERT INTO contas (cd_conta_contabil, descricao)
+        SELECT cd_conta_contabil, MAX(descricao)
+        FROM demonstracoes_contabeis
+        WHERE cd_conta_contabil IS NOT NULL
+        GROUP BY cd_conta_contabil
+        ON DUPLICATE KEY UPDATE descricao = VALUES(descricao)"""
+    )
+    accounts = cursor.rowcount
+    drops = [f"DROP INDEX {name}" for name in indexes] + ["DROP COLUMN descricao"]
+    cursor.execute(f"ALTER TABLE demonstracoes_contabeis {', '.join(drops)}")
+    log.info(
+        f"{accounts} account descriptions moved to contas in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+
+def add_missing_indexes(
+    cursor: Cursor, table_name: str, indexes: dict[str, str] = DEMONSTRACOES_INDEXES
+) -> None:
+    """
+    Build the indexes that the table does not have yet, in a single ALTER TABLE
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        table_name (str): table name in db
+        indexes (dict[str, str], optional): index name -> columns. Defaults
+        to DEMONSTRACOES_INDEXES.
+    """
+    cursor.execute(
+        """SELECT DISTINCT index_name AS index_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s""",
+        (table_name,),
+    )
+    existing = {row["index_name"] for row in cursor.fetchall()}
+    missing = [
+        f"ADD INDEX {name} {columns}"
+        for name, columns in indexes.items()
+        if name not in existing
+    ]
+    if missing:
+        start = time.perf_counter()
+        cursor.execute(f"ALTER TABLE {table_name} {', '.join(missing)}")
+        log.info(
+            f"Indexes built on {table_name} in {time.perf_counter() - start:.1f}s"
+        )
+
+
+def add_search_indexes(cursor: Cursor) -> None:
+    """
+    Bring an operadoras table created before the search indexes up to date:
+    switch the searched columns to SEARCH_COLLATION and build the missing
+    ngram full-text indexes and the data_registro_ans index used to sort
+    the results. Only the searched columns are converted, registro_ans keeps
+    its collation so the foreign key of demonstracoes_contabeis still matches
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+    """
+    cursor.execute(
+        """SELECT column_name AS column_name, collation_name AS collation_name
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'operadoras'"""
+    )
+    collations = {row["column_name"]: row["collation_name"] for row in cursor.fetchall()}
+    cursor.execute(
+        """SELECT DISTINCT index_name AS index_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'operadoras'"""
+    )
+    existing = {row["index_name"] for row in cursor.fetchall()}
+
+    changes = [
+        f"MODIFY {column} {column_type} COLLATE {SEARCH_COLLATION}"
+        for column, column_type in SEARCH_COLUMNS.items()
+        if collations.get(column) != SEARCH_COLLATION
+    ]
+    if "idx_data_registro_ans" not in existing:
+        changes.append("ADD INDEX idx_data_registro_ans (data_registro_ans)")
+    if changes:
+        cursor.execute(f"ALTER TABLE operadoras {', '.join(changes)}")
+    # InnoDB builds a single full-text index per ALTER TABLE
+    for name, columns in OPERADORAS_SEARCH_INDEXES.items():
+        if name not in existing:
+            start = time.perf_counter()
+            cursor.execute(
+                f"ALTER TABLE operadoras ADD FULLTEXT INDEX {name} {columns} "
+                "WITH PARSER ngram"
+            )
+            log.info(
+                f"Search index {name} built on operadoras in "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+
+
+def create_staging_table(cursor: Cursor, partitioned: bool = False) -> None:
+    """
+    Create an empty staging table for a bulk load, with no foreign key, no
+    secondary index and no partitions so inserts only touch the primary key
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        partitioned (bool, optional): use the columns of a partitioned table,
+        see swap_staging_table. Defaults to False.
+    """
+    columns = DEMONSTRACOES_PARTITIONED_COLUMNS if partitioned else DEMONSTRACOES_COLUMNS
+    cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+    cursor.execute(f"CREATE TABLE {STAGING_TABLE} ({columns})")
+    log.info(f"Staging table {STAGING_TABLE} created")
+
+
+def swap_staging_table(cursor: Cursor, partitioned: bool = False) -> None:
+    """
+    Index and validate the staging table, then swap it into place of
+    demonstracoes_contabeis with an atomic RENAME TABLE
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        partitioned (bool, optional): partition the staging table by quarter
+        instead of adding the foreign key. Defaults to False.
+
+    Raises:
+        Exception: staging rows reference operators that do not exist
+    """
+    add_missing_indexes(cursor, STAGING_TABLE)
+
+    cursor.execute(
+        f"""SELECT COUNT(*) AS total, SUM(o.registro_ans IS NULL) AS orfaos
+        FROM {STAGING_TABLE} d
+        LEFT JOIN operadoras o ON d.reg_ans = o.registro_ans"""
+    )
+    counts = cursor.fetchone()
+    if counts["orfaos"]:
+        raise Exception(
+            f"{counts['orfaos']} staging records reference unknown operators"
+        )
+
+    if partitioned:
+        cursor.execute(
+            f"SELECT MIN(data) AS inicio, MAX(data) AS fim FROM {STAGING_TABLE}"
+        )
+        bounds = cursor.fetchone()
+        quarters = (
+            quarter_range(quarter_start(bounds["inicio"]), quarter_start(bounds["fim"]))
+            if bounds["inicio"]
+            else []
+        )
+        partitions = ", ".join(partition_clauses(quarters) + [PARTITION_MAX])
+        cursor.execute(
+            f"ALTER TABLE {STAGING_TABLE} PARTITION BY RANGE COLUMNS(data) ({partitions})"
+        )
+    else:
+        # already validated above, so the constraint is added without a new scan
+        cursor.execute("SET foreign_key_checks = 0")
+        try:
+            cursor.execute(
+                f"""ALTER TABLE {STAGING_TABLE}
+                ADD FOREIGN KEY (reg_ans) REFERENCES operadoras(registro_ans)"""
+            )
+        finally:
+            cursor.execute("SET foreign_key_checks = 1")
+
+    cursor.execute("DROP TABLE IF EXISTS demonstracoes_contabeis_old")
+    cursor.execute(
+        f"""RENAME TABLE
+            demonstracoes_contabeis TO demonstracoes_contabeis_old,
+            {STAGING_TABLE} TO demonstracoes_contabeis"""
+    )
+    cursor.execute("DROP TABLE demonstracoes_contabeis_old")
+    log.info(f"Staging table swapped in with {counts['total']} records")
+
+
+def quarter_start(day: date) -> date:
+    return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+
+
+def next_quarter(start: date) -> date:
+    if start.month == 10:
+        return date(start.year + 1, 1, 1)
+    return date(start.year, start.month + 3, 1)
+
+
+def quarter_range(first: date, last: date) -> list[date]:
+    """
+    Quarters from first to last, both included
+
+    Args:
+        first (date): first day of the first quarter
+        last (date): first day of the last quarter
+
+    Returns:
+        list[date]: first day of each quarter
+    """
+    quarters = []
+    while first <= last:
+        quarters.append(first)
+        first = next_quarter(first)
+    return quarters
+
+
+def partition_name(start: date) -> str:
+    return f"p{start.year}q{(start.month - 1) // 3 + 1}"
+
+
+def partition_clauses(quarters: list[date]) -> list[str]:
+    return [
+        f"PARTITION {partition_name(start)} VALUES LESS THAN ('{next_quarter(start)}')"
+        for start in quarters
+    ]
+
+
+def list_partitions(
+    cursor: Cursor, table_name: str = "demonstracoes_contabeis"
+) -> list[str]:
     """
-    extract data from csv file
+    Partitions of a table, in range order
 
     Args:
-        file_path (str): file path
+        cursor (Cursor): an instance of courses from the db connection lib
+        table_name (str, optional): table name in db. Defaults to "demonstracoes_contabeis".
+
+    Returns:
+        list[str]: partition names, empty for a table without partitions
+    """
+    cursor.execute(
+        """SELECT partition_name AS partition_name
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE()
+            AND table_name = %s
+            AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position""",
+        (table_name,),
+    )
+    return [row["partition_name"] for row in cursor.fetchall()]
+
+
+def ensure_partitions(
+    cursor: Cursor,
+    quarters: Iterable[date],
+    table_name: str = "demonstracoes_contabeis",
+) -> None:
+    """
+    Add the missing quarter partitions, keeping one partition per quarter
+    from the first to the last loaded one. Later quarters are split from
+    pmax, which is empty so the split only changes metadata, earlier ones
+    from the first partition
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        quarters (Iterable[date]): first day of the quarters to be loaded
+        table_name (str, optional): table name in db. Defaults to "demonstracoes_contabeis".
+    """
+    quarters = sorted(quarters)
+    if not quarters:
+        return
+    existing = [
+        date(int(name[1:5]), (int(name[6]) - 1) * 3 + 1, 1)
+        for name in list_partitions(cursor, table_name)
+        if name != "pmax"
+    ]
+
+    reorganize = []
+    if not existing:
+        new = quarter_range(quarters[0], quarters[-1])
+        reorganize.append(("pmax", partition_clauses(new) + [PARTITION_MAX]))
+    else:
+        if quarters[-1] > existing[-1]:
+            new = quarter_range(next_quarter(existing[-1]), quarters[-1])
+            reorganize.append(("pmax", partition_clauses(new) + [PARTITION_MAX]))
+        if quarters[0] < existing[0]:
+            new = quarter_range(quarters[0], existing[0])
+            reorganize.append((partition_name(existing[0]), partition_clauses(new)))
+
+    for partition, clauses in reorganize:
+        cursor.execute(
+            f"""ALTER TABLE {table_name} REORGANIZE PARTITION {partition}
+            INTO ({", ".join(clauses)})"""
+        )
+        log.info(f"Partition {partition} of {table_name} split into {len(clauses)}")
+
+
+def create_exchange_table(cursor: Cursor, file: str) -> str:
+    """
+    Create an empty table with the structure of a partition of
+    demonstracoes_contabeis, where a file is loaded before being exchanged
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        file (str): source file name
+
+    Returns:
+        str: table name
+    """
+    stem = re.sub(r"\W", "_", os.path.splitext(file)[0]).lower()
+    table_name = f"{STAGING_TABLE}_{stem}"
+    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+    cursor.execute(f"CREATE TABLE {table_name} LIKE demonstracoes_contabeis")
+    cursor.execute(f"ALTER TABLE {table_name} REMOVE PARTITIONING")
+    return table_name
+
+
+def exchange_partition(cursor: Cursor, exchange_table: str) -> set[str]:
+    """
+    Replace the quarter of demonstracoes_contabeis loaded in the exchange
+    table by swapping it with the quarter partition, the previous rows end
+    up in the exchange table. A file with several quarters falls back to
+    deleting and copying its quarters
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        exchange_table (str): loaded table from create_exchange_table
+
+    Returns:
+        set[str]: replaced dates
+    """
+    cursor.execute(f"SELECT DISTINCT data FROM {exchange_table}")
+    dates = {row["data"] for row in cursor.fetchall()}
+    if not dates:
+        return set()
+    quarters = {quarter_start(day) for day in dates}
+    replaced = {day.isoformat() for day in dates}
+
+    with partition_lock:
+        ensure_partitions(cursor, quarters)
+        if len(quarters) == 1:
+            partition = partition_name(quarters.pop())
+            # every row was checked to be in the quarter above
+            cursor.execute(
+                f"""ALTER TABLE demonstracoes_contabeis
+                EXCHANGE PARTITION {partition} WITH TABLE {exchange_table}
+                WITHOUT VALIDATION"""
+            )
+            log.info(f"Partition {partition} replaced by {exchange_table}")
+            return replaced
+
+    placeholders = ", ".join(["%s"] * len(replaced))
+    cursor.execute(
+        f"DELETE FROM demonstracoes_contabeis WHERE data IN ({placeholders})",
+        sorted(replaced),
+    )
+    columns = "data, reg_ans, cd_conta_contabil, vl_saldo_inicial, vl_saldo_final"
+    cursor.execute(
+        f"""INSERT INTO demonstracoes_contabeis ({columns})
+        SELECT {columns} FROM {exchange_table}"""
+    )
+    log.info(f"{cursor.rowcount} records of {sorted(replaced)} copied")
+    return replaced
+
+
+def extract_data(
+    file_path: str | IO[bytes],
+    chunksize: int | None = None,
+    dtype_backend: str = ETL_DTYPE_BACKEND,
+) -> pd.DataFrame | Iterator[pd.DataFrame]:
+    """
+    extract data from csv file. Every column is kept as text, transform_data
+    parses the values and dates so a malformed value does not fail the whole
+    file. A .parquet path is read as already typed by
+    scripts/convert_to_parquet.py
+
+    Args:
+        file_path (str | IO[bytes]): file path or binary stream of the csv
+        chunksize (int, optional): rows per chunk, returns an iterator of
+        DataFrames instead of a single one. Defaults to None.
+        dtype_backend (str, optional): "numpy" or "pyarrow". Defaults to ETL_DTYPE_BACKEND.
 
     Raises:
         Exception: Error in extract_data
 
     Returns:
-        pd.DataFrame: DataFrame
+        pd.DataFrame | Iterator[pd.DataFrame]: DataFrame or chunks of it
     """
     try:
+        if isinstance(file_path, str) and file_path.endswith(".parquet"):
+            return read_parquet(file_path, chunksize, dtype_backend=dtype_backend)
+
+        arrow = dtype_backend == "pyarrow"
+        if arrow and importlib.util.find_spec("pyarrow") is None:
+            log.warning("pyarrow is not installed, using numpy dtypes")
+            arrow = False
+
         df = pd.read_csv(
             file_path,
             sep=";",
-            decimal=",",
             quotechar='"',
-            dtype=str,
+            dtype="string[pyarrow]" if arrow else str,
             encoding="utf-8",
+            chunksize=chunksize,
         )
         return df
     except Exception as e:
-        log.error("Error in extract_data: {str(e)}")
+        log.error(f"Error in extract_data: {str(e)}")
         raise Exception(e)
 
 
+def parse_dates(values: pd.Series, formats: tuple[str, ...] = DATE_FORMATS) -> pd.Series:
+    """
+    Parse dates with explicit formats, each format only parses the values
+    the previous ones could not
+
+    Args:
+        values (pd.Series): dates as text
+        formats (tuple[str, ...], optional): accepted formats. Defaults to DATE_FORMATS.
+
+    Returns:
+        pd.Series: datetime64 values, NaT for invalid dates
+    """
+    parsed = pd.to_datetime(values, format=formats[0], errors="coerce")
+    for date_format in formats[1:]:
+        missing = parsed.isna() & values.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(
+            values[missing], format=date_format, errors="coerce"
+        )
+    return parsed
+
+
 def transform_data(df: pd.DataFrame, value_columns: list[str]) -> pd.DataFrame:
     """
-    Formats dataframe data
+    Formats dataframe data. Missing values are kept as NaN/NaT, the load
+    engines convert them to NULL
 
     Args:
         df (pd.DataFrame): DataFrame
-        value_columns (list[str]): Receives a list of column names of real values ​​to swap "," or "."
+        value_columns (list[str]): Receives a list of column names of real
+        values in the 1.234,56 format, malformed values become NaN
 
     Raises:
         Exception: Error in transform_data
 
     Returns:
-        pd.DataFrame: _description_
+        pd.DataFrame: DataFrame with numeric value columns and a datetime DATA column
     """
     try:
         if value_columns:
             for col in value_columns:
-                if col not in df.columns:
+                if col not in df.columns or pd.api.types.is_numeric_dtype(df[col]):
                     continue
-                df[col] = df[col].str.replace(".", "", regex=False)
-                df[col] = df[col].str.replace(",", ".", regex=False)
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        if "DATA" in df.columns:
-            df["DATA"] = pd.to_datetime(df["DATA"], errors="coerce").dt.strftime(
-                "%Y-%m-%d"
-            )
+                values = df[col].str.replace(".", "", regex=False)
+                values = values.str.replace(",", ".", regex=False)
+                parsed = pd.to_numeric(values, errors="coerce")
+                coerced = int((parsed.isna() & values.notna()).sum())
+                if coerced:
+                    log.warning(f"{coerced} malformed values of {col} loaded as NULL")
+                df[col] = parsed
 
-        df = df.replace({np.nan: None})
+        if "DATA" in df.columns and not pd.api.types.is_datetime64_any_dtype(
+            df["DATA"]
+        ):
+            df["DATA"] = parse_dates(df["DATA"])
 
         return df
     except Exception as e:
@@ -186,84 +694,898 @@ def transform_data(df: pd.DataFrame, value_columns: list[str]) -> pd.DataFrame:
         raise Exception(e)
 
 
-def load_in_db(cursor: Cursor, df: pd.DataFrame, table_name: str) -> None:
+class OperatorRegistry:
+    """
+    Registro ANS of the loaded operators, built once per run and shared by
+    every file, chunk and loading thread. Rows of unknown operators are
+    written to a reject file per source file instead of being dropped
+    """
+
+    def __init__(self, rejects_dir: str = REJECTS_DIR):
+        """
+        Args:
+            rejects_dir (str, optional): folder of the reject files. Defaults to REJECTS_DIR.
+        """
+        self.rejects_dir = rejects_dir
+        self.registros: frozenset[str] = frozenset()
+        self.rejected: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, cursor: Cursor) -> None:
+        """
+        Reload the registry, must be called after operadoras is loaded
+
+        Args:
+            cursor (Cursor): an instance of courses from the db connection lib
+        """
+        cursor.execute("SELECT registro_ans FROM operadoras")
+        self.registros = frozenset(row["registro_ans"] for row in cursor.fetchall())
+        log.info(f"Operator registry loaded with {len(self.registros)} operators")
+
+    def filter(self, df: pd.DataFrame, source: str) -> pd.DataFrame:
+        """
+        Keep the rows of known operators and append the others to the
+        reject file of the source
+
+        Args:
+            df (pd.DataFrame): DataFrame with a REG_ANS column
+            source (str): source file name
+
+        Returns:
+            pd.DataFrame: rows of known operators
+        """
+        valid = df["REG_ANS"].isin(self.registros)
+        rejects = df[~valid]
+        if not rejects.empty:
+            with self._lock:
+                first_write = source not in self.rejected
+                self.rejected[source] = self.rejected.get(source, 0) + len(rejects)
+                os.makedirs(self.rejects_dir, exist_ok=True)
+                rejects.to_csv(
+                    self.reject_file(source),
+                    mode="w" if first_write else "a",
+                    header=first_write,
+                    index=False,
+                    sep=";",
+                )
+        return df[valid]
+
+    def reject_file(self, source: str) -> str:
+        name = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.rejects_dir, f"{name}_rejects.csv")
+
+    def log_rejects(self) -> None:
+        for source, count in sorted(self.rejected.items()):
+            log.warning(
+                f"{count} records of unknown operators rejected from {source}, "
+                f"see {self.reject_file(source)}"
+            )
+
+
+def like_to_regex(pattern: str) -> re.Pattern:
+    """
+    Compile a LIKE pattern of ACCOUNT_CATEGORIES, case and accent insensitive
+    as the utf8mb4 collation of the db
+
+    Args:
+        pattern (str): LIKE pattern, with % and _ wildcards
+
+    Returns:
+        re.Pattern: pattern to be matched against the whole normalized text
+    """
+    wildcards = {"%": ".*", "_": "."}
+    regex = "".join(
+        wildcards.get(char, re.escape(char)) for char in normalize_text(pattern)
+    )
+    return re.compile(regex, re.DOTALL)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Uppercase text without accents
+
+    Args:
+        text (str): text
+
+    Returns:
+        str: normalized text
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).upper()
+
+
+class AccountDimension:
+    """
+    Accounts of the contas dimension, built once per run and shared by every
+    file, chunk and loading thread. New or renamed accounts are upserted with
+    their ACCOUNT_CATEGORIES category and the accounting statements keep
+    only the account code
+    """
+
+    def __init__(self, categories: dict[str, str] = ACCOUNT_CATEGORIES):
+        """
+        Args:
+            categories (dict[str, str], optional): category -> LIKE pattern of
+            the description. Defaults to ACCOUNT_CATEGORIES.
+        """
+        self.patterns = {
+            categoria: like_to_regex(pattern)
+            for categoria, pattern in categories.items()
+        }
+        self.descricoes: dict[str, str | None] = {}
+        self._lock = threading.Lock()
+
+    def classify(self, descricao: str | None) -> str | None:
+        """
+        Category of an account description
+
+        Args:
+            descricao (str | None): account description
+
+        Returns:
+            str | None: first matching category, None when none matches
+        """
+        if not descricao:
+            return None
+        text = normalize_text(descricao)
+        for categoria, pattern in self.patterns.items():
+            if pattern.fullmatch(text):
+                return categoria
+        return None
+
+    def refresh(self, cursor: Cursor) -> None:
+        """
+        Reload the known accounts, also after a rolled back transaction that
+        may have inserted some of them
+
+        Args:
+            cursor (Cursor): an instance of courses from the db connection lib
+        """
+        cursor.execute("SELECT cd_conta_contabil, descricao FROM contas")
+        descricoes = {
+            row["cd_conta_contabil"]: row["descricao"] for row in cursor.fetchall()
+        }
+        with self._lock:
+            self.descricoes = descricoes
+        log.info(f"Account dimension loaded with {len(descricoes)} accounts")
+
+    def reclassify(self, cursor: Cursor) -> int:
+        """
+        Update the category of the accounts whose stored category differs
+        from ACCOUNT_CATEGORIES, after the patterns changed
+
+        Args:
+            cursor (Cursor): an instance of courses from the db connection lib
+
+        Returns:
+            int: number of accounts updated
+        """
+        cursor.execute("SELECT cd_conta_contabil, descricao, categoria FROM contas")
+        changed = [
+            (categoria, row["cd_conta_contabil"])
+            for row in cursor.fetchall()
+            if (categoria := self.classify(row["descricao"])) != row["categoria"]
+        ]
+        if changed:
+            cursor.executemany(
+                "UPDATE contas SET categoria = %s WHERE cd_conta_contabil = %s",
+                changed,
+            )
+            log.info(f"{len(changed)} accounts reclassified")
+        return len(changed)
+
+    def register(self, cursor: Cursor, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Upsert the accounts of a chunk that are new or have a new description
+        and drop the description from it
+
+        Args:
+            cursor (Cursor): an instance of courses from the db connection lib
+            df (pd.DataFrame): DataFrame with CD_CONTA_CONTABIL and DESCRICAO columns
+
+        Returns:
+            pd.DataFrame: DataFrame without the DESCRICAO column
+        """
+        if "DESCRICAO" not in df.columns:
+            return df
+
+        accounts = (
+            df[["CD_CONTA_CONTABIL", "DESCRICAO"]]
+            .dropna(subset=["CD_CONTA_CONTABIL"])
+            .drop_duplicates("CD_CONTA_CONTABIL", keep="last")
+            .astype(object)
+        )
+        accounts = accounts.where(accounts.notna(), None)
+        with self._lock:
+            changed = sorted(
+                (cd_conta, descricao, self.classify(descricao))
+                for cd_conta, descricao in accounts.itertuples(index=False)
+                if cd_conta not in self.descricoes
+                or self.descricoes[cd_conta] != descricao
+            )
+        if changed:
+            # sorted so concurrent files lock the same rows in the same order
+            cursor.executemany(
+                """INSERT INTO contas (cd_conta_contabil, descricao, categoria)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    descricao = VALUES(descricao),
+                    categoria = VALUES(categoria)""",
+                changed,
+            )
+            with self._lock:
+                self.descricoes.update(
+                    (cd_conta, descricao) for cd_conta, descricao, _ in changed
+                )
+            log.info(f"{len(changed)} accounts added to the contas dimension")
+        return df.drop(columns="DESCRICAO")
+
+
+def load_in_db(
+    cursor: Cursor,
+    df: pd.DataFrame,
+    table_name: str,
+    engine: str | None = None,
+    registry: OperatorRegistry | None = None,
+    source: str = "",
+    accounts: AccountDimension | None = None,
+) -> None:
     """_summary_
 
     Args:
         cursor (Cursor): an instance of courses from the db connection lib
         df (pd.DataFrame): DataFrame
         table_name (str): table name in db
+        engine (str, optional): "executemany", "batch" or "load_data".
+        Defaults to the engine configured for the table in TABLE_LOAD_ENGINES.
+        registry (OperatorRegistry, optional): registry used to filter the
+        accounting statements. Defaults to a registry read from the db.
+        source (str, optional): source file name, used for the reject file. Defaults to "".
+        accounts (AccountDimension, optional): dimension receiving the account
+        descriptions of the accounting statements. Defaults to one read from the db.
 
     Raises:
         Exception: Error in load_in_db
     """
     try:
-        if table_name == "demonstracoes_contabeis":
-            cursor.execute("SELECT registro_ans FROM operadoras")
-            registros_validos = {row["registro_ans"] for row in cursor.fetchall()}
+        # staging and exchange tables follow the rules of their target
+        if table_name.startswith(STAGING_TABLE):
+            base_table = "demonstracoes_contabeis"
+        else:
+            base_table = table_name
+        if base_table == "demonstracoes_contabeis":
+            if registry is None:
+                registry = OperatorRegistry()
+                registry.refresh(cursor)
 
-            df = df[df["REG_ANS"].isin(registros_validos)]
+            df = registry.filter(df, source or table_name)
             log.info(f"Filtered {len(df)} valid records for table {table_name}")
 
+            if accounts is None:
+                accounts = AccountDimension()
+                accounts.refresh(cursor)
+            df = accounts.register(cursor, df)
+
         if df.empty:
             log.warning(f"No valid records to insert into {table_name}. Skipping.")
             return
 
-        columns = ", ".join(df.columns)
-        placeholders = ", ".join(["%s"] * len(df.columns))
-        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-
-        data = [tuple(x) for x in df.to_numpy()]
-        cursor.executemany(query, data)
+        engine = engine or TABLE_LOAD_ENGINES.get(base_table, "executemany")
+        upsert = base_table in UPSERT_TABLES
+        if engine == "batch":
+            LOAD_ENGINES[engine](
+                cursor, df, table_name, upsert, batch_size=LOAD_BATCH_SIZE
+            )
+        else:
+            LOAD_ENGINES[engine](cursor, df, table_name, upsert)
     except Exception as e:
         raise Exception(f"Error in load_in_db: {str(e)}")
 
 
+def file_hash(path: str, member: str | None = None) -> str:
+    """
+    sha256 of a source file content. For a Parquet file it is the hash of
+    the csv it was converted from, so the load manifest does not depend on
+    the input mode
+
+    Args:
+        path (str): file path
+        member (str, optional): zip member. Defaults to None.
+
+    Returns:
+        str: hex digest
+    """
+    if path.endswith(".parquet"):
+        return parquet_metadata(path)["source_sha256"]
+    digest = hashlib.sha256()
+    with open_source(path, member) as source:
+        stream = open(source, "rb") if isinstance(source, str) else source
+        with stream:
+            for block in iter(lambda: stream.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def fetch_loaded_files(cursor: Cursor) -> dict[str, str]:
+    """
+    Files already loaded, from the load manifest table
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+
+    Returns:
+        dict[str, str]: hash of each loaded file
+    """
+    cursor.execute("SELECT arquivo, hash FROM arquivos_carregados")
+    return {row["arquivo"]: row["hash"] for row in cursor.fetchall()}
+
+
+def record_load(cursor: Cursor, file: str, hash: str, rows: int) -> None:
+    """
+    Record a loaded file in the manifest, in the same transaction as its rows
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        file (str): file name
+        hash (str): file hash
+        rows (int): number of records processed
+    """
+    cursor.execute(
+        """INSERT INTO arquivos_carregados (arquivo, hash, linhas, carregado_em)
+        VALUES (%s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            hash = VALUES(hash),
+            linhas = VALUES(linhas),
+            carregado_em = VALUES(carregado_em)""",
+        (file, hash, rows),
+    )
+
+
+def refresh_aggregates(cursor: Cursor, dates: set[str] | None = None) -> None:
+    """
+    Recompute the expenses per operator, quarter and account category from
+    demonstracoes_contabeis and the categories of the contas dimension
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        dates (set[str], optional): quarters to recompute, None recomputes
+        everything. Defaults to None.
+    """
+    if dates is not None and not dates:
+        return
+
+    params: list = []
+    conditions = ["c.categoria IS NOT NULL"]
+    if dates is None:
+        cursor.execute("DELETE FROM despesas_agregadas")
+    else:
+        placeholders = ", ".join(["%s"] * len(dates))
+        cursor.execute(
+            f"DELETE FROM despesas_agregadas WHERE data IN ({placeholders})",
+            sorted(dates),
+        )
+        conditions.append(f"d.data IN ({placeholders})")
+        params += sorted(dates)
+
+    cursor.execute(
+        f"""INSERT INTO despesas_agregadas (categoria, data, reg_ans, total_despesas)
+        SELECT c.categoria, d.data, d.reg_ans, SUM(d.vl_saldo_final)
+        FROM demonstracoes_contabeis d
+        JOIN contas c ON c.cd_conta_contabil = d.cd_conta_contabil
+        WHERE {" AND ".join(conditions)}
+        GROUP BY c.categoria, d.data, d.reg_ans""",
+        params,
+    )
+    log.info(f"{cursor.rowcount} expense aggregates refreshed")
+
+
+def load_chunk(
+    cursor: Cursor,
+    df: pd.DataFrame,
+    table_name: str,
+    registry: OperatorRegistry | None = None,
+    source: str = "",
+    replaced_dates: set[str] | None = None,
+    accounts: AccountDimension | None = None,
+) -> None:
+    """
+    Load a transformed chunk. When replaced_dates is given, the rows already
+    in the table for the quarters of the chunk are deleted first, so the
+    file replaces its quarters inside the current transaction
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        df (pd.DataFrame): transformed DataFrame
+        table_name (str): table name in db
+        registry (OperatorRegistry, optional): see load_in_db. Defaults to None.
+        source (str, optional): source file name. Defaults to "".
+        replaced_dates (set[str], optional): quarters already replaced by
+        this file, updated in place. Defaults to None.
+        accounts (AccountDimension, optional): see load_in_db. Defaults to None.
+    """
+    if replaced_dates is not None and "DATA" in df.columns:
+        dates = {
+            pd.Timestamp(day).date().isoformat() for day in df["DATA"].dropna().unique()
+        } - replaced_dates
+        if dates:
+            placeholders = ", ".join(["%s"] * len(dates))
+            cursor.execute(
+                f"DELETE FROM {table_name} WHERE data IN ({placeholders})",
+                sorted(dates),
+            )
+            log.info(f"Replacing {cursor.rowcount} records of {sorted(dates)}")
+            replaced_dates.update(dates)
+    load_in_db(
+        cursor, df, table_name, registry=registry, source=source, accounts=accounts
+    )
+
+
+def prefetch(iterator: Iterator, size: int = 1) -> Iterator:
+    """
+    Consume an iterator in a background thread, so the next chunk is parsed
+    while the current one is being loaded
+
+    Args:
+        iterator (Iterator): source iterator
+        size (int, optional): items read ahead. Defaults to 1.
+
+    Yields:
+        items of the source iterator
+    """
+    done = object()
+    buffer: queue.Queue = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # a consumer that stopped reading must not leave the producer blocked
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(e)
+        put(done)
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while (item := buffer.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while producer.is_alive():
+            try:
+                buffer.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
 def etl(
     cursor: Cursor,
-    file_path: str,
+    file_path: str | IO[bytes],
     table_name: str,
     value_columns: list[str] | None = None,
-) -> None:
-    """_summary_
+    chunksize: int = ETL_CHUNKSIZE,
+    registry: OperatorRegistry | None = None,
+    commit: bool = True,
+    replaced_dates: set[str] | None = None,
+    accounts: AccountDimension | None = None,
+) -> int:
+    """
+    Extract, transform and load a csv in chunks of chunksize rows,
+    committing after each chunk so memory stays bounded
 
     Args:
         cursor (Cursor): an instance of courses from the db connection lib
-        file_path (str): file path
+        file_path (str | IO[bytes]): file path or binary stream of the csv
         table_name (str): table name in db
         value_columns (list[str] | None, optional): Receives a list of column
         names of real values ​​to swap "," or ".". Defaults to None.
+        chunksize (int, optional): rows per chunk. Defaults to ETL_CHUNKSIZE.
+        registry (OperatorRegistry, optional): see load_in_db. Defaults to None.
+        commit (bool, optional): commit after each chunk, False leaves the
+        whole file in the caller transaction. Defaults to True.
+        replaced_dates (set[str], optional): replace the quarters of the file
+        already in the table and collect them, see load_chunk. Defaults to None.
+        accounts (AccountDimension, optional): see load_in_db. Defaults to None.
 
     Raises:
         Exception: Error processing file
+
+    Returns:
+        int: number of records processed
     """
+    file_name = getattr(file_path, "name", file_path)
     try:
-        log.info(f"Processing file: {file_path}")
-        df = extract_data(file_path)
-        df = transform_data(df, value_columns)
-        load_in_db(cursor, df, table_name)
-        log.info(f"Successfully processed {len(df)} records from {file_path}")
+        log.info(f"Processing file: {file_name} (chunksize={chunksize})")
+        total = 0
+        chunks = extract_data(file_path, chunksize)
+        for number, df in enumerate(prefetch(chunks), start=1):
+            df = transform_data(df, value_columns)
+            load_chunk(
+                cursor, df, table_name, registry, file_name, replaced_dates, accounts
+            )
+            if commit:
+                cursor.connection.commit()
+            total += len(df)
+            log.debug(f"Chunk {number}: {len(df)} records loaded from {file_name}")
+        log.info(f"Successfully processed {total} records from {file_name}")
+        return total
     except Exception as e:
-        log.error(f"Error processing file {file_path}: {str(e)}")
+        log.error(f"Error processing file {file_name}: {str(e)}")
         raise Exception(e)
 
 
-def select_query_db(cursor: Cursor, query: str) -> None:
+def list_sources(
+    dir_data: str = DIR_DATA,
+    input_mode: str = ETL_INPUT_MODE,
+    parquet_dir: str = PARQUET_DIR,
+) -> list[tuple[str, str, str | None]]:
     """
-    Performs select query on the database
+    Accounting statement files to be loaded
 
     Args:
-        cursor (Cursor): an instance of courses from the db connection lib
-        query (str): Query.sql
+        dir_data (str, optional): data folder. Defaults to DIR_DATA.
+        input_mode (str, optional): "csv" reads the extracted csv files,
+        "zip" streams the csv members of the downloaded zips and "parquet"
+        reads the converted files of parquet_dir. Defaults to ETL_INPUT_MODE.
+        parquet_dir (str, optional): converted files folder. Defaults to PARQUET_DIR.
+
+    Returns:
+        list[tuple[str, str, str | None]]: file name, file path and zip member
+        (None for extracted csv files)
     """
+    if input_mode == "parquet":
+        paths = [f"{parquet_dir}/{file}" for file in get_files(parquet_dir, ["parquet"])]
+        sources = [(parquet_metadata(path)["source"], path, None) for path in paths]
+        return [source for source in sources if source[0] not in IGNORE_FILES]
+
+    if input_mode == "zip":
+        return [
+            (member, f"{dir_data}/{zip_file}", member)
+            for zip_file in get_files(dir_data, ["zip"])
+            for member in list_zip_members(f"{dir_data}/{zip_file}", ["csv"])
+            if member not in IGNORE_FILES
+        ]
+
+    files = get_files(dir_data, ["csv"])
+    return [
+        (file, f"{dir_data}/{file}", None) for file in files if file not in IGNORE_FILES
+    ]
+
+
+def parquet_path(file: str, parquet_dir: str = PARQUET_DIR) -> str:
+    """
+    Path of the Parquet conversion of a source file
+
+    Args:
+        file (str): source file name, as returned by list_sources
+        parquet_dir (str, optional): converted files folder. Defaults to PARQUET_DIR.
+
+    Returns:
+        str: parquet file path
+    """
+    return f"{parquet_dir}/{os.path.splitext(file)[0]}.parquet"
+
+
+@contextmanager
+def open_source(path: str, member: str | None = None) -> Iterator[str | IO[bytes]]:
+    """
+    Open a source returned by list_sources
+
+    Args:
+        path (str): file path
+        member (str, optional): zip member. Defaults to None.
+
+    Yields:
+        str | IO[bytes]: csv path or binary stream of the zip member
+    """
+    if member is None:
+        yield path
+        return
+    with open_zip_member(path, member) as stream:
+        yield stream
+
+
+def _prepare_file(
+    path: str,
+    member: str | None,
+    value_columns: list[str] | None,
+    chunksize: int,
+    chunks: queue.Queue,
+) -> float:
+    """
+    Extract and transform the chunks of a file, runs in a worker process.
+    Each chunk is put on the queue as soon as it is ready, the bounded queue
+    blocks the worker while the loader is behind
+
+    Args:
+        path (str): file path
+        member (str | None): zip member
+        value_columns (list[str] | None): see transform_data
+        chunksize (int): rows per chunk
+        chunks (queue.Queue): bounded queue read by the loader, None marks the end
+
+    Returns:
+        float: parse seconds
+    """
+    start = time.perf_counter()
+    parse = 0.0
+    with open_source(path, member) as source:
+        for df in extract_data(source, chunksize):
+            df = transform_data(df, value_columns)
+            parse += time.perf_counter() - start
+            chunks.put(df)
+            start = time.perf_counter()
+    chunks.put(None)
+    return parse
+
+
+def _prepared_chunks(chunks: queue.Queue, prepared: Future) -> Iterator[pd.DataFrame]:
+    """
+    Chunks put on the queue by _prepare_file, until its end mark
+
+    Args:
+        chunks (queue.Queue): queue given to _prepare_file
+        prepared (Future): _prepare_file task, its error is raised when it
+        fails before the end mark
+
+    Yields:
+        pd.DataFrame: transformed chunk
+    """
+    while True:
+        try:
+            df = chunks.get(timeout=1)
+        except queue.Empty:
+            if prepared.done():
+                prepared.result()
+                if chunks.empty():
+                    raise Exception("Worker finished without the end of the file")
+            continue
+        if df is None:
+            return
+        yield df
+
+
+def _drain(chunks: queue.Queue, prepared: Future) -> None:
+    """
+    Discard the chunks of a file that failed to load, so its worker is not
+    left blocked on the full queue
+
+    Args:
+        chunks (queue.Queue): queue given to _prepare_file
+        prepared (Future): _prepare_file task
+    """
+    while not prepared.done():
+        try:
+            chunks.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+
+def ingest_serial(
+    conn: pymysql.Connection,
+    sources: list[tuple[str, str, str | None]],
+    table_name: str,
+    value_columns: list[str] | None = None,
+    registry: OperatorRegistry | None = None,
+    hashes: dict[str, str] | None = None,
+    accounts: AccountDimension | None = None,
+    partitioned: bool = False,
+) -> list[dict]:
+    """
+    Load files one at a time on a single connection, committing or rolling
+    back each file
+
+    Args:
+        conn (pymysql.Connection): db connection
+        sources (list[tuple[str, str, str | None]]): files from list_sources
+        table_name (str): table name in db
+        value_columns (list[str] | None, optional): see transform_data. Defaults to None.
+        registry (OperatorRegistry, optional): see load_in_db. Defaults to None.
+        hashes (dict[str, str], optional): see ingest_parallel. Defaults to None.
+        accounts (AccountDimension, optional): see load_in_db. Defaults to None.
+        partitioned (bool, optional): see ingest_parallel. Defaults to False.
+
+    Returns:
+        list[dict]: per-file timings, see log_timings
+    """
+    timings = []
+    with conn.cursor() as cursor:
+        for file, path, member in sources:
+            timing = {"file": file, "rows": 0, "parse": 0.0, "load": 0.0}
+            start = time.perf_counter()
+            replaced_dates: set[str] | None = set() if hashes else None
+            target = table_name
+            try:
+                if hashes and partitioned:
+                    target = create_exchange_table(cursor, file)
+                    replaced_dates = None
+                with open_source(path, member) as source:
+                    timing["rows"] = etl(
+                        cursor,
+                        source,
+                        target,
+                        value_columns,
+                        registry=registry,
+                        commit=False,
+                        replaced_dates=replaced_dates,
+                        accounts=accounts,
+                    )
+                if target != table_name:
+                    conn.commit()
+                    replaced_dates = exchange_partition(cursor, target)
+                if hashes:
+                    refresh_aggregates(cursor, replaced_dates)
+                    record_load(cursor, file, hashes[file], timing["rows"])
+                conn.commit()
+                timing["status"] = "ok"
+            except Exception as e:
+                conn.rollback()
+                timing["status"] = "failed"
+                log.error(f"Failed to process {file}: {str(e)}")
+                if accounts:
+                    accounts.refresh(cursor)
+            finally:
+                if target != table_name:
+                    cursor.execute(f"DROP TABLE IF EXISTS {target}")
+            # parsing and loading overlap in the serial path
+            timing["load"] = time.perf_counter() - start
+            timings.append(timing)
+    return timings
+
+
+def ingest_parallel(
+    sources: list[tuple[str, str, str | None]],
+    connect: Callable[[], pymysql.Connection],
+    table_name: str,
+    value_columns: list[str] | None = None,
+    workers: int = ETL_WORKERS,
+    db_connections: int = ETL_DB_CONNECTIONS,
+    chunksize: int = ETL_CHUNKSIZE,
+    registry: OperatorRegistry | None = None,
+    hashes: dict[str, str] | None = None,
+    accounts: AccountDimension | None = None,
+    partitioned: bool = False,
+    queued_chunks: int = 2,
+) -> list[dict]:
+    """
+    Parse and transform files in a process pool and load them through a
+    small pool of connections, committing or rolling back each file. The
+    chunks go from the workers to the loaders one at a time through bounded
+    queues, so memory depends on the chunk size and not on the file size
+
+    Args:
+        sources (list[tuple[str, str, str | None]]): files from list_sources
+        connect (Callable[[], pymysql.Connection]): opens a db connection
+        table_name (str): table name in db
+        value_columns (list[str] | None, optional): see transform_data. Defaults to None.
+        workers (int, optional): parse/transform processes. Defaults to ETL_WORKERS.
+        db_connections (int, optional): loading connections. Defaults to ETL_DB_CONNECTIONS.
+        chunksize (int, optional): rows per chunk. Defaults to ETL_CHUNKSIZE.
+        registry (OperatorRegistry, optional): see load_in_db. Defaults to None.
+        hashes (dict[str, str], optional): file hashes, when given each file
+        replaces its quarters and is recorded in the load manifest. Defaults to None.
+        accounts (AccountDimension, optional): see load_in_db. Defaults to None.
+        partitioned (bool, optional): with hashes, load each file into an
+        exchange table and swap it with its quarter partition. Defaults to False.
+        queued_chunks (int, optional): chunks of a file parsed ahead of its
+        loader. Defaults to 2.
+
+    Returns:
+        list[dict]: per-file timings, see log_timings
+    """
+    timings: list[dict] = []
+    connections: queue.Queue = queue.Queue()
+    for _ in range(db_connections):
+        connections.put(connect())
+    # files being parsed or loaded, each holds at most queued_chunks + 2
+    # chunks: the queued ones, the one being parsed and the one being loaded
+    in_flight = threading.BoundedSemaphore(workers + db_connections)
+
+    def load(file: str, chunks: queue.Queue, prepared: Future) -> None:
+        timing = {"file": file, "rows": 0, "parse": 0.0, "load": 0.0, "status": "ok"}
+        conn = connections.get()
+        target = table_name
+        try:
+            start = time.perf_counter()
+            replaced_dates: set[str] | None = set() if hashes else None
+            with conn.cursor() as cursor:
+                if hashes and partitioned:
+                    target = create_exchange_table(cursor, file)
+                    replaced_dates = None
+                # the loader also waits for the workers, only the rest is load time
+                waited = 0.0
+                prepared_chunks = _prepared_chunks(chunks, prepared)
+                while True:
+                    wait_start = time.perf_counter()
+                    df = next(prepared_chunks, None)
+                    waited += time.perf_counter() - wait_start
+                    if df is None:
+                        break
+                    load_chunk(
+                        cursor,
+                        df,
+                        target,
+                        registry,
+                        file,
+                        replaced_dates,
+                        accounts,
+                    )
+                    timing["rows"] += len(df)
+                if target != table_name:
+                    conn.commit()
+                    replaced_dates = exchange_partition(cursor, target)
+                if hashes:
+                    refresh_aggregates(cursor, replaced_dates)
+                    record_load(cursor, file, hashes[file], timing["rows"])
+            conn.commit()
+            timing["parse"] = prepared.result()
+            timing["load"] = time.perf_counter() - start - waited
+        except Exception as e:
+            _drain(chunks, prepared)
+            conn.rollback()
+            timing["status"] = "failed"
+            log.error(f"Failed to process {file}: {str(e)}")
+            if accounts:
+                with conn.cursor() as cursor:
+                    accounts.refresh(cursor)
+        finally:
+            if target != table_name:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"DROP TABLE IF EXISTS {target}")
+            connections.put(conn)
+            in_flight.release()
+            timings.append(timing)
+
     try:
-        cursor.execute(query)
-        results = cursor.fetchall()
-        for row in results:
-            print(row)
+        with (
+            multiprocessing.Manager() as manager,
+            ProcessPoolExecutor(max_workers=workers) as pool,
+            ThreadPoolExecutor(max_workers=db_connections) as loaders,
+        ):
+            loads = []
+            for file, path, member in sources:
+                in_flight.acquire()
+                chunks = manager.Queue(maxsize=queued_chunks)
+                prepared = pool.submit(
+                    _prepare_file, path, member, value_columns, chunksize, chunks
+                )
+                loads.append(loaders.submit(load, file, chunks, prepared))
+            wait(loads)
+    finally:
+        while not connections.empty():
+            connections.get().close()
+    return timings
+
+
+def log_timings(timings: list[dict]) -> None:
+    """
+    Log the per-file timing summary of a run
 
-    except pymysql.MySQLError as e:
-        log.error(f"Error performing query: {e}")
+    Args:
+        timings (list[dict]): file, rows, parse, load and status of each file
+    """
+    log.info(f"{'file':<30} {'rows':>10} {'parse (s)':>10} {'load (s)':>10} status")
+    for timing in sorted(timings, key=lambda timing: timing["file"]):
+        log.info(
+            f"{timing['file']:<30} {timing['rows']:>10} {timing['parse']:>10.2f} "
+            f"{timing['load']:>10.2f} {timing['status']}"
+        )
 
 
 def main(
@@ -271,48 +1593,135 @@ def main(
     user: str = DB_USER,
     password: str = DB_PASSWORD,
     db_name: str = DB_NAME,
-) -> None:
+    workers: int = ETL_WORKERS,
+    bulk: bool = ETL_BULK_MODE,
+    partitioned: bool = ETL_PARTITIONED,
+) -> bool:
+    """
+    Load the downloaded files into the db
+
+    Returns:
+        bool: True when every file was loaded, errors are logged
+    """
     try:
-        conn = pymysql.connect(
+        connect = partial(
+            pymysql.connect,
             host=host,
             user=user,
             password=password,
             charset="utf8mb4",
             cursorclass=pymysql.cursors.DictCursor,
+            # client side file reads, only the load_data engine needs them
+            local_infile="load_data" in TABLE_LOAD_ENGINES.values(),
         )
+        conn = connect()
         cursor = conn.cursor()
 
-        create_db(cursor, db_name)
+        create_db(cursor, db_name, partitioned)
         conn.select_db(db_name)
 
-        etl(cursor, f"{DIR_DATA}/Relatorio_cadop.csv", "operadoras")
-        conn.commit()
-        files = get_files(DIR_DATA, ["csv"])
-        files = [file for file in files if file not in IGNORE_FILES]
+        loaded = fetch_loaded_files(cursor)
+        operadoras_file = OPERADORAS_FILE
+        operadoras_path = f"{DIR_DATA}/{operadoras_file}"
+        if ETL_INPUT_MODE == "parquet":
+            operadoras_path = parquet_path(operadoras_file)
+        operadoras_hash = file_hash(operadoras_path)
+        if loaded.get(operadoras_file) == operadoras_hash:
+            log.info(f"{operadoras_file} unchanged since the last load. Skipping.")
+        else:
+            rows = etl(cursor, operadoras_path, "operadoras", commit=False)
+            record_load(cursor, operadoras_file, operadoras_hash, rows)
+            conn.commit()
+        registry = OperatorRegistry()
+        registry.refresh(cursor)
+        accounts = AccountDimension()
+        if accounts.reclassify(cursor):
+            refresh_aggregates(cursor)
+            conn.commit()
+        accounts.refresh(cursor)
 
-        for file in files:
-            try:
-                etl(
-                    cursor,
-                    f"{DIR_DATA}/{file}",
-                    "demonstracoes_contabeis",
-                    ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"],
-                )
-                conn.commit()
-            except Exception as e:
-                conn.rollback()
-                log.error(f"Failed to process {file}: {str(e)}")
-                continue
+        sources = list_sources()
+        hashes = {file: file_hash(path, member) for file, path, member in sources}
+        pending = [
+            (file, path, member)
+            for file, path, member in sources
+            if loaded.get(file) != hashes[file]
+        ]
+        log.info(
+            f"{len(sources) - len(pending)} files unchanged since the last load, "
+            f"{len(pending)} to load"
+        )
+
+        if bool(list_partitions(cursor)) != partitioned:
+            log.info("Partitioning changed, demonstracoes_contabeis will be rebuilt")
+            bulk = True
+        cursor.execute("SELECT 1 FROM demonstracoes_contabeis LIMIT 1")
+        if bulk or cursor.fetchone() is None:
+            # full load into an unindexed staging table, swapped in at the end
+            log.info("Bulk mode: loading every file into the staging table")
+            create_staging_table(cursor, partitioned)
+            pending, table_name, load_hashes = sources, STAGING_TABLE, None
+        else:
+            table_name, load_hashes = "demonstracoes_contabeis", hashes
+
+        value_columns = ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"]
+        if workers > 1:
+            timings = ingest_parallel(
+                pending,
+                partial(connect, database=db_name),
+                table_name,
+                value_columns,
+                workers,
+                registry=registry,
+                hashes=load_hashes,
+                accounts=accounts,
+                partitioned=partitioned,
+            )
+        else:
+            timings = ingest_serial(
+                conn,
+                pending,
+                table_name,
+                value_columns,
+                registry,
+                load_hashes,
+                accounts,
+                partitioned,
+            )
+        log_timings(timings)
+
+        if table_name == STAGING_TABLE:
+            if any(timing["status"] != "ok" for timing in timings):
+                cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+                raise Exception("Bulk load failed, current data was kept")
+            swap_staging_table(cursor, partitioned)
+            refresh_aggregates(cursor)
+            cursor.execute(
+                "DELETE FROM arquivos_carregados WHERE arquivo <> %s",
+                (operadoras_file,),
+            )
+            for timing in timings:
+                file = timing["file"]
+                record_load(cursor, file, hashes[file], timing["rows"])
+            conn.commit()
 
-        log.info("Data added successfully")
+        registry.log_rejects()
+        failed = [timing["file"] for timing in timings if timing["status"] != "ok"]
+        if failed:
+            log.error(f"Files not loaded: {failed}")
+        else:
+            log.info("Data added successfully")
 
-        for query in [QUERY1, QUERY2]:
-            select_query_db(cursor, query)
+        for report in [top_expenses_last_quarter, top_expenses_last_year]:
+            for row in report(cursor):
+                print(row)
             print("=" * 100)
+        return not failed
     except Exception as e:
         log.error(f"Main error: {str(e)}")
         if "conn" in locals():
             conn.rollback()
+        return False
     finally:
         if "cursor" in locals():
             cursor.close()
@@ -0,0 +1,104 @@
+from datetime import date
+from settings import logger
+from pymysql.cursors import Cursor
+
+log = logger(__file__)
+
+EVENTOS_SINISTROS = "EVENTOS_SINISTROS_ASSISTENCIA"
+
+# top expenses of a category over the precomputed despesas_agregadas table
+QUERY_TOP_EXPENSES = """
+    SELECT
+        o.razao_social,
+        o.nome_fantasia,
+        SUM(a.total_despesas) AS total_despesas
+    FROM
+        despesas_agregadas a
+    JOIN
+        operadoras o ON a.reg_ans = o.registro_ans
+    WHERE
+        a.categoria = %(categoria)s
+        AND a.data >= {inicio}
+        AND a.data <= {fim}
+    GROUP BY
+        o.razao_social, o.nome_fantasia
+    HAVING
+        total_despesas > 0
+    ORDER BY
+        total_despesas DESC
+    LIMIT %(limit)s;
+"""
+
+LAST_DATE = "(SELECT MAX(data) FROM demonstracoes_contabeis)"
+
+
+def top_expenses(
+    cursor: Cursor,
+    start: date,
+    end: date,
+    categoria: str = EVENTOS_SINISTROS,
+    limit: int = 10,
+) -> list[dict]:
+    """
+    Operators with the highest expenses of an account category in a period
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        start (date): first day of the period
+        end (date): last day of the period
+        categoria (str, optional): account category. Defaults to EVENTOS_SINISTROS.
+        limit (int, optional): number of operators. Defaults to 10.
+
+    Returns:
+        list[dict]: razao_social, nome_fantasia and total_despesas
+    """
+    query = QUERY_TOP_EXPENSES.format(inicio="%(inicio)s", fim="%(fim)s")
+    cursor.execute(
+        query, {"categoria": categoria, "inicio": start, "fim": end, "limit": limit}
+    )
+    return list(cursor.fetchall())
+
+
+def top_expenses_last_quarter(
+    cursor: Cursor, categoria: str = EVENTOS_SINISTROS, limit: int = 10
+) -> list[dict]:
+    """
+    Operators with the highest expenses in the three months up to the last
+    loaded quarter
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        categoria (str, optional): account category. Defaults to EVENTOS_SINISTROS.
+        limit (int, optional): number of operators. Defaults to 10.
+
+    Returns:
+        list[dict]: razao_social, nome_fantasia and total_despesas
+    """
+    query = QUERY_TOP_EXPENSES.format(
+        inicio=f"DATE_SUB({LAST_DATE}, INTERVAL 3 MONTH)", fim=LAST_DATE
+    )
+    cursor.execute(query, {"categoria": categoria, "limit": limit})
+    return list(cursor.fetchall())
+
+
+def top_expenses_last_year(
+    cursor: Cursor, categoria: str = EVENTOS_SINISTROS, limit: int = 10
+) -> list[dict]:
+    """
+    Operators with the highest expenses from the start of the year before the
+    last loaded quarter to the end of its year
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        categoria (str, optional): account category. Defaults to EVENTOS_SINISTROS.
+        limit (int, optional): number of operators. Defaults to 10.
+
+    Returns:
+        list[dict]: razao_social, nome_fantasia and total_despesas
+    """
+    query = QUERY_TOP_EXPENSES.format(
+        inicio=f"DATE_FORMAT(DATE_SUB({LAST_DATE}, INTERVAL 1 YEAR), '%%Y-01-01')",
+        fim=f"DATE_FORMAT({LAST_DATE}, '%%Y-12-31')",
+    )
+    cursor.execute(query, {"categoria": categoria, "limit": limit})
+    return list(cursor.fetchall())
@@ -1,10 +1,18 @@
-from settings import logger, DIR_DATA
+from settings import (
+    logger,
+    DIR_DATA,
+    DOWNLOAD_WORKERS,
+    DOWNLOAD_POOL_SIZE,
+    DOWNLOAD_MANIFESTS,
+)
 from utils.scraper import Scraper
 import os
 from utils.file_handler import compress_file
 
 log = logger(__file__)
-scraper = Scraper(log)
+scraper = Scraper(
+    log, DOWNLOAD_WORKERS, DOWNLOAD_POOL_SIZE, DOWNLOAD_MANIFESTS["gov_docs"]
+)
 
 URL_GOV = "https://www.gov.br/ans/pt-br/acesso-a-informacao/participacao-da-sociedade/atualizacao-do-rol-de-procedimentos"
 FILENAME_ZIP = "./data/compress_gov"
@@ -14,19 +22,21 @@ def main(
     url: str = URL_GOV,
     dir_data: str = DIR_DATA,
     filename_zip: str = FILENAME_ZIP,
-):
+) -> bool:
     html_content = scraper.fetch_page(url)
     if not html_content:
-        return
+        return False
     file_links = scraper.parse_files(
         html_content, tag_content=".*Anexo*.", target_file=".pdf"
     )
     if not file_links:
-        return
+        return False
     os.makedirs(dir_data, exist_ok=True)
-    for file_link in file_links:
-        scraper.dowload_file(file_link, dir_data)
+    paths = scraper.dowload_files(file_links, dir_data)
+    if not all(paths):
+        return False
     compress_file(dir_data, filename_zip, [".pdf"])
+    return True
 
 
 if __name__ == "__main__":
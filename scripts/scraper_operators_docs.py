@@ -1,10 +1,19 @@
-from settings import logger, DIR_DATA
+from settings import (
+    logger,
+    DIR_DATA,
+    DOWNLOAD_WORKERS,
+    DOWNLOAD_POOL_SIZE,
+    DOWNLOAD_MANIFESTS,
+    ETL_INPUT_MODE,
+)
 from utils.scraper import Scraper
 import os
-from utils.file_handler import unzip_file
+from utils.file_handler import is_extracted, unzip_file
 
 log = logger(__file__)
-scraper = Scraper(log)
+scraper = Scraper(
+    log, DOWNLOAD_WORKERS, DOWNLOAD_POOL_SIZE, DOWNLOAD_MANIFESTS["operators_docs"]
+)
 
 
 URLS = [
@@ -17,24 +26,35 @@ URLS = [
 def main(
     urls: str = URLS,
     dir_data: str = DIR_DATA,
-):
+    unzip: bool = ETL_INPUT_MODE == "csv",
+) -> bool:
     for url in urls:
         html_content = scraper.fetch_page(url)
         if not html_content:
-            return
+            return False
         if "demonstracoes" in url:
             type_file = ".zip"
         elif "operadoras" in url:
             type_file = ".csv"
         file_links = scraper.parse_files(html_content, target_file=type_file)
         if not file_links:
-            return
+            return False
         os.makedirs(dir_data, exist_ok=True)
-        for file_link in file_links:
-            scraper.dowload_file(f"{url}{file_link}", dir_data)
-            if type_file == ".zip":
-                unzip_file(f"{dir_data}/{file_link}", dir_data)
-                os.remove(f"{dir_data}/{file_link}")
+        paths = scraper.dowload_files(
+            [f"{url}{file_link}" for file_link in file_links], dir_data
+        )
+        if not all(paths):
+            return False
+        if type_file == ".zip" and unzip:
+            # archives are kept so the next run can validate them with a
+            # conditional GET instead of downloading them again
+            for path in paths:
+                if path in scraper.not_modified and is_extracted(path, dir_data):
+                    log.info(f"Not modified, keeping the files extracted from {path}")
+                    continue
+                if not unzip_file(path, dir_data):
+                    return False
+    return True
 
 
 if __name__ == "__main__":
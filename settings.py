@@ -12,6 +12,55 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", 4))
+DOWNLOAD_POOL_SIZE = int(os.getenv("DOWNLOAD_POOL_SIZE", 4))
+# one manifest per scraper, the pipeline runs them at the same time
+DOWNLOAD_MANIFESTS = {
+    "gov_docs": f"{DIR_DATA}/download_manifest_gov_docs.json",
+    "operators_docs": f"{DIR_DATA}/download_manifest_operators_docs.json",
+}
+
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", os.cpu_count() or 1))
+EXTRACT_STREAMING = os.getenv("EXTRACT_STREAMING", "true").lower() == "true"
+EXTRACT_CACHE_DIR = os.getenv("EXTRACT_CACHE_DIR", f"{DIR_DATA}/cache/tables")
+
+# "csv" extracts the quarterly zips into DIR_DATA, "zip" streams the csv
+# members straight from the archives into the ETL and "parquet" converts them
+# once into PARQUET_DIR and loads from there (requires pyarrow)
+ETL_INPUT_MODE = os.getenv("ETL_INPUT_MODE", "csv")
+PARQUET_DIR = f"{DIR_DATA}/parquet"
+
+# input fingerprints of the pipeline stages, see main.py
+PIPELINE_STATE = f"{DIR_DATA}/pipeline_state.json"
+
+# "executemany", "batch" (multi-row INSERT) or "load_data" (LOAD DATA LOCAL
+# INFILE, needs local_infile enabled on the server)
+TABLE_LOAD_ENGINES = {
+    "operadoras": os.getenv("LOAD_ENGINE_OPERADORAS", "executemany"),
+    "demonstracoes_contabeis": os.getenv("LOAD_ENGINE_DEMONSTRACOES", "batch"),
+}
+LOAD_BATCH_SIZE = int(os.getenv("LOAD_BATCH_SIZE", 5000))
+ETL_CHUNKSIZE = int(os.getenv("ETL_CHUNKSIZE", 100_000))
+# "pyarrow" parses the csv files into pyarrow backed dtypes (requires pyarrow)
+ETL_DTYPE_BACKEND = os.getenv("ETL_DTYPE_BACKEND", "numpy")
+# ETL_WORKERS > 1 parses the quarterly files in parallel processes and loads
+# them through ETL_DB_CONNECTIONS connections
+ETL_WORKERS = int(os.getenv("ETL_WORKERS", 1))
+ETL_DB_CONNECTIONS = int(os.getenv("ETL_DB_CONNECTIONS", 2))
+REJECTS_DIR = f"{DIR_DATA}/rejects"
+# account categories of the expense reports: category -> LIKE pattern of the
+# account description, used to classify the contas dimension
+ACCOUNT_CATEGORIES = {
+    "EVENTOS_SINISTROS_ASSISTENCIA": "%EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS  DE ASSIST%",
+}
+# reload everything through an unindexed staging table (always used when
+# demonstracoes_contabeis is empty)
+ETL_BULK_MODE = os.getenv("ETL_BULK_MODE", "false").lower() == "true"
+# one RANGE partition per quarter of demonstracoes_contabeis, a reloaded
+# quarter is exchanged instead of deleted row by row. Changing it rebuilds
+# the table through the staging table
+ETL_PARTITIONED = os.getenv("ETL_PARTITIONED", "false").lower() == "true"
+
 
 def logger(file_name: str) -> logging.Logger:
     log_dir = os.path.join(ROOT_DIR, "logs")
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LocalHTTPServer:
+    """
+    Local HTTP/1.1 server serving in-memory files, used as fixture by the
+    scraper tests and the download benchmark
+    """
+
+    def __init__(self, files: dict[str, bytes], latency: float = 0.0):
+        self.files = files
+        self.latency = latency
+        self.last_modified = "Mon, 06 Jan 2025 10:00:00 GMT"
+        self.fail_after: int | None = None
+        self.requests: list[dict[str, str]] = []
+        self.connections: set[int] = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "LocalHTTPServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with fixture._lock:
+                    fixture.requests.append(dict(self.headers))
+                    fixture.connections.add(self.client_address[1])
+                if fixture.latency:
+                    time.sleep(fixture.latency)
+
+                body = fixture.files.get(self.path.lstrip("/"))
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                start = 0
+                range_header = self.headers.get("Range")
+                if range_header and self.headers.get("If-Range") in (
+                    etag,
+                    fixture.last_modified,
+                ):
+                    start = int(range_header.removeprefix("bytes=").split("-")[0])
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(body)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header(
+                        "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+                    )
+                else:
+                    self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", fixture.last_modified)
+                self.send_header("Content-Length", str(len(body) - start))
+                self.end_headers()
+
+                if fixture.fail_after is not None:
+                    # simulates a dropped connection in the middle of the body
+                    self.wfile.write(body[start : start + fixture.fail_after])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body[start:])
+
+        return Handler
@@ -0,0 +1,75 @@
+def build_table_pdf(
+    path: str,
+    n_pages: int,
+    rows_per_page: int = 20,
+    columns: int = 4,
+    base_font: str = "Helvetica",
+) -> None:
+    """
+    Write a PDF with one ruled table per page, used as fixture by the table
+    extraction tests and benchmark
+
+    Args:
+        path (str): output file path
+        n_pages (int): number of pages
+        rows_per_page (int, optional): table rows per page, header included. Defaults to 20.
+        columns (int, optional): table columns. Defaults to 4.
+        base_font (str, optional): font of the text. Defaults to "Helvetica".
+    """
+    width, height = 612, 792
+    left, top, col_width, row_height = 40, 750, 130, 30
+
+    def page_content(page: int) -> bytes:
+        right = left + columns * col_width
+        bottom = top - rows_per_page * row_height
+        ops = ["0.5 w"]
+        for r in range(rows_per_page + 1):
+            y = top - r * row_height
+            ops.append(f"{left} {y} m {right} {y} l S")
+        for c in range(columns + 1):
+            x = left + c * col_width
+            ops.append(f"{x} {top} m {x} {bottom} l S")
+        for r in range(rows_per_page):
+            for c in range(columns):
+                text = f"COL{c}" if r == 0 else f"P{page}R{r}C{c}"
+                x = left + c * col_width + 5
+                y = top - (r + 1) * row_height + 10
+                ops.append(f"BT /F1 9 Tf {x} {y} Td ({text}) Tj ET")
+        return "\n".join(ops).encode("latin-1")
+
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",
+        f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} >>".encode(),
+    ]
+    kids = []
+    for page in range(n_pages):
+        content = page_content(page)
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+        )
+        content_id = len(objects)
+        objects.append(
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+            ).encode()
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {n_pages} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    with open(path, "wb") as f:
+        f.write(out)
@@ -0,0 +1,108 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from utils.bulk_load import insert_batches, insert_executemany, load_data_infile
+
+
+class TestBulkLoad(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "REG_ANS": ["419761", "421545", "326305"],
+                "DESCRICAO": ["A\tB", None, 'C "D"'],
+                "VL_SALDO_FINAL": [1.5, None, 3.0],
+            }
+        )
+
+    def test_insert_executemany(self):
+        """Testa a inserção com executemany"""
+        cursor = MagicMock()
+        insert_executemany(cursor, self.df, "demonstracoes_contabeis")
+
+        query, data = cursor.executemany.call_args.args
+        self.assertEqual(
+            query,
+            "INSERT INTO demonstracoes_contabeis (REG_ANS, DESCRICAO, VL_SALDO_FINAL) VALUES (%s, %s, %s)",
+        )
+        self.assertEqual(len(data), 3)
+
+    def test_insert_executemany_upsert(self):
+        """Testa o upsert mantendo o formato que o pymysql agrupa em lote"""
+        cursor = MagicMock()
+        insert_executemany(cursor, self.df[["REG_ANS"]], "operadoras", upsert=True)
+
+        query = cursor.executemany.call_args.args[0]
+        self.assertTrue(
+            query.endswith(
+                "VALUES (%s) ON DUPLICATE KEY UPDATE REG_ANS = VALUES(REG_ANS)"
+            )
+        )
+
+    def test_insert_batches(self):
+        """Testa a inserção em lotes de INSERT com várias linhas"""
+        cursor = MagicMock()
+        insert_batches(cursor, self.df, "demonstracoes_contabeis", batch_size=2)
+
+        self.assertEqual(cursor.execute.call_count, 2)
+        first_query, first_params = cursor.execute.call_args_list[0].args
+        self.assertTrue(first_query.endswith("VALUES (%s, %s, %s), (%s, %s, %s)"))
+        self.assertEqual(first_params[:3], ["419761", "A\tB", 1.5])
+        self.assertEqual(len(cursor.execute.call_args_list[1].args[1]), 3)
+
+    def test_load_data_infile(self):
+        """Testa o arquivo temporário enviado ao LOAD DATA LOCAL INFILE"""
+        contents = []
+        cursor = MagicMock()
+
+        def read_file(query, params):
+            with open(params[0], encoding="utf-8") as f:
+                contents.append(f.read())
+
+        cursor.execute.side_effect = read_file
+        load_data_infile(cursor, self.df, "demonstracoes_contabeis")
+
+        query = cursor.execute.call_args.args[0]
+        self.assertIn("LOAD DATA LOCAL INFILE %s INTO TABLE demonstracoes_contabeis", query)
+        self.assertIn("DESCRICAO = NULLIF(@DESCRICAO, '')", query)
+        self.assertEqual(
+            contents[0],
+            '419761\tA\\\tB\t1.5\n421545\t\t\n326305\tC \\"D\\"\t3.0\n',
+        )
+
+    def test_load_data_infile_upsert_temporary_table(self):
+        """Testa que a tabela temporária do upsert não copia índices da tabela"""
+        cursor = MagicMock()
+        load_data_infile(cursor, self.df, "operadoras", upsert=True)
+
+        queries = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertEqual(
+            queries[0],
+            "CREATE TEMPORARY TABLE tmp_operadoras "
+            "SELECT REG_ANS, DESCRICAO, VL_SALDO_FINAL FROM operadoras LIMIT 0",
+        )
+        self.assertNotIn("LIKE", queries[0])
+        self.assertIn("INTO TABLE tmp_operadoras", queries[1])
+        self.assertTrue(queries[2].startswith("INSERT INTO operadoras"))
+        self.assertEqual(queries[3], "DROP TEMPORARY TABLE IF EXISTS tmp_operadoras")
+
+    def test_missing_values_and_dates(self):
+        """Testa a conversão de NaN/NaT para None e das datas para date"""
+        cursor = MagicMock()
+        df = pd.DataFrame(
+            {
+                "DATA": pd.to_datetime(["2024-01-01", None]),
+                "VL_SALDO_FINAL": [1.5, float("nan")],
+            }
+        )
+
+        insert_batches(cursor, df, "demonstracoes_contabeis")
+
+        params = cursor.execute.call_args.args[1]
+        self.assertEqual(params, [date(2024, 1, 1), 1.5, None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from scripts.convert_to_parquet import VALUE_COLUMNS, convert_file, main
+from scripts.populate_database import (
+    extract_data,
+    file_hash,
+    list_sources,
+    transform_data,
+)
+from utils.parquet_store import read_parquet
+
+CSV_CONTENT = (
+    '"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";"VL_SALDO_INICIAL";"VL_SALDO_FINAL"\n'
+    '"2024-01-01";"419761";"46411";"DESCRICAO";"1.234,50";"2.000,00"\n'
+    '"2024-01-01";"421545";"31111";"OUTRA DESCRICAO";"";"0,50"\n'
+)
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow não instalado")
+class TestConvertToParquet(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir_data = self.tmp.name
+        self.parquet_dir = os.path.join(self.dir_data, "parquet")
+        for name in ["1T2024.csv", "Relatorio_cadop.csv"]:
+            with open(os.path.join(self.dir_data, name), "w") as f:
+                f.write(CSV_CONTENT)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parquet_sources_match_csv(self):
+        """Testa que os arquivos Parquet geram os mesmos dados e hashes dos csv"""
+        main(self.dir_data, self.parquet_dir)
+        csv_path = os.path.join(self.dir_data, "1T2024.csv")
+
+        sources = list_sources(self.dir_data, "parquet", self.parquet_dir)
+
+        self.assertEqual([file for file, _, _ in sources], ["1T2024.csv"])
+        _, path, _ = sources[0]
+        self.assertEqual(file_hash(path), file_hash(csv_path))
+        expected = transform_data(extract_data(csv_path), VALUE_COLUMNS)
+        pd.testing.assert_frame_equal(
+            transform_data(extract_data(path), VALUE_COLUMNS),
+            expected,
+            check_dtype=False,
+        )
+
+    def test_convert_file_skips_unchanged_source(self):
+        """Testa que o csv só é convertido de novo quando o conteúdo muda"""
+        csv_path = os.path.join(self.dir_data, "1T2024.csv")
+        output = convert_file("1T2024.csv", csv_path, parquet_dir=self.dir_data)
+        modified = os.path.getmtime(output)
+
+        convert_file("1T2024.csv", csv_path, parquet_dir=self.dir_data)
+        self.assertEqual(os.path.getmtime(output), modified)
+
+        with open(csv_path, "a") as f:
+            f.write('"2024-01-01";"326305";"31111";"OUTRA DESCRICAO";"1,00";"2,00"\n')
+        convert_file("1T2024.csv", csv_path, parquet_dir=self.dir_data)
+        self.assertEqual(len(read_parquet(output)), 3)
+
+    def test_read_parquet_prunes_columns(self):
+        """Testa a leitura apenas das colunas pedidas, em blocos"""
+        csv_path = os.path.join(self.dir_data, "1T2024.csv")
+        output = convert_file(
+            "1T2024.csv",
+            csv_path,
+            parquet_dir=self.dir_data,
+            value_columns=VALUE_COLUMNS,
+        )
+
+        columns = ["DATA", "VL_SALDO_FINAL"]
+        chunks = list(read_parquet(output, chunksize=1, columns=columns))
+
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(list(chunks[0].columns), columns)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(chunks[0]["DATA"]))
+        self.assertEqual(chunks[1]["VL_SALDO_FINAL"].iloc[0], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import importlib.util
+import io
+import json
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.backend.core.export import encode, fetch_chunks, supported
+
+COLUMNS = {"data": "date", "reg_ans": "string", "vl_saldo_final": "decimal"}
+ROWS = [
+    (date(2024, 1, 1), "419761", Decimal("1.50")),
+    (None, "421545", None),
+    (date(2024, 4, 1), "326305", Decimal("-2.00")),
+]
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.fetches = []
+
+    async def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        self.fetches.append(len(rows))
+        return rows
+
+
+class TestExport(unittest.TestCase):
+    def export(self, fmt, rows=ROWS, chunk_size=2):
+        async def run():
+            cursor = FakeCursor(rows)
+            parts = [
+                part async for part in encode(fmt, COLUMNS, fetch_chunks(cursor, chunk_size))
+            ]
+            return parts, cursor.fetches
+
+        return asyncio.run(run())
+
+    def test_ndjson(self):
+        """Testa a exportação em ndjson, um bloco por leitura do cursor"""
+        parts, fetches = self.export("ndjson")
+        self.assertEqual(fetches, [2, 1, 0])
+        self.assertEqual(len(parts), 2)
+        rows = [json.loads(line) for line in b"".join(parts).decode().splitlines()]
+        self.assertEqual(
+            rows[0], {"data": "2024-01-01", "reg_ans": "419761", "vl_saldo_final": "1.50"}
+        )
+        self.assertEqual(rows[1]["data"], None)
+
+    def test_csv(self):
+        """Testa a exportação em csv com cabeçalho, inclusive sem linhas"""
+        parts, _ = self.export("csv")
+        lines = b"".join(parts).decode().splitlines()
+        self.assertEqual(lines[0], "data;reg_ans;vl_saldo_final")
+        self.assertEqual(lines[1:], ["2024-01-01;419761;1.50", ";421545;", "2024-04-01;326305;-2.00"])
+
+        parts, _ = self.export("csv", rows=[])
+        self.assertEqual(b"".join(parts).decode().splitlines(), ["data;reg_ans;vl_saldo_final"])
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow não instalado")
+    def test_arrow_and_parquet(self):
+        """Testa a exportação em arrow e parquet com um lote por bloco lido"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.assertTrue(supported("parquet"))
+        parts, _ = self.export("parquet")
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(parts)))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        table = parquet.read()
+        self.assertEqual(table.column("vl_saldo_final").to_pylist(), [r[2] for r in ROWS])
+        self.assertEqual(str(table.schema.field("data").type), "date32[day]")
+
+        parts, _ = self.export("arrow")
+        table = pa.ipc.open_stream(b"".join(parts)).read_all()
+        self.assertEqual(table.column("reg_ans").to_pylist(), [r[1] for r in ROWS])
+
+    def test_unknown_format(self):
+        """Testa que formatos desconhecidos não são aceitos"""
+        self.assertTrue(supported("csv"))
+        self.assertFalse(supported("xlsx"))
+
+
+if __name__ == "__main__":
+    unittest.main()
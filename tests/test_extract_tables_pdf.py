@@ -1,8 +1,11 @@
 import unittest
 import os
+import tempfile
 import pandas as pd
 from unittest.mock import patch, MagicMock
-from scripts.extract_tables_pdf import extract_tables_pdf
+from scripts.extract_tables_pdf import extract_tables_pdf, iter_page_tables
+from utils.page_cache import PageTableCache
+from tests.pdf_fixture import build_table_pdf
 
 
 class TestExtractTables(unittest.TestCase):
@@ -31,6 +34,90 @@ class TestExtractTables(unittest.TestCase):
             if os.path.exists(output_file):
                 os.remove(output_file)
 
+    def test_extract_tables_parallel_matches_serial(self):
+        """Testa que a extração em paralelo gera o mesmo csv da extração serial"""
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "anexo.pdf")
+            build_table_pdf(pdf_path, n_pages=9, rows_per_page=6)
+
+            outputs = []
+            for workers in [1, 3]:
+                output_file = os.path.join(tmp, f"tables_{workers}.csv")
+                extract_tables_pdf(pdf_path, output_file, {"COL0": "Codigo"}, workers)
+                with open(output_file, "rb") as f:
+                    outputs.append(f.read())
+
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertTrue(outputs[0].startswith(b"Codigo,COL1,COL2,COL3"))
+
+    def test_extract_tables_streaming_matches_dataframe(self):
+        """Testa que a escrita incremental gera o mesmo csv do DataFrame"""
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "anexo.pdf")
+            build_table_pdf(pdf_path, n_pages=5, rows_per_page=6)
+
+            outputs = []
+            for stream in [False, True]:
+                output_file = os.path.join(tmp, f"tables_{stream}.csv")
+                extract_tables_pdf(
+                    pdf_path, output_file, {"COL0": "Codigo"}, stream=stream
+                )
+                with open(output_file, "rb") as f:
+                    outputs.append(f.read())
+
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_page_cache_is_read_lazily(self):
+        """Testa que o cache é lido página a página, junto com a extração"""
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "anexo.pdf")
+            cache_dir = os.path.join(tmp, "cache")
+            build_table_pdf(pdf_path, n_pages=4, rows_per_page=5)
+            for workers in [1, 2]:
+                expected = list(iter_page_tables(pdf_path, workers, cache_dir))
+
+                with patch.object(
+                    PageTableCache, "get", autospec=True, side_effect=PageTableCache.get
+                ) as mock_get:
+                    pages = iter_page_tables(pdf_path, workers, cache_dir)
+                    self.assertEqual(next(pages), expected[0])
+                    self.assertEqual(mock_get.call_count, 1)
+                    self.assertEqual([expected[0], *pages], expected)
+                    self.assertEqual(mock_get.call_count, 4)
+
+    def test_extract_tables_page_cache(self):
+        """Testa que páginas inalteradas são lidas do cache numa nova revisão"""
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "anexo.pdf")
+            cache_dir = os.path.join(tmp, "cache")
+            output_file = os.path.join(tmp, "tables.csv")
+
+            build_table_pdf(pdf_path, n_pages=4, rows_per_page=5)
+            extract_tables_pdf(pdf_path, output_file, {}, cache_dir=cache_dir)
+            with open(output_file, "rb") as f:
+                expected = f.read()
+
+            with patch("pdfplumber.page.Page.extract_tables") as mock_extract:
+                extract_tables_pdf(pdf_path, output_file, {}, cache_dir=cache_dir)
+                mock_extract.assert_not_called()
+            with open(output_file, "rb") as f:
+                self.assertEqual(f.read(), expected)
+
+            build_table_pdf(pdf_path, n_pages=5, rows_per_page=5)
+            with patch(
+                "pdfplumber.page.Page.extract_tables", return_value=[]
+            ) as mock_extract:
+                extract_tables_pdf(pdf_path, output_file, {}, cache_dir=cache_dir)
+                self.assertEqual(mock_extract.call_count, 1)
+
+            # same content streams, other font resource
+            build_table_pdf(pdf_path, n_pages=5, rows_per_page=5, base_font="Courier")
+            with patch(
+                "pdfplumber.page.Page.extract_tables", return_value=[]
+            ) as mock_extract:
+                extract_tables_pdf(pdf_path, output_file, {}, cache_dir=cache_dir)
+                self.assertEqual(mock_extract.call_count, 5)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,113 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from scripts import convert_to_parquet
+from scripts.local_reports import (
+    connect,
+    top_expenses,
+    top_expenses_last_quarter,
+    top_expenses_last_year,
+    verify,
+)
+
+EVENTOS = "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS  DE ASSISTÊNCIA A SAÚDE"
+HEADER = '"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";"VL_SALDO_INICIAL";"VL_SALDO_FINAL"\n'
+QUARTERS = {
+    "1T2023.csv": [
+        ("2023-01-01", "419761", "411", EVENTOS, "100,00"),
+        ("2023-01-01", "421545", "411", EVENTOS, "50,00"),
+    ],
+    "4T2023.csv": [
+        ("2023-10-01", "421545", "411", EVENTOS, "1.000,00"),
+        ("2023-10-01", "419761", "311", "OUTRAS RECEITAS", "999,00"),
+    ],
+    "1T2024.csv": [
+        ("2024-01-01", "419761", "411", EVENTOS.lower(), "10,00"),
+        ("2024-01-01", "999999", "411", EVENTOS, "5.000,00"),
+    ],
+}
+OPERADORAS = (
+    '"Registro_ANS";"CNPJ";"Razao_Social";"Nome_Fantasia"\n'
+    '"419761";"1";"OPERADORA A";"A"\n'
+    '"421545";"2";"OPERADORA B";"B"\n'
+)
+
+
+def report_row(razao_social: str, nome_fantasia: str, total: str) -> dict:
+    return {
+        "razao_social": razao_social,
+        "nome_fantasia": nome_fantasia,
+        "total_despesas": Decimal(total),
+    }
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec("duckdb") and importlib.util.find_spec("pyarrow"),
+    "duckdb ou pyarrow não instalado",
+)
+class TestLocalReports(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir_data = self.tmp.name
+        self.parquet_dir = os.path.join(self.dir_data, "parquet")
+        for name, rows in QUARTERS.items():
+            with open(os.path.join(self.dir_data, name), "w", encoding="utf-8") as f:
+                f.write(HEADER)
+                for row in rows:
+                    f.write(";".join(f'"{value}"' for value in (*row[:4], "0", row[4])))
+                    f.write("\n")
+        with open(os.path.join(self.dir_data, "Relatorio_cadop.csv"), "w") as f:
+            f.write(OPERADORAS)
+
+        self.quarter = [
+            report_row("OPERADORA B", "B", "1000.00"),
+            report_row("OPERADORA A", "A", "10.00"),
+        ]
+        self.year = [
+            report_row("OPERADORA B", "B", "1050.00"),
+            report_row("OPERADORA A", "A", "110.00"),
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_reports(self, con):
+        self.assertEqual(top_expenses_last_quarter(con), self.quarter)
+        self.assertEqual(top_expenses_last_year(con), self.year)
+        self.assertEqual(
+            top_expenses(con, date(2023, 1, 1), date(2023, 3, 31), limit=1),
+            [report_row("OPERADORA A", "A", "100.00")],
+        )
+
+    def test_reports_from_csv(self):
+        """Testa os relatórios calculados direto dos csv, sem banco de dados"""
+        con = connect(self.dir_data, self.parquet_dir)
+        self.assert_reports(con)
+
+    def test_reports_from_parquet(self):
+        """Testa os relatórios calculados dos arquivos Parquet convertidos"""
+        convert_to_parquet.main(self.dir_data, self.parquet_dir)
+        for name in QUARTERS:
+            os.remove(os.path.join(self.dir_data, name))
+
+        con = connect(self.dir_data, self.parquet_dir)
+        self.assert_reports(con)
+
+    def test_verify_against_db_reports(self):
+        """Testa a comparação com os relatórios do banco, aceitando empates em outra ordem"""
+        con = connect(self.dir_data, self.parquet_dir)
+        cursor = MagicMock()
+        cursor.fetchall.side_effect = [list(reversed(self.quarter)), self.year]
+        self.assertTrue(verify(con, cursor))
+
+        cursor.fetchall.side_effect = [self.quarter, self.year[:1]]
+        self.assertFalse(verify(con, cursor))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import unittest
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from app.backend.core.operator_index import OperatorIndex, OperatorIndexService
+from app.backend.core.pagination import decode_cursor, encode_cursor, project
+
+ROWS = [
+    {
+        "registro_ans": "419761",
+        "cnpj": "19541931000125",
+        "razao_social": "SAÚDE TOTAL LTDA",
+        "nome_fantasia": "VIDA",
+        "cidade": "São Paulo",
+        "data_registro_ans": date(2015, 1, 1),
+    },
+    {
+        "registro_ans": "421545",
+        "cnpj": "22869997000153",
+        "razao_social": "ASSOCIAÇÃO DE SAUDE",
+        "nome_fantasia": None,
+        "cidade": "Santos",
+        "data_registro_ans": date(2020, 1, 1),
+    },
+    {
+        "registro_ans": "326305",
+        "cnpj": "03589068000146",
+        "razao_social": "PLANO NORTE",
+        "nome_fantasia": "SAUDE NORTE",
+        "cidade": "Belém",
+        "data_registro_ans": None,
+    },
+]
+
+
+class FakeDatabase:
+    def __init__(self, rows, version):
+        self.rows = rows
+        self.version = version
+
+    async def fetch_one(self, query):
+        return SimpleNamespace(_mapping={"carregado_em": self.version, "arquivos": 1})
+
+    async def fetch_all(self, query):
+        return [SimpleNamespace(_mapping=row) for row in self.rows]
+
+
+class TestOperatorIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = OperatorIndex(ROWS)
+
+    def registros(self, **filters):
+        return [row["registro_ans"] for row in self.index.search(**filters)]
+
+    def test_exact_filters(self):
+        """Testa os filtros exatos por registro_ans e cnpj"""
+        self.assertEqual(self.registros(registro_ans="421545"), ["421545"])
+        self.assertEqual(self.registros(cnpj="03589068000146"), ["326305"])
+        self.assertEqual(self.registros(registro_ans="421545", cnpj="03589068000146"), [])
+        self.assertEqual(self.registros(), ["421545", "419761", "326305"])
+
+    def test_text_search(self):
+        """Testa a busca sem acento e maiúsculas, ordenada por relevância e data"""
+        self.assertEqual(self.registros(razao_social="saude"), ["419761", "421545", "326305"])
+        self.assertEqual(self.registros(razao_social="vida"), ["419761"])
+        self.assertEqual(self.registros(cidade="sa"), ["421545", "419761"])
+        self.assertEqual(self.registros(razao_social="saude", cidade="belem"), ["326305"])
+        self.assertEqual(self.registros(razao_social="saude", limit=1), ["419761"])
+        self.assertEqual(self.registros(razao_social="ltda vida"), [])
+
+    def test_keyset_pagination(self):
+        """Testa a paginação por cursor, inclusive com data de registro nula"""
+        rows = ROWS + [
+            {**ROWS[0], "registro_ans": registro, "cnpj": registro}
+            for registro in ["500000", "400000"]
+        ] + [{**ROWS[2], "registro_ans": "300000"}]
+        index = OperatorIndex(rows)
+        for filters in [{}, {"razao_social": "saude"}]:
+            expected = [row["registro_ans"] for row in index.search(limit=100, **filters)]
+            pages, after = [], None
+            while True:
+                page = index.search(after=after, limit=2, **filters)
+                if not page:
+                    break
+                pages += [row["registro_ans"] for row in page]
+                after = decode_cursor(encode_cursor(page[-1], "index"))
+            self.assertEqual(pages, expected)
+            self.assertEqual(len(pages), 6)
+        self.assertEqual(expected[:2], ["500000", "419761"])
+        self.assertEqual(
+            project(index.search(limit=1)[0], ["cnpj", "cidade"]),
+            {"cnpj": "22869997000153", "cidade": "Santos"},
+        )
+
+    def test_service_refreshes_on_new_load(self):
+        """Testa a troca do índice quando o ETL carrega novos arquivos"""
+
+        async def run():
+            db = FakeDatabase(ROWS[:1], datetime(2025, 1, 1))
+            service = OperatorIndexService(db, poll_interval=60)
+            self.assertIsNone(service.search(registro_ans="419761"))
+
+            self.assertTrue(await service.refresh())
+            self.assertFalse(await service.refresh())
+
+            db.rows, db.version = ROWS, datetime(2025, 1, 2)
+            self.assertTrue(await service.refresh())
+            return service.search(registro_ans="421545")
+
+        self.assertEqual(len(asyncio.run(run())), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from functools import partial
+from unittest.mock import MagicMock
+
+from utils.pipeline import Pipeline, Stage
+
+
+def record(path: str, name: str, seconds: float = 0.0) -> None:
+    start = time.time()
+    time.sleep(seconds)
+    with open(path, "a") as f:
+        f.write(json.dumps({"name": name, "start": start, "end": time.time()}) + "\n")
+
+
+def fail() -> None:
+    raise RuntimeError("stage failed")
+
+
+def allocate(megabytes: int) -> None:
+    data = b"x" * (megabytes * 2**20)
+    del data
+
+
+def log_error(path: str, name: str) -> bool:
+    # like the scripts main functions, which log their errors and return
+    record(path, name)
+    return False
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.runs = os.path.join(self.tmp.name, "runs.jsonl")
+        self.state = os.path.join(self.tmp.name, "state.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_runs(self) -> dict[str, dict]:
+        if not os.path.exists(self.runs):
+            return {}
+        with open(self.runs) as f:
+            return {run["name"]: run for run in map(json.loads, f)}
+
+    def test_independent_branches_run_concurrently(self):
+        """Testa que ramos independentes rodam ao mesmo tempo e dependências esperam"""
+        stages = [
+            Stage("a", partial(record, self.runs, "a", 0.5)),
+            Stage("b", partial(record, self.runs, "b", 0.5)),
+            Stage("c", partial(record, self.runs, "c"), ["a", "b"]),
+        ]
+
+        results = Pipeline(stages, self.state, MagicMock()).run()
+
+        runs = self.read_runs()
+        self.assertLess(runs["b"]["start"], runs["a"]["end"])
+        self.assertGreaterEqual(runs["c"]["start"], max(runs["a"]["end"], runs["b"]["end"]))
+        self.assertEqual({result["status"] for result in results.values()}, {"ok"})
+        self.assertGreater(results["a"]["seconds"], 0.4)
+        self.assertIn("peak_memory", results["a"])
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "ru_maxrss em KiB só no Linux")
+    def test_peak_memory_is_per_stage(self):
+        """Testa que o pico de memória é só o da etapa, não o do processo principal"""
+        ballast = b"x" * (200 * 2**20)  # the pipeline process is large
+        stages = [Stage("small", partial(allocate, 1)), Stage("large", partial(allocate, 100))]
+
+        results = Pipeline(stages, self.state, MagicMock()).run()
+
+        del ballast
+        self.assertLess(results["small"]["peak_memory"], 50 * 2**20)
+        self.assertGreater(results["large"]["peak_memory"], 90 * 2**20)
+
+    def test_skips_unchanged_inputs(self):
+        """Testa que a etapa só roda de novo quando as entradas mudam ou é pedida"""
+        input_file = os.path.join(self.tmp.name, "1T2024.csv")
+        with open(input_file, "w") as f:
+            f.write("a")
+        stages = [
+            Stage(
+                "load",
+                partial(record, self.runs, "load"),
+                inputs=[os.path.join(self.tmp.name, "*.csv")],
+            )
+        ]
+        pipeline = Pipeline(stages, self.state, MagicMock())
+
+        self.assertEqual(pipeline.run()["load"]["status"], "ok")
+        self.assertEqual(pipeline.run()["load"]["status"], "skipped")
+        self.assertEqual(pipeline.run(only=["load"])["load"]["status"], "ok")
+
+        # extracted again with the same content, as after a 304 of its zip
+        with open(input_file, "w") as f:
+            f.write("a")
+        os.utime(input_file, (time.time() + 60, time.time() + 60))
+        self.assertEqual(pipeline.run()["load"]["status"], "skipped")
+
+        with open(input_file, "a") as f:
+            f.write("b")
+        self.assertEqual(pipeline.run()["load"]["status"], "ok")
+
+    def test_failed_stage_blocks_dependents(self):
+        """Testa que as dependentes de uma etapa com erro não rodam"""
+        stages = [
+            Stage("a", fail),
+            Stage("b", partial(record, self.runs, "b"), ["a"]),
+            Stage("c", partial(record, self.runs, "c")),
+        ]
+
+        results = Pipeline(stages, self.state, MagicMock()).run()
+
+        self.assertEqual(results["a"]["status"], "failed")
+        self.assertIn("stage failed", results["a"]["error"])
+        self.assertEqual(results["b"]["status"], "blocked")
+        self.assertEqual(results["c"]["status"], "ok")
+        self.assertEqual(list(self.read_runs()), ["c"])
+
+    def test_stage_reporting_failure_is_not_skipped(self):
+        """Testa que uma etapa que registra o erro e retorna False falha e roda de novo"""
+        input_file = os.path.join(self.tmp.name, "1T2024.csv")
+        with open(input_file, "w") as f:
+            f.write("a")
+        stages = [
+            Stage(
+                "load",
+                partial(log_error, self.runs, "load"),
+                inputs=[os.path.join(self.tmp.name, "*.csv")],
+            ),
+            Stage("report", partial(record, self.runs, "report"), ["load"]),
+        ]
+        pipeline = Pipeline(stages, self.state, MagicMock())
+
+        results = pipeline.run()
+        self.assertEqual(results["load"]["status"], "failed")
+        self.assertEqual(results["report"]["status"], "blocked")
+        self.assertFalse(os.path.exists(self.state))
+        self.assertEqual(pipeline.run()["load"]["status"], "failed")
+
+    def test_rejects_cycles(self):
+        """Testa a validação de dependências inexistentes e ciclos"""
+        with self.assertRaises(ValueError):
+            Pipeline([Stage("a", fail, ["b"]), Stage("b", fail, ["a"])], self.state, MagicMock())
+        with self.assertRaises(ValueError):
+            Pipeline([Stage("a", fail, ["x"])], self.state, MagicMock())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,459 @@
+import os
+import tempfile
+import threading
+import unittest
+import zipfile
+from unittest.mock import MagicMock, patch
+
+from datetime import date
+
+import pandas as pd
+
+from scripts.populate_database import (
+    AGREGADAS_INDEXES,
+    AccountDimension,
+    add_missing_indexes,
+    ensure_partitions,
+    exchange_partition,
+    etl,
+    extract_data,
+    OperatorRegistry,
+    file_hash,
+    ingest_parallel,
+    load_chunk,
+    main,
+    refresh_aggregates,
+    swap_staging_table,
+    transform_data,
+    list_sources,
+    open_source,
+    prefetch,
+)
+
+CSV_CONTENT = (
+    '"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";"VL_SALDO_INICIAL";"VL_SALDO_FINAL"\n'
+    '"2024-01-01";"419761";"46411";"DESCRICAO";"1.234,50";"2.000,00"\n'
+    '"2024-01-01";"421545";"31111";"OUTRA DESCRICAO";"10,00";"0,50"\n'
+)
+
+
+class TestPopulateDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir_data = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_list_sources_csv(self):
+        """Testa a listagem dos csv extraídos ignorando os arquivos de outras etapas"""
+        for name in ["1T2024.csv", "Relatorio_cadop.csv", "tables_ans.csv"]:
+            with open(os.path.join(self.dir_data, name), "w") as f:
+                f.write(CSV_CONTENT)
+
+        sources = list_sources(self.dir_data, "csv")
+
+        self.assertEqual(sources, [("1T2024.csv", f"{self.dir_data}/1T2024.csv", None)])
+
+    def test_list_sources_zip_streams_members(self):
+        """Testa a leitura dos csv direto do zip, sem extrair para o disco"""
+        with zipfile.ZipFile(os.path.join(self.dir_data, "1T2024.zip"), "w") as zip:
+            zip.writestr("1T2024.csv", CSV_CONTENT)
+            zip.writestr("leiame.txt", "ignored")
+
+        frames = []
+        for name, path, member in list_sources(self.dir_data, "zip"):
+            with open_source(path, member) as stream:
+                frames.append((name, extract_data(stream)))
+
+        self.assertEqual([name for name, _ in frames], ["1T2024.csv"])
+        self.assertEqual(len(frames[0][1]), 2)
+        self.assertEqual(os.listdir(self.dir_data), ["1T2024.zip"])
+
+    @patch("scripts.populate_database.load_in_db")
+    def test_etl_commits_per_chunk(self, mock_load):
+        """Testa o processamento em blocos com commit a cada bloco"""
+        file_path = os.path.join(self.dir_data, "1T2024.csv")
+        with open(file_path, "w") as f:
+            f.write(CSV_CONTENT + CSV_CONTENT.split("\n", 1)[1])
+        cursor = MagicMock()
+
+        etl(
+            cursor,
+            file_path,
+            "demonstracoes_contabeis",
+            ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"],
+            chunksize=3,
+        )
+
+        self.assertEqual([len(call.args[1]) for call in mock_load.call_args_list], [3, 1])
+        self.assertEqual(cursor.connection.commit.call_count, 2)
+        first_chunk = mock_load.call_args_list[0].args[1]
+        self.assertEqual(first_chunk["VL_SALDO_INICIAL"].tolist(), [1234.5, 10.0, 1234.5])
+
+    def test_prefetch_propagates_errors(self):
+        """Testa que erros na leitura em segundo plano chegam ao consumidor"""
+
+        def chunks():
+            yield 1
+            raise ValueError("broken csv")
+
+        consumed = []
+        with self.assertRaises(ValueError):
+            for chunk in prefetch(chunks()):
+                consumed.append(chunk)
+        self.assertEqual(consumed, [1])
+
+    def test_prefetch_stops_producer_when_consumer_fails(self):
+        """Testa que a leitura em segundo plano para quando o consumidor falha"""
+        produced = []
+        closed = threading.Event()
+
+        def chunks():
+            try:
+                for number in range(100):
+                    produced.append(number)
+                    yield number
+            finally:
+                closed.set()
+
+        with self.assertRaises(ValueError):
+            for chunk in prefetch(chunks()):
+                raise ValueError("db error")
+
+        self.assertTrue(closed.is_set())
+        self.assertLess(len(produced), 5)
+        self.assertFalse(
+            any(thread.name.startswith("prefetch") for thread in threading.enumerate())
+        )
+
+    @patch("scripts.populate_database.load_in_db")
+    def test_ingest_parallel_commits_per_file(self, mock_load):
+        """Testa a carga paralela com commit ou rollback por arquivo"""
+        for name in ["1T2024.csv", "2T2024.csv", "3T2024.csv"]:
+            with open(os.path.join(self.dir_data, name), "w") as f:
+                f.write(CSV_CONTENT)
+        connections = []
+
+        def load(cursor, df, table_name, **kwargs):
+            if cursor.broken:
+                raise ValueError("broken connection")
+
+        mock_load.side_effect = load
+
+        def connect():
+            conn = MagicMock()
+            conn.cursor.return_value.__enter__.return_value.broken = not connections
+            connections.append(conn)
+            return conn
+
+        timings = ingest_parallel(
+            list_sources(self.dir_data, "csv"),
+            connect,
+            "demonstracoes_contabeis",
+            ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"],
+            workers=2,
+            db_connections=2,
+        )
+
+        self.assertEqual(len(timings), 3)
+        ok = [timing for timing in timings if timing["status"] == "ok"]
+        failed = [timing for timing in timings if timing["status"] == "failed"]
+        self.assertEqual(len(ok) + len(failed), 3)
+        self.assertTrue(all(timing["rows"] == 2 for timing in ok))
+        commits = sum(conn.commit.call_count for conn in connections)
+        rollbacks = sum(conn.rollback.call_count for conn in connections)
+        self.assertEqual((commits, rollbacks), (len(ok), len(failed)))
+        self.assertTrue(all(conn.close.called for conn in connections))
+
+    @patch("scripts.populate_database.load_in_db")
+    def test_ingest_parallel_streams_chunks(self, mock_load):
+        """Testa que os blocos chegam um a um e que um erro no meio não trava o worker"""
+        rows = CSV_CONTENT.split("\n", 1)[1]
+        for name in ["1T2024.csv", "2T2024.csv"]:
+            with open(os.path.join(self.dir_data, name), "w") as f:
+                f.write(CSV_CONTENT + rows * 10)
+        loaded = []
+
+        def load(cursor, df, table_name, **kwargs):
+            loaded.append(len(df))
+            if len(loaded) == 3:
+                raise ValueError("db error in the middle of a file")
+
+        mock_load.side_effect = load
+
+        timings = ingest_parallel(
+            list_sources(self.dir_data, "csv"),
+            MagicMock,
+            "demonstracoes_contabeis",
+            ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"],
+            workers=2,
+            db_connections=1,
+            chunksize=2,
+            queued_chunks=1,
+        )
+
+        self.assertEqual(set(loaded), {2})
+        self.assertEqual(
+            sorted(timing["status"] for timing in timings), ["failed", "ok"]
+        )
+        ok = next(timing for timing in timings if timing["status"] == "ok")
+        self.assertEqual(ok["rows"], 22)
+
+    @patch("scripts.populate_database.pymysql.connect")
+    def test_local_infile_only_for_load_data(self, mock_connect):
+        """Testa que o local_infile só é ligado quando uma tabela usa load_data"""
+        mock_connect.side_effect = ConnectionError("no db")
+        engines = {"operadoras": "executemany", "demonstracoes_contabeis": "batch"}
+
+        with patch.dict("scripts.populate_database.TABLE_LOAD_ENGINES", engines):
+            self.assertFalse(main())
+            self.assertFalse(mock_connect.call_args.kwargs["local_infile"])
+
+            engines["operadoras"] = "load_data"
+            with patch.dict("scripts.populate_database.TABLE_LOAD_ENGINES", engines):
+                self.assertFalse(main())
+            self.assertTrue(mock_connect.call_args.kwargs["local_infile"])
+
+    def test_operator_registry_rejects_unknown_operators(self):
+        """Testa o filtro de operadoras e o arquivo de rejeitados"""
+        rejects_dir = os.path.join(self.dir_data, "rejects")
+        registry = OperatorRegistry(rejects_dir)
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [{"registro_ans": "419761"}]
+        registry.refresh(cursor)
+
+        file_path = os.path.join(self.dir_data, "1T2024.csv")
+        with open(file_path, "w") as f:
+            f.write(CSV_CONTENT)
+        for df in extract_data(file_path, chunksize=1):
+            valid = registry.filter(df, "1T2024.csv")
+
+        self.assertEqual(cursor.execute.call_count, 1)
+        self.assertEqual(valid["REG_ANS"].tolist(), [])
+        self.assertEqual(registry.rejected, {"1T2024.csv": 1})
+        with open(registry.reject_file("1T2024.csv")) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith("2024-01-01;421545"))
+
+    def test_file_hash_same_for_csv_and_zip_member(self):
+        """Testa que o hash do csv extraído e do membro do zip coincidem"""
+        file_path = os.path.join(self.dir_data, "1T2024.csv")
+        zip_path = os.path.join(self.dir_data, "1T2024.zip")
+        with open(file_path, "w") as f:
+            f.write(CSV_CONTENT)
+        with zipfile.ZipFile(zip_path, "w") as zip:
+            zip.write(file_path, "1T2024.csv")
+
+        self.assertEqual(file_hash(file_path), file_hash(zip_path, "1T2024.csv"))
+
+    @patch("scripts.populate_database.load_in_db")
+    def test_load_chunk_replaces_each_quarter_once(self, mock_load):
+        """Testa que cada trimestre do arquivo é apagado uma única vez antes da carga"""
+        file_path = os.path.join(self.dir_data, "1T2024.csv")
+        with open(file_path, "w") as f:
+            f.write(CSV_CONTENT)
+        cursor = MagicMock()
+        replaced_dates: set[str] = set()
+
+        for df in extract_data(file_path, chunksize=1):
+            load_chunk(
+                cursor,
+                df,
+                "demonstracoes_contabeis",
+                source="1T2024.csv",
+                replaced_dates=replaced_dates,
+            )
+
+        cursor.execute.assert_called_once_with(
+            "DELETE FROM demonstracoes_contabeis WHERE data IN (%s)", ["2024-01-01"]
+        )
+        self.assertEqual(mock_load.call_count, 2)
+
+    def test_swap_staging_table_rejects_orphans(self):
+        """Testa que a tabela de staging não entra no lugar com registros órfãos"""
+        cursor = MagicMock()
+        cursor.fetchall.return_value = []
+        cursor.fetchone.return_value = {"total": 10, "orfaos": 2}
+
+        with self.assertRaises(Exception):
+            swap_staging_table(cursor)
+
+        queries = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertFalse(any("RENAME TABLE" in query for query in queries))
+
+    def test_swap_staging_table(self):
+        """Testa a criação dos índices e a troca atômica da tabela de staging"""
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [{"index_name": "idx_data"}]
+        cursor.fetchone.return_value = {"total": 10, "orfaos": 0}
+
+        swap_staging_table(cursor)
+
+        queries = [call.args[0] for call in cursor.execute.call_args_list]
+        alter = next(query for query in queries if "ADD INDEX" in query)
+        self.assertIn("idx_conta_data_reg_ans", alter)
+        self.assertNotIn("idx_data ", alter)
+        self.assertTrue(any("RENAME TABLE" in query for query in queries))
+
+    def test_aggregates_get_the_data_index(self):
+        """Testa que uma tabela de agregados antiga ganha o índice por data"""
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [{"index_name": "PRIMARY"}]
+
+        add_missing_indexes(cursor, "despesas_agregadas", AGREGADAS_INDEXES)
+
+        self.assertEqual(
+            cursor.execute.call_args.args[0],
+            "ALTER TABLE despesas_agregadas ADD INDEX idx_data (data)",
+        )
+
+        cursor.reset_mock()
+        cursor.fetchall.return_value = [{"index_name": "PRIMARY"}, {"index_name": "idx_data"}]
+        add_missing_indexes(cursor, "despesas_agregadas", AGREGADAS_INDEXES)
+        self.assertEqual(cursor.execute.call_count, 1)
+
+    def test_refresh_aggregates_only_touches_loaded_quarters(self):
+        """Testa a atualização incremental dos agregados pelos trimestres do arquivo"""
+        cursor = MagicMock()
+
+        refresh_aggregates(cursor, {"2024-01-01"})
+
+        delete, insert = cursor.execute.call_args_list
+        self.assertEqual(
+            delete.args,
+            ("DELETE FROM despesas_agregadas WHERE data IN (%s)", ["2024-01-01"]),
+        )
+        query, params = insert.args
+        self.assertIn("d.data IN (%s)", query)
+        self.assertIn("JOIN contas c", query)
+        self.assertNotIn("EVENTOS", query)
+        self.assertEqual(params[-1], "2024-01-01")
+
+        cursor.reset_mock()
+        refresh_aggregates(cursor, set())
+        cursor.execute.assert_not_called()
+
+    def test_account_dimension_registers_new_accounts_once(self):
+        """Testa o cadastro das contas novas com categoria e a remoção da descrição"""
+        file_path = os.path.join(self.dir_data, "1T2024.csv")
+        with open(file_path, "w") as f:
+            f.write(CSV_CONTENT)
+        df = extract_data(file_path)
+        df.loc[0, "DESCRICAO"] = (
+            "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS  DE ASSISTÊNCIA A SAÚDE"
+        )
+        accounts = AccountDimension()
+        cursor = MagicMock()
+
+        loaded = accounts.register(cursor, df)
+
+        self.assertNotIn("DESCRICAO", loaded.columns)
+        query, rows = cursor.executemany.call_args.args
+        self.assertIn("INSERT INTO contas", query)
+        self.assertEqual(
+            [(cd_conta, categoria) for cd_conta, _, categoria in rows],
+            [("31111", None), ("46411", "EVENTOS_SINISTROS_ASSISTENCIA")],
+        )
+
+        cursor.reset_mock()
+        accounts.register(cursor, df)
+        cursor.executemany.assert_not_called()
+
+    def test_ensure_partitions_splits_pmax_and_first_partition(self):
+        """Testa a criação das partições trimestrais que faltam nas duas pontas"""
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [
+            {"partition_name": "p2023q4"},
+            {"partition_name": "pmax"},
+        ]
+
+        ensure_partitions(cursor, [date(2023, 7, 1), date(2024, 4, 1)])
+
+        queries = [call.args[0] for call in cursor.execute.call_args_list[1:]]
+        self.assertEqual(len(queries), 2)
+        self.assertIn("REORGANIZE PARTITION pmax", queries[0])
+        self.assertIn("PARTITION p2024q1 VALUES LESS THAN ('2024-04-01')", queries[0])
+        self.assertIn("PARTITION p2024q2 VALUES LESS THAN ('2024-07-01')", queries[0])
+        self.assertIn("VALUES LESS THAN (MAXVALUE)", queries[0])
+        self.assertIn("REORGANIZE PARTITION p2023q4", queries[1])
+        self.assertIn("PARTITION p2023q3 VALUES LESS THAN ('2023-10-01')", queries[1])
+        self.assertIn("PARTITION p2023q4 VALUES LESS THAN ('2024-01-01')", queries[1])
+
+    def test_exchange_partition_swaps_single_quarter(self):
+        """Testa a troca da partição quando o arquivo tem um único trimestre"""
+        cursor = MagicMock()
+        cursor.fetchall.side_effect = [
+            [{"data": date(2024, 1, 1)}],
+            [{"partition_name": "p2024q1"}, {"partition_name": "pmax"}],
+        ]
+
+        replaced = exchange_partition(cursor, "demonstracoes_contabeis_staging_1t2024")
+
+        self.assertEqual(replaced, {"2024-01-01"})
+        queries = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertIn("EXCHANGE PARTITION p2024q1", queries[-1])
+        self.assertFalse(any("DELETE" in query for query in queries))
+
+    def test_exchange_partition_copies_several_quarters(self):
+        """Testa a cópia dos trimestres quando o arquivo tem mais de um"""
+        cursor = MagicMock()
+        cursor.fetchall.side_effect = [
+            [{"data": date(2024, 1, 1)}, {"data": date(2024, 4, 1)}],
+            [
+                {"partition_name": "p2024q1"},
+                {"partition_name": "p2024q2"},
+                {"partition_name": "pmax"},
+            ],
+        ]
+
+        replaced = exchange_partition(cursor, "demonstracoes_contabeis_staging_x")
+
+        self.assertEqual(replaced, {"2024-01-01", "2024-04-01"})
+        delete, insert = cursor.execute.call_args_list[-2:]
+        self.assertEqual(delete.args[1], ["2024-01-01", "2024-04-01"])
+        self.assertIn("SELECT data, reg_ans", insert.args[0])
+        queries = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertFalse(any("EXCHANGE" in query for query in queries))
+
+    def test_transform_data_parses_values_and_dates(self):
+        """Testa a leitura dos valores no formato brasileiro e das datas em tipo nativo"""
+        file_path = os.path.join(self.dir_data, "1T2024.csv")
+        with open(file_path, "w") as f:
+            f.write(CSV_CONTENT)
+            f.write('"01/04/2024";"419761";"46411";"DESCRICAO";"";"3,00"\n')
+        value_columns = ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"]
+
+        df = extract_data(file_path)
+        df = transform_data(df, value_columns)
+
+        self.assertEqual(df["VL_SALDO_INICIAL"].tolist()[:2], [1234.5, 10.0])
+        self.assertTrue(pd.isna(df["VL_SALDO_INICIAL"].iloc[2]))
+        self.assertEqual(df["REG_ANS"].tolist(), ["419761", "421545", "419761"])
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["DATA"]))
+        self.assertEqual(
+            [day.date() for day in df["DATA"]],
+            [date(2024, 1, 1), date(2024, 1, 1), date(2024, 4, 1)],
+        )
+
+    def test_malformed_value_does_not_reject_the_file(self):
+        """Testa que um valor malformado vira nulo sem rejeitar o arquivo"""
+        file_path = os.path.join(self.dir_data, "1T2024.csv")
+        with open(file_path, "w") as f:
+            f.write(CSV_CONTENT)
+            f.write('"2024-01-01";"419761";"46411";"DESCRICAO";"abc";"3,00"\n')
+        value_columns = ["VL_SALDO_INICIAL", "VL_SALDO_FINAL"]
+
+        for backend in ["numpy", "pyarrow"]:
+            with self.assertLogs(level="WARNING") as logs:
+                df = transform_data(extract_data(file_path, dtype_backend=backend), value_columns)
+
+            self.assertEqual(df["VL_SALDO_INICIAL"].tolist()[:2], [1234.5, 10.0])
+            self.assertTrue(pd.isna(df["VL_SALDO_INICIAL"].iloc[2]))
+            self.assertEqual(df["VL_SALDO_FINAL"].tolist(), [2000.0, 0.5, 3.0])
+            self.assertIn("1 malformed values of VL_SALDO_INICIAL", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+from datetime import date
+
+from app.backend.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.backend.core.queries import build_query, fulltext_term, text_condition
+
+NAMES_MATCH = "MATCH(razao_social, nome_fantasia) AGAINST (:razao_social IN BOOLEAN MODE)"
+
+
+class TestQueries(unittest.TestCase):
+    def test_long_term_uses_fulltext(self):
+        """Testa que termos do tamanho do ngram usam o índice full-text"""
+        params, relevance = {}, []
+        condition = text_condition("razao_social", "Saúde Total", params, relevance)
+
+        self.assertEqual(condition, NAMES_MATCH)
+        self.assertEqual(params, {"razao_social": '"Saúde Total"'})
+        self.assertEqual(relevance, [NAMES_MATCH])
+
+    def test_short_term_falls_back_to_like(self):
+        """Testa que termos menores que o ngram usam LIKE e não entram na relevância"""
+        params, relevance = {}, []
+        condition = text_condition("razao_social", "A", params, relevance)
+
+        self.assertEqual(
+            condition, "(razao_social LIKE :razao_social OR nome_fantasia LIKE :razao_social)"
+        )
+        self.assertEqual(params, {"razao_social": "%A%"})
+        self.assertEqual(relevance, [])
+
+        params, relevance = {}, []
+        text_condition("cidade", "São Paulo", params, relevance, ngram_token_size=4)
+        self.assertEqual(params, {"cidade": "%São Paulo%"})
+
+    def test_boolean_operators_are_escaped(self):
+        """Testa que os operadores do BOOLEAN MODE viram separadores da frase"""
+        self.assertEqual(fulltext_term('+vida -"total" <a> (b) ~c* @2'), '"vida total a b c 2"')
+        self.assertIsNone(fulltext_term('+-<>()~*"@'))
+
+        params, relevance = {}, []
+        condition = text_condition("cidade", '"+São*', params, relevance)
+        self.assertEqual(params, {"cidade": '"São"'})
+        self.assertIn("AGAINST (:cidade IN BOOLEAN MODE)", condition)
+
+        # only operators, nothing to match
+        params, relevance = {}, []
+        text_condition("cidade", "~*", params, relevance)
+        self.assertEqual(params, {"cidade": "%~*%"})
+        self.assertEqual(relevance, [])
+
+    def test_text_filters_order_by_relevance(self):
+        """Testa que a busca com texto ordena pela soma das relevâncias"""
+        query, params = build_query(razao_social="vida", cidade="rio", limit=11)
+
+        relevance = (
+            f"ROUND({NAMES_MATCH} + MATCH(cidade) AGAINST (:cidade IN BOOLEAN MODE), 6)"
+        )
+        self.assertEqual(
+            query,
+            f"SELECT *, {relevance} AS relevancia FROM operadoras"
+            f" WHERE {NAMES_MATCH} AND MATCH(cidade) AGAINST (:cidade IN BOOLEAN MODE)"
+            " ORDER BY relevancia DESC, data_registro_ans DESC, registro_ans DESC LIMIT 11",
+        )
+        self.assertEqual(params, {"razao_social": '"vida"', "cidade": '"rio"'})
+
+    def test_without_text_filters_orders_by_key(self):
+        """Testa a ordem sem filtros de texto e as colunas da chave na projeção"""
+        query, params = build_query(cnpj="19541931000125", fields=["cnpj", "registro_ans"])
+
+        self.assertEqual(
+            query,
+            "SELECT cnpj, registro_ans, data_registro_ans FROM operadoras"
+            " WHERE cnpj = :cnpj ORDER BY data_registro_ans DESC, registro_ans DESC LIMIT 10",
+        )
+        self.assertEqual(params, {"cnpj": "19541931000125"})
+
+    def test_keyset_without_text_filters(self):
+        """Testa o predicado do cursor sem relevância, inclusive com data nula"""
+        after = {
+            "source": "db",
+            "relevancia": None,
+            "data_registro_ans": date(2015, 1, 1),
+            "registro_ans": "419761",
+        }
+        query, params = build_query(cnpj="1", after=after)
+
+        self.assertEqual(
+            query,
+            "SELECT * FROM operadoras WHERE cnpj = :cnpj"
+            " AND (data_registro_ans < :after_data_registro_ans"
+            " OR (data_registro_ans = :after_data_registro_ans"
+            " AND registro_ans < :after_registro_ans)"
+            " OR data_registro_ans IS NULL)"
+            " ORDER BY data_registro_ans DESC, registro_ans DESC LIMIT 10",
+        )
+        self.assertEqual(
+            params,
+            {
+                "cnpj": "1",
+                "after_registro_ans": "419761",
+                "after_data_registro_ans": date(2015, 1, 1),
+            },
+        )
+
+        query, params = build_query(after={**after, "data_registro_ans": None})
+        self.assertIn(
+            " WHERE (data_registro_ans IS NULL AND registro_ans < :after_registro_ans) ORDER BY",
+            query,
+        )
+        self.assertEqual(params, {"after_registro_ans": "419761"})
+
+    def test_keyset_with_text_filter(self):
+        """Testa que o predicado do cursor compara a relevância antes da chave"""
+        after = {
+            "source": "db",
+            "relevancia": 0.5,
+            "data_registro_ans": None,
+            "registro_ans": "419761",
+        }
+        query, params = build_query(razao_social="vida", after=after)
+
+        relevance = f"ROUND({NAMES_MATCH}, 6)"
+        self.assertIn(
+            f" WHERE {NAMES_MATCH} AND ({relevance} < :after_relevancia"
+            f" OR ({relevance} = :after_relevancia"
+            " AND (data_registro_ans IS NULL AND registro_ans < :after_registro_ans)))"
+            " ORDER BY relevancia DESC",
+            query,
+        )
+        self.assertEqual(
+            params,
+            {"razao_social": '"vida"', "after_registro_ans": "419761", "after_relevancia": 0.5},
+        )
+
+        # a cursor of a page without text filters has no relevance to compare
+        query, params = build_query(razao_social="vida", after={**after, "relevancia": None})
+        self.assertNotIn("after_relevancia", params)
+        self.assertNotIn(":after_relevancia", query)
+
+    def test_cursor_keeps_its_source(self):
+        """Testa que o cursor guarda a busca que o criou e rejeita cursores inválidos"""
+        row = {"relevancia": 2.0, "data_registro_ans": None, "registro_ans": "419761"}
+        for source in ["db", "index"]:
+            self.assertEqual(
+                decode_cursor(encode_cursor(row, source)),
+                {**row, "source": source},
+            )
+
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor(row, "cache"))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("not a cursor")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+from scripts.reports import (
+    top_expenses,
+    top_expenses_last_quarter,
+    top_expenses_last_year,
+)
+
+
+class TestReports(unittest.TestCase):
+    def setUp(self):
+        self.cursor = MagicMock()
+        self.cursor.fetchall.return_value = (
+            {"razao_social": "A", "nome_fantasia": None, "total_despesas": 10},
+        )
+
+    def test_top_expenses_returns_rows(self):
+        """Testa que o relatório devolve as linhas em vez de imprimi-las"""
+        rows = top_expenses(self.cursor, date(2024, 1, 1), date(2024, 12, 31), limit=5)
+
+        query, params = self.cursor.execute.call_args.args
+        self.assertIn("FROM\n        despesas_agregadas a", query)
+        self.assertEqual(params["limit"], 5)
+        self.assertEqual(params["inicio"], date(2024, 1, 1))
+        self.assertEqual(rows[0]["razao_social"], "A")
+
+    def test_last_quarter_and_year_windows(self):
+        """Testa as janelas do último trimestre e do último ano carregados"""
+        top_expenses_last_quarter(self.cursor)
+        quarter_query = self.cursor.execute.call_args.args[0]
+        top_expenses_last_year(self.cursor)
+        year_query = self.cursor.execute.call_args.args[0]
+
+        self.assertIn("INTERVAL 3 MONTH", quarter_query)
+        self.assertIn("'%%Y-01-01'", year_query)
+        self.assertNotIn("LIKE", quarter_query + year_query)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import MagicMock, patch
+
+from tests.local_http_server import LocalHTTPServer
+from utils.scraper import Scraper
+
+
+class TestScraperDownloads(unittest.TestCase):
+    def setUp(self):
+        self.files = {f"file{i}.zip": os.urandom(50_000 + i) for i in range(8)}
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scraper = Scraper(MagicMock(), max_workers=4, pool_maxsize=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_dowload_files_concurrently(self):
+        """Testa o download concorrente mantendo a ordem das urls"""
+        with LocalHTTPServer(self.files, latency=0.01) as server:
+            urls = [f"{server.url}/{name}" for name in self.files]
+            paths = self.scraper.dowload_files(urls, self.tmp.name)
+
+        self.assertEqual(
+            paths, [os.path.join(self.tmp.name, name) for name in self.files]
+        )
+        for name, body in self.files.items():
+            with open(os.path.join(self.tmp.name, name), "rb") as f:
+                self.assertEqual(f.read(), body)
+
+    def test_dowload_files_reuses_pooled_connections(self):
+        """Testa que o pool limita as conexões por host e reaproveita keep-alive"""
+        with LocalHTTPServer(self.files) as server:
+            urls = [f"{server.url}/{name}" for name in self.files]
+            self.scraper.dowload_files(urls, self.tmp.name)
+
+        self.assertLessEqual(len(server.connections), 2)
+
+    def test_dowload_file_conditional_get(self):
+        """Testa que um arquivo inalterado não é baixado novamente (304)"""
+        manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        scraper = Scraper(MagicMock(), manifest_path=manifest_path)
+
+        with LocalHTTPServer(self.files) as server:
+            url = f"{server.url}/file0.zip"
+            scraper.dowload_file(url, self.tmp.name)
+            path = Scraper(MagicMock(), manifest_path=manifest_path).dowload_file(
+                url, self.tmp.name
+            )
+
+        self.assertEqual(path, os.path.join(self.tmp.name, "file0.zip"))
+        self.assertNotIn("If-None-Match", server.requests[0])
+        self.assertIn("If-None-Match", server.requests[1])
+        self.assertIn("If-Modified-Since", server.requests[1])
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), self.files["file0.zip"])
+
+    def test_dowload_file_changed_on_server(self):
+        """Testa que um arquivo alterado no servidor é baixado novamente"""
+        manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        scraper = Scraper(MagicMock(), manifest_path=manifest_path)
+
+        with LocalHTTPServer(self.files) as server:
+            url = f"{server.url}/file0.zip"
+            scraper.dowload_file(url, self.tmp.name)
+            self.files["file0.zip"] = b"new content"
+            path = scraper.dowload_file(url, self.tmp.name)
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"new content")
+        self.assertEqual(scraper.manifest.get(url)["size"], len(b"new content"))
+
+    def test_dowload_file_resumes_partial_download(self):
+        """Testa a retomada de um download interrompido com Range"""
+        body = os.urandom(1024 * 1024)
+        self.files["file0.zip"] = body
+        final_path = os.path.join(self.tmp.name, "file0.zip")
+
+        with LocalHTTPServer(self.files) as server:
+            url = f"{server.url}/file0.zip"
+            server.fail_after = 600_000
+            self.assertIsNone(self.scraper.dowload_file(url, self.tmp.name))
+            self.assertFalse(os.path.exists(final_path))
+            partial_size = os.path.getsize(f"{final_path}.part")
+            self.assertGreater(partial_size, 0)
+
+            server.fail_after = None
+            path = self.scraper.dowload_file(
+                url, self.tmp.name, sha256=hashlib.sha256(body).hexdigest()
+            )
+
+        self.assertEqual(server.requests[-1]["Range"], f"bytes={partial_size}-")
+        self.assertEqual(path, final_path)
+        self.assertFalse(os.path.exists(f"{final_path}.part"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), body)
+
+    def test_dowload_file_checksum_mismatch(self):
+        """Testa que um arquivo com hash divergente não é promovido"""
+        with LocalHTTPServer(self.files) as server:
+            path = self.scraper.dowload_file(
+                f"{server.url}/file0.zip", self.tmp.name, sha256="0" * 64
+            )
+
+        self.assertIsNone(path)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "file0.zip")))
+
+    def test_dowload_files_verifies_expected_sha256(self):
+        """Testa que os hashes esperados de dowload_files são conferidos por url"""
+        with LocalHTTPServer(self.files) as server:
+            urls = [f"{server.url}/{name}" for name in ["file0.zip", "file1.zip"]]
+            sha256s = {
+                urls[0]: hashlib.sha256(self.files["file0.zip"]).hexdigest(),
+                urls[1]: "0" * 64,
+            }
+            paths = self.scraper.dowload_files(urls, self.tmp.name, sha256s=sha256s)
+
+        self.assertEqual(paths, [os.path.join(self.tmp.name, "file0.zip"), None])
+
+    def test_dowload_file_replaces_corrupted_copy(self):
+        """Testa que uma cópia local diferente do hash do manifesto é baixada de novo"""
+        manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        scraper = Scraper(MagicMock(), manifest_path=manifest_path)
+
+        with LocalHTTPServer(self.files) as server:
+            url = f"{server.url}/file0.zip"
+            path = scraper.dowload_file(url, self.tmp.name)
+            # same size, so only the recorded sha256 tells it changed
+            with open(path, "r+b") as f:
+                f.write(b"corrupted")
+            scraper.dowload_file(url, self.tmp.name)
+
+        self.assertNotIn("If-None-Match", server.requests[1])
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), self.files["file0.zip"])
+
+    def test_scraper_stages_do_not_share_a_manifest(self):
+        """Testa que os scrapers, que rodam ao mesmo tempo no pipeline, têm manifestos próprios"""
+        from scripts import scraper_gov_docs, scraper_operators_docs
+
+        self.assertNotEqual(
+            scraper_gov_docs.scraper.manifest.path,
+            scraper_operators_docs.scraper.manifest.path,
+        )
+
+    def test_unmodified_zip_is_not_extracted_again(self):
+        """Testa que um zip inalterado (304) não é descompactado de novo"""
+        from scripts import scraper_operators_docs
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zip:
+            zip.writestr("1T2024.csv", "REG_ANS;VL_SALDO_FINAL\n419761;1,5\n")
+        files = {
+            "demonstracoes/": b'<a href="1T2024.zip">1T2024.zip</a>',
+            "demonstracoes/1T2024.zip": archive.getvalue(),
+        }
+        scraper = Scraper(
+            MagicMock(), manifest_path=os.path.join(self.tmp.name, "manifest.json")
+        )
+        csv_path = os.path.join(self.tmp.name, "1T2024.csv")
+
+        with (
+            LocalHTTPServer(files) as server,
+            patch.object(scraper_operators_docs, "scraper", scraper),
+            patch.object(
+                scraper_operators_docs, "unzip_file", wraps=scraper_operators_docs.unzip_file
+            ) as unzip,
+        ):
+            urls = [f"{server.url}/demonstracoes/"]
+            self.assertTrue(scraper_operators_docs.main(urls, self.tmp.name, unzip=True))
+            self.assertTrue(scraper_operators_docs.main(urls, self.tmp.name, unzip=True))
+            self.assertEqual(unzip.call_count, 1)
+
+            # the extracted csv was removed, the zip is extracted again
+            os.remove(csv_path)
+            self.assertTrue(scraper_operators_docs.main(urls, self.tmp.name, unzip=True))
+            self.assertEqual(unzip.call_count, 2)
+
+        self.assertTrue(os.path.exists(csv_path))
+
+    def test_chunk_size_grows_with_file_size(self):
+        """Testa o tamanho adaptativo dos blocos de escrita"""
+        self.assertEqual(Scraper._chunk_size(None), 64 * 1024)
+        self.assertEqual(Scraper._chunk_size(1024), 64 * 1024)
+        self.assertEqual(Scraper._chunk_size(512 * 1024 * 1024), 2 * 1024 * 1024)
+        self.assertEqual(Scraper._chunk_size(10 * 1024**3), 4 * 1024 * 1024)
+
+    def test_dowload_file_not_found(self):
+        """Testa que um 404 não gera arquivo local"""
+        with LocalHTTPServer(self.files) as server:
+            path = self.scraper.dowload_file(f"{server.url}/missing.zip", self.tmp.name)
+
+        self.assertIsNone(path)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "missing.zip")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from app.backend.core.search_cache import SearchCache
+
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+
+    async def compute(self, value="resultado", delay=0.0):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return value
+
+    def test_lru_and_ttl(self):
+        """Testa o limite de entradas e a expiração das respostas"""
+
+        async def run():
+            cache = SearchCache(maxsize=2, ttl=60)
+            for key in ["a", "b", "a", "c", "a", "b"]:
+                await cache.get(key, self.compute)
+            with patch("app.backend.core.search_cache.time.monotonic", return_value=1e12):
+                await cache.get("a", self.compute)
+            return cache.stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual(self.calls, 5)
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 5, 2))
+
+    def test_single_flight(self):
+        """Testa que requisições iguais simultâneas fazem uma única consulta"""
+
+        async def run():
+            cache = SearchCache()
+            results = await asyncio.gather(
+                *(cache.get("a", lambda: self.compute(delay=0.05)) for _ in range(20))
+            )
+            return cache, results
+
+        cache, results = asyncio.run(run())
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(set(results), {"resultado"})
+        self.assertEqual(cache.stats()["coalesced"], 19)
+
+    def test_errors_are_not_cached(self):
+        """Testa que um erro chega a todos que esperam e não fica no cache"""
+
+        async def fail():
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("db fora do ar")
+
+        async def run():
+            cache = SearchCache()
+            results = await asyncio.gather(
+                cache.get("a", fail), cache.get("a", fail), return_exceptions=True
+            )
+            return results, await cache.get("a", self.compute)
+
+        results, value = asyncio.run(run())
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual((self.calls, value), (2, "resultado"))
+
+    def test_new_load_invalidates(self):
+        """Testa a invalidação quando a versão dos dados carregados muda"""
+
+        async def run():
+            cache = SearchCache()
+            self.assertFalse(cache.set_version(("2025-01-01", 5)))
+            await cache.get("a", self.compute)
+            self.assertFalse(cache.set_version(("2025-01-01", 5)))
+            await cache.get("a", self.compute)
+
+            # a load during a query: its response is not stored
+            pending = asyncio.create_task(cache.get("b", lambda: self.compute("antigo", 0.05)))
+            await asyncio.sleep(0)
+            self.assertTrue(cache.set_version(("2025-01-02", 5)))
+            self.assertEqual(await pending, "antigo")
+            self.assertEqual(cache.stats()["entries"], 0)
+            return await cache.get("b", self.compute)
+
+        self.assertEqual(asyncio.run(run()), "resultado")
+        self.assertEqual(self.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
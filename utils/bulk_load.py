@@ -0,0 +1,166 @@
+import csv
+import os
+import tempfile
+from itertools import islice
+from typing import Callable
+
+import pandas as pd
+from pymysql.cursors import Cursor
+
+
+def on_duplicate_key_update(columns: list[str]) -> str:
+    """
+    Upsert clause updating every column with the inserted values. VALUES()
+    is used instead of a row alias because pymysql only batches executemany
+    statements whose suffix starts with ON DUPLICATE
+
+    Args:
+        columns (list[str]): column names
+
+    Returns:
+        str: ON DUPLICATE KEY UPDATE clause
+    """
+    assignments = ", ".join(f"{column} = VALUES({column})" for column in columns)
+    return f" ON DUPLICATE KEY UPDATE {assignments}"
+
+
+def to_db_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Values the db driver can send: datetime columns as dates and missing
+    values as None. Only the columns that need it are converted
+
+    Args:
+        df (pd.DataFrame): DataFrame
+
+    Returns:
+        pd.DataFrame: DataFrame of python values
+    """
+    converted = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.date
+        if values.isna().any():
+            values = values.astype(object).where(values.notna(), None)
+        converted[column] = values
+    return pd.DataFrame(converted, index=df.index)
+
+
+def insert_executemany(
+    cursor: Cursor, df: pd.DataFrame, table_name: str, upsert: bool = False
+) -> None:
+    """
+    Insert the rows with a single cursor.executemany
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        df (pd.DataFrame): DataFrame
+        table_name (str): table name in db
+        upsert (bool, optional): update rows whose key already exists. Defaults to False.
+    """
+    columns = ", ".join(df.columns)
+    placeholders = ", ".join(["%s"] * len(df.columns))
+    query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+    if upsert:
+        query += on_duplicate_key_update(list(df.columns))
+
+    data = [tuple(x) for x in to_db_values(df).to_numpy(dtype=object)]
+    cursor.executemany(query, data)
+
+
+def insert_batches(
+    cursor: Cursor,
+    df: pd.DataFrame,
+    table_name: str,
+    upsert: bool = False,
+    batch_size: int = 5000,
+) -> None:
+    """
+    Insert the rows with multi-row INSERT statements of batch_size rows
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        df (pd.DataFrame): DataFrame
+        table_name (str): table name in db
+        upsert (bool, optional): update rows whose key already exists. Defaults to False.
+        batch_size (int, optional): rows per INSERT statement. Defaults to 5000.
+    """
+    columns = ", ".join(df.columns)
+    row_placeholder = f"({', '.join(['%s'] * len(df.columns))})"
+    suffix = on_duplicate_key_update(list(df.columns)) if upsert else ""
+
+    rows = to_db_values(df).itertuples(index=False, name=None)
+    while batch := list(islice(rows, batch_size)):
+        query = (
+            f"INSERT INTO {table_name} ({columns}) VALUES "
+            f"{', '.join([row_placeholder] * len(batch))}{suffix}"
+        )
+        cursor.execute(query, [value for row in batch for value in row])
+
+
+def load_data_infile(
+    cursor: Cursor, df: pd.DataFrame, table_name: str, upsert: bool = False
+) -> None:
+    """
+    Stream the rows to MySQL with LOAD DATA LOCAL INFILE. The connection must
+    be opened with local_infile=True and the server must allow local_infile.
+    An upsert loads into a temporary table and merges it, since LOAD DATA
+    REPLACE deletes the old rows and breaks foreign keys pointing to them
+
+    Args:
+        cursor (Cursor): an instance of courses from the db connection lib
+        df (pd.DataFrame): DataFrame
+        table_name (str): table name in db
+        upsert (bool, optional): update rows whose key already exists. Defaults to False.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".tsv", encoding="utf-8", newline="", delete=False
+    ) as f:
+        # MySQL default format: tab separated, backslash escaped, \n terminated
+        df.to_csv(
+            f,
+            sep="\t",
+            na_rep="",
+            date_format="%Y-%m-%d",
+            quoting=csv.QUOTE_NONE,
+            escapechar="\\",
+            header=False,
+            index=False,
+            lineterminator="\n",
+        )
+    target = f"tmp_{table_name}" if upsert else table_name
+    try:
+        if upsert:
+            # only the columns, LIKE would copy the FULLTEXT indexes and
+            # InnoDB does not allow them on temporary tables
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {target} "
+                f"SELECT {', '.join(df.columns)} FROM {table_name} LIMIT 0"
+            )
+        variables = ", ".join(f"@{column}" for column in df.columns)
+        assignments = ", ".join(
+            f"{column} = NULLIF(@{column}, '')" for column in df.columns
+        )
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {target} "
+            f"CHARACTER SET utf8mb4 ({variables}) SET {assignments}",
+            (f.name,),
+        )
+        if upsert:
+            columns = ", ".join(df.columns)
+            cursor.execute(
+                f"INSERT INTO {table_name} ({columns}) "
+                f"SELECT {columns} FROM {target}"
+                f"{on_duplicate_key_update(list(df.columns))}"
+            )
+    finally:
+        os.remove(f.name)
+        if upsert:
+            cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {target}")
+
+
+LOAD_ENGINES: dict[str, Callable[..., None]] = {
+    "executemany": insert_executemany,
+    "batch": insert_batches,
+    "load_data": load_data_infile,
+}
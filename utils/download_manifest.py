@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+
+from utils.file_handler import file_sha256
+
+
+class DownloadManifest:
+    """
+    Persistent record of downloaded files keyed by url, used to send
+    conditional requests (ETag / Last-Modified) on the next run
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): json file where the manifest is stored
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    def get(self, url: str) -> dict | None:
+        with self._lock:
+            return self._entries.get(url)
+
+    def update(self, url: str, entry: dict) -> None:
+        """
+        Store the entry of a url and persist the manifest
+
+        Args:
+            url (str): download url
+            entry (dict): etag, last_modified, size and sha256 of the file
+        """
+        with self._lock:
+            self._entries[url] = entry
+            self._save()
+
+    def conditional_headers(
+        self, url: str, local_filename: str, sha256: str | None = None
+    ) -> dict[str, str]:
+        """
+        Build the conditional GET headers for a url, only when the local
+        copy still matches what was recorded
+
+        Args:
+            url (str): download url
+            local_filename (str): path of the local copy
+            sha256 (str, optional): expected sha256 of the file. Defaults to
+            the sha256 recorded in the manifest.
+
+        Returns:
+            dict[str, str]: If-None-Match / If-Modified-Since headers
+        """
+        entry = self.get(url)
+        if not entry or not os.path.exists(local_filename):
+            return {}
+        if os.path.getsize(local_filename) != entry.get("size"):
+            return {}
+        # a local copy changed since it was downloaded must not be kept by a 304
+        expected = sha256 or entry.get("sha256")
+        if expected and file_sha256(local_filename) != expected:
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # per process, another manifest instance may be saving the same path
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -1,5 +1,8 @@
+import hashlib
 import os
 from settings import logger
+from contextlib import contextmanager
+from typing import IO, Iterator
 import zipfile
 
 log = logger(__file__)
@@ -23,7 +26,12 @@ def get_files(dir_path: str, type_files: list[str] | None = None) -> list[str]:
     return files
 
 
-def compress_file(file_dir: str, filename_zip: str, file_types: list = None) -> None:
+def compress_file(
+    file_dir: str,
+    filename_zip: str,
+    file_types: list = None,
+    file_names: list[str] | None = None,
+) -> None:
     """
     Compress files within a folder based on specified file types
 
@@ -31,6 +39,7 @@ def compress_file(file_dir: str, filename_zip: str, file_types: list = None) ->
         file_dir (str): Folder of files that will be compressed
         filename_zip (str): Zip file name
         file_types (list, optional): List of file extensions to compress (e.g., ['.txt', '.jpg']). Compress all if None.
+        file_names (list[str], optional): compress only these files of the folder. Defaults to None.
     """
     files = get_files(file_dir)
     if not files:
@@ -41,6 +50,8 @@ def compress_file(file_dir: str, filename_zip: str, file_types: list = None) ->
         files = [
             file for file in files if os.path.splitext(file)[1].lower() in file_types
         ]
+    if file_names:
+        files = [file for file in files if file in file_names]
 
     if not files:
         log.error("No files matched the specified types")
@@ -54,17 +65,99 @@ def compress_file(file_dir: str, filename_zip: str, file_types: list = None) ->
             zip.write(file, arcname=os.path.relpath(file, file_dir))
 
 
-def unzip_file(file_dir: str, output_file: str) -> None:
+def file_sha256(path: str) -> str:
+    """
+    sha256 of a file, read in blocks
+
+    Args:
+        path (str): file path
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def unzip_file(file_dir: str, output_file: str) -> bool:
     """
     Unzip file
 
     Args:
         file_dir (str): Folder of files that will be compressed
         output_file (str): destination directory
+
+    Returns:
+        bool: True when the file was unzipped
     """
     try:
         with zipfile.ZipFile(file_dir, "r") as zip:
             zip.extractall(output_file)
         log.info("File unzipped successfully")
+        return True
+    except Exception as e:
+        log.error(e)
+        return False
+
+
+def is_extracted(file_path: str, output_dir: str) -> bool:
+    """
+    Whether every file of a zip is already extracted in a directory, with
+    the size it has in the zip
+
+    Args:
+        file_path (str): zip file path
+        output_dir (str): directory the zip is extracted to
+
+    Returns:
+        bool: True when unzipping it again would write the same files
+    """
+    try:
+        with zipfile.ZipFile(file_path, "r") as zip:
+            members = [member for member in zip.infolist() if not member.is_dir()]
     except Exception as e:
         log.error(e)
+        return False
+    for member in members:
+        path = os.path.join(output_dir, member.filename)
+        if not os.path.isfile(path) or os.path.getsize(path) != member.file_size:
+            return False
+    return True
+
+
+def list_zip_members(file_path: str, type_files: list[str] | None = None) -> list[str]:
+    """
+    List the members of a zip file, without extracting them to disk
+
+    Args:
+        file_path (str): zip file path
+        type_files (list[str], optional): type of files you want to search for. Defaults to None.
+
+    Returns:
+        list[str]: member names
+    """
+    with zipfile.ZipFile(file_path, "r") as zip:
+        members = [member.filename for member in zip.infolist() if not member.is_dir()]
+    if type_files:
+        members = [member for member in members if member.split(".")[-1] in type_files]
+    return members
+
+
+@contextmanager
+def open_zip_member(file_path: str, member: str) -> Iterator[IO[bytes]]:
+    """
+    Open a member of a zip file as a binary stream
+
+    Args:
+        file_path (str): zip file path
+        member (str): member name
+
+    Yields:
+        IO[bytes]: stream of the member content
+    """
+    with zipfile.ZipFile(file_path, "r") as zip:
+        with zip.open(member) as stream:
+            yield stream
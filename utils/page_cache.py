@@ -0,0 +1,110 @@
+import gzip
+import hashlib
+import json
+import os
+
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from pdfminer.psparser import PSLiteral
+
+import pdfplumber
+
+
+class PageTableCache:
+    """
+    Content-addressed cache of the tables extracted from pdf pages. The key
+    is a digest of the page content, of its resources and of the extraction
+    settings, so an unchanged page keeps its key between revisions of the
+    same document
+    """
+
+    def __init__(self, cache_dir: str, settings: dict | None = None):
+        """
+        Args:
+            cache_dir (str): folder where the entries are stored
+            settings (dict, optional): extraction settings that change the output. Defaults to None.
+        """
+        self.cache_dir = cache_dir
+        self.settings = json.dumps(
+            {"pdfplumber": pdfplumber.__version__, **(settings or {})}, sort_keys=True
+        ).encode()
+
+    def key(self, page: pdfplumber.page.Page) -> str:
+        """
+        Digest of the page content streams, resources, page size and
+        extraction settings. The resources (fonts, ToUnicode CMaps, form
+        XObjects) change the extracted text without changing the content
+        streams, so they are hashed with every stream they reference
+
+        Args:
+            page (pdfplumber.page.Page): pdf page
+
+        Returns:
+            str: cache key
+        """
+        digest = hashlib.sha256(self.settings)
+        digest.update(repr(page.bbox).encode())
+        for stream in page.page_obj.contents:
+            digest.update(resolve1(stream).get_data())
+        _hash_object(digest, page.page_obj.resources, set())
+        return digest.hexdigest()
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> list | None:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, key: str, tables: list) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(tables, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+
+def _hash_object(digest, obj, seen: set[int]) -> None:
+    """
+    Add a pdf object to a digest, following references. Objects reached
+    twice, as a font shared by two resources or a reference cycle, are
+    hashed once
+
+    Args:
+        digest (hashlib._Hash): digest being built
+        obj: pdf object
+        seen (set[int]): ids of the referenced objects already hashed
+    """
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in seen:
+            digest.update(b"R%d" % obj.objid)
+            return
+        seen.add(obj.objid)
+        obj = resolve1(obj)
+    if isinstance(obj, PDFStream):
+        digest.update(b"stream")
+        _hash_object(digest, obj.attrs, seen)
+        digest.update(obj.get_data())
+    elif isinstance(obj, dict):
+        digest.update(b"<<")
+        for key in sorted(obj, key=str):
+            digest.update(str(key).encode())
+            _hash_object(digest, obj[key], seen)
+        digest.update(b">>")
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"[")
+        for item in obj:
+            _hash_object(digest, item, seen)
+        digest.update(b"]")
+    elif isinstance(obj, PSLiteral):
+        digest.update(b"/" + str(obj.name).encode())
+    elif isinstance(obj, bytes):
+        digest.update(b"(" + obj + b")")
+    else:
+        digest.update(repr(obj).encode())
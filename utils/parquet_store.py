@@ -0,0 +1,113 @@
+import os
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only the parquet input mode needs it
+    pa = pq = None
+
+
+def require_pyarrow() -> None:
+    if pq is None:
+        raise ImportError(
+            "pyarrow is required by the parquet input mode, install it with `uv sync --extra parquet`"
+        )
+
+
+def write_parquet(
+    chunks: Iterable[pd.DataFrame], path: str, metadata: dict[str, str] | None = None
+) -> int:
+    """
+    Write DataFrame chunks as the row groups of a zstd compressed Parquet
+    file. Datetime columns are stored as dates and the file only replaces
+    path once it is complete
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): transformed chunks with the same columns
+        path (str): output file path
+        metadata (dict[str, str], optional): key-value metadata stored in the
+        schema, see parquet_metadata. Defaults to None.
+
+    Returns:
+        int: number of rows written
+    """
+    require_pyarrow()
+    extra = {key.encode(): value.encode() for key, value in (metadata or {}).items()}
+    tmp_path = f"{path}.tmp"
+    writer = None
+    rows = 0
+    try:
+        for df in chunks:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                fields = [
+                    field.with_type(pa.date32())
+                    if pa.types.is_timestamp(field.type)
+                    else field
+                    for field in table.schema
+                ]
+                metadata = {**(table.schema.metadata or {}), **extra}
+                schema = pa.schema(fields, metadata=metadata)
+                writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+            writer.write_table(table.cast(writer.schema))
+            rows += len(df)
+        if writer is None:
+            pq.write_table(pa.table({}).replace_schema_metadata(extra), tmp_path)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return rows
+
+
+def read_parquet(
+    path: str,
+    chunksize: int | None = None,
+    columns: list[str] | None = None,
+    dtype_backend: str = "numpy",
+) -> pd.DataFrame | Iterator[pd.DataFrame]:
+    """
+    Read a Parquet file memory-mapped, only decoding the requested columns.
+    Dates are returned as datetime64, as transform_data produces them
+
+    Args:
+        path (str): file path
+        chunksize (int, optional): rows per chunk, returns an iterator of
+        DataFrames instead of a single one. Defaults to None.
+        columns (list[str], optional): columns to read. Defaults to all.
+        dtype_backend (str, optional): "numpy" or "pyarrow". Defaults to "numpy".
+
+    Returns:
+        pd.DataFrame | Iterator[pd.DataFrame]: DataFrame or chunks of it
+    """
+    require_pyarrow()
+    options = {"date_as_object": False}
+    if dtype_backend == "pyarrow":
+        options["types_mapper"] = pd.ArrowDtype
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    if chunksize is None:
+        return parquet_file.read(columns=columns).to_pandas(**options)
+    return (
+        batch.to_pandas(**options)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns)
+    )
+
+
+def parquet_metadata(path: str) -> dict[str, str]:
+    """
+    Metadata written by write_parquet, read from the footer only
+
+    Args:
+        path (str): file path
+
+    Returns:
+        dict[str, str]: key-value metadata
+    """
+    require_pyarrow()
+    metadata = pq.read_schema(path, memory_map=True).metadata or {}
+    return {
+        key.decode(): value.decode() for key, value in metadata.items() if key != b"pandas"
+    }
@@ -0,0 +1,323 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from logging import Logger
+from multiprocessing.connection import Connection, wait
+from typing import Callable
+
+from utils.file_handler import file_sha256
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class Stage:
+    """
+    Step of the pipeline, run in its own process once the stages it depends
+    on have finished
+    """
+
+    def __init__(
+        self,
+        name: str,
+        target: Callable[[], bool | None],
+        depends_on: list[str] | None = None,
+        inputs: list[str] | None = None,
+        settings: dict | None = None,
+    ):
+        """
+        Args:
+            name (str): stage name, used on the command line
+            target (Callable[[], bool | None]): function run by the stage,
+            it fails when it raises or returns False
+            depends_on (list[str], optional): stages that must finish first. Defaults to None.
+            inputs (list[str], optional): glob patterns of the files the stage
+            reads, a stage without inputs always runs. Defaults to None.
+            settings (dict, optional): settings that change the stage output,
+            part of the fingerprint. Defaults to None.
+        """
+        self.name = name
+        self.target = target
+        self.depends_on = depends_on or []
+        self.inputs = inputs or []
+        self.settings = settings or {}
+
+    def fingerprint(self) -> str | None:
+        """
+        Digest of the path, size and content of every input file and of the
+        settings. The content is hashed instead of using the modification
+        time because the scrapers extract the zips again on every run,
+        rewriting files that did not change
+
+        Returns:
+            str | None: fingerprint, None for a stage without inputs
+        """
+        if not self.inputs:
+            return None
+        digest = hashlib.sha256(
+            json.dumps(self.settings, sort_keys=True, default=str).encode()
+        )
+        for pattern in self.inputs:
+            for path in sorted(glob.glob(pattern)):
+                digest.update(
+                    f"{path}\0{os.path.getsize(path)}\0{file_sha256(path)}\n".encode()
+                )
+        return digest.hexdigest()
+
+
+def memory_status() -> dict[str, int] | None:
+    """
+    Current (VmRSS) and peak (VmHWM) resident memory of this process, from
+    /proc. Unlike ru_maxrss, VmHWM can be reset and does not carry the
+    memory of the process that forked or exec'd this one
+
+    Returns:
+        dict[str, int] | None: bytes of VmRSS and VmHWM, None outside Linux
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            lines = [line.split() for line in f if line.startswith(("VmRSS", "VmHWM"))]
+    except OSError:
+        return None
+    return {line[0].rstrip(":"): int(line[1]) * 1024 for line in lines}
+
+
+def reset_peak_memory() -> int | None:
+    """
+    Reset the peak resident memory of this process to its current size
+
+    Returns:
+        int | None: current resident memory in bytes, None if the peak
+        could not be reset
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return None
+    status = memory_status()
+    return status["VmRSS"] if status else None
+
+
+def children_peak_memory() -> int | None:
+    """
+    Peak resident memory of the largest finished child process
+
+    Returns:
+        int | None: bytes, None where the platform does not report it
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return scale * resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+def _run_stage(target: Callable[[], bool | None], conn: Connection) -> None:
+    """
+    Entry point of a stage process, reports its own result and peak memory.
+    The peak is the growth over the memory of the process when the target
+    starts, so the interpreter and the modules imported to unpickle it are
+    not counted
+
+    Args:
+        target (Callable[[], bool | None]): function run by the stage
+        conn (Connection): pipe to the pipeline process
+    """
+    start = reset_peak_memory()
+    result = {"status": "ok", "error": None}
+    try:
+        # the scripts log their own errors and return False instead of raising
+        if target() is False:
+            result = {"status": "failed", "error": "stage reported a failure"}
+    except BaseException as e:
+        result = {"status": "failed", "error": repr(e)}
+    status = memory_status()
+    peaks = [children_peak_memory()]
+    if start is not None and status:
+        peaks.append(status["VmHWM"] - start)
+    peaks = [peak for peak in peaks if peak is not None]
+    result["peak_memory"] = max(peaks) if peaks else None
+    conn.send(result)
+    conn.close()
+    if result["status"] != "ok":
+        sys.exit(1)
+
+
+class Pipeline:
+    """
+    Runs stages as a DAG: every stage whose dependencies are done starts at
+    once in its own process, so independent branches run concurrently.
+    The input fingerprint of each successful stage is saved and a stage
+    whose fingerprint did not change is skipped on the next run
+    """
+
+    def __init__(self, stages: list[Stage], state_path: str, log: Logger):
+        """
+        Args:
+            stages (list[Stage]): stages, in the order they are started when ready
+            state_path (str): json file with the fingerprints of the last runs
+            log (Logger): logger used by the pipeline
+
+        Raises:
+            ValueError: unknown dependency or dependency cycle
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.log = log
+        # a forked stage would start with the memory of this process, which
+        # has imported every script, and report it as its own
+        self.context = multiprocessing.get_context("spawn")
+
+        done: set[str] = set()
+        while len(done) < len(self.stages):
+            ready = {
+                name
+                for name, stage in self.stages.items()
+                if name not in done and set(stage.depends_on) <= done
+            }
+            if not ready:
+                missing = {
+                    dependency
+                    for stage in self.stages.values()
+                    for dependency in stage.depends_on
+                    if dependency not in self.stages
+                }
+                raise ValueError(
+                    f"Unknown stages {sorted(missing)}" if missing else "Dependency cycle"
+                )
+            done |= ready
+
+    def _load_state(self) -> dict[str, str]:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self, state: dict[str, str]) -> None:
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def run(
+        self,
+        only: list[str] | None = None,
+        force: bool = False,
+        max_parallel: int | None = None,
+    ) -> dict[str, dict]:
+        """
+        Run the pipeline
+
+        Args:
+            only (list[str], optional): run just these stages, even if their
+            inputs did not change. Their dependencies are not run. Defaults to all.
+            force (bool, optional): ignore the saved fingerprints. Defaults to False.
+            max_parallel (int, optional): stages running at the same time. Defaults to no limit.
+
+        Raises:
+            ValueError: unknown stage in only
+
+        Returns:
+            dict[str, dict]: status, seconds, peak_memory and error of each stage
+        """
+        unknown = set(only or []) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages {sorted(unknown)}")
+        selected = [name for name in self.stages if not only or name in only]
+        state = self._load_state()
+        results: dict[str, dict] = {}
+        running: dict[int, tuple] = {}
+        pending = list(selected)
+        start = time.perf_counter()
+
+        while pending or running:
+            for name in list(pending):
+                stage = self.stages[name]
+                dependencies = [d for d in stage.depends_on if d in selected]
+                if any(
+                    results.get(d, {}).get("status") in ("failed", "blocked")
+                    for d in dependencies
+                ):
+                    pending.remove(name)
+                    results[name] = {"status": "blocked", "seconds": 0.0}
+                    self.log.warning(f"Stage {name} not run, a dependency failed")
+                    continue
+                if any(d not in results for d in dependencies):
+                    continue
+                if max_parallel and len(running) >= max_parallel:
+                    break
+
+                pending.remove(name)
+                fingerprint = stage.fingerprint()
+                if not (force or only) and fingerprint and state.get(name) == fingerprint:
+                    results[name] = {"status": "skipped", "seconds": 0.0}
+                    self.log.info(f"Stage {name} skipped, inputs unchanged")
+                    continue
+
+                receiver, sender = self.context.Pipe(duplex=False)
+                process = self.context.Process(
+                    target=_run_stage, args=(stage.target, sender), name=name
+                )
+                process.start()
+                sender.close()
+                running[process.sentinel] = (
+                    name,
+                    process,
+                    receiver,
+                    time.perf_counter(),
+                    fingerprint,
+                )
+                self.log.info(f"Stage {name} started")
+
+            if not running:
+                continue
+            for sentinel in wait(list(running)):
+                name, process, receiver, stage_start, fingerprint = running.pop(sentinel)
+                process.join()
+                if receiver.poll():
+                    result = receiver.recv()
+                else:
+                    result = {
+                        "status": "failed",
+                        "error": f"exit code {process.exitcode}",
+                    }
+                receiver.close()
+                result["seconds"] = time.perf_counter() - stage_start
+                results[name] = result
+
+                if result["status"] == "ok":
+                    self.log.info(f"Stage {name} finished in {result['seconds']:.1f}s")
+                    if fingerprint:
+                        state[name] = fingerprint
+                        self._save_state(state)
+                else:
+                    self.log.error(f"Stage {name} failed: {result['error']}")
+
+        self.report(results, time.perf_counter() - start)
+        return results
+
+    def report(self, results: dict[str, dict], total: float) -> None:
+        """
+        Log the wall-clock time and peak memory of each stage
+
+        Args:
+            results (dict[str, dict]): results returned by run
+            total (float): pipeline wall-clock seconds
+        """
+        self.log.info(f"{'stage':<25} {'status':<8} {'wall (s)':>10} {'peak (MiB)':>11}")
+        for name, result in results.items():
+            memory = result.get("peak_memory")
+            memory_text = f"{memory / 2**20:.1f}" if memory is not None else "-"
+            self.log.info(
+                f"{name:<25} {result['status']:<8} {result['seconds']:>10.1f} "
+                f"{memory_text:>11}"
+            )
+        self.log.info(f"Pipeline finished in {total:.1f}s")
@@ -1,11 +1,37 @@
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup, Tag
+from concurrent.futures import ThreadPoolExecutor
+from utils.download_manifest import DownloadManifest
+import hashlib
+import json
 import re
 import os
 
 class Scraper:
-    def __init__(self, log):
+    def __init__(
+        self,
+        log,
+        max_workers: int = 4,
+        pool_maxsize: int = 4,
+        manifest_path: str | None = None,
+    ):
+        """
+        Args:
+            log (Logger): logger used by the scraper
+            max_workers (int, optional): number of concurrent downloads. Defaults to 4.
+            pool_maxsize (int, optional): maximum keep-alive connections per host. Defaults to 4.
+            manifest_path (str, optional): download manifest used for conditional GETs. Defaults to None.
+        """
         self.log = log
+        self.max_workers = max_workers
+        self.manifest = DownloadManifest(manifest_path) if manifest_path else None
+        # local paths kept by a 304 on their last download
+        self.not_modified: set[str] = set()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
     def fetch_page(self, url: str) -> str | None:
         """
@@ -18,7 +44,7 @@ class Scraper:
             str: html content
         """
         try:
-            response = requests.get(url)
+            response = self.session.get(url)
             response.raise_for_status()
             self.log.debug(response.text)
             self.log.info("Request to the government made successfully")
@@ -96,19 +122,158 @@ class Scraper:
         return []
 
 
-    def dowload_file(self, file_url: str, file_dir: str) -> None:
+    def dowload_file(
+        self, file_url: str, file_dir: str, sha256: str | None = None
+    ) -> str | None:
         """
-        Download from the provided url
+        Download from the provided url. When a manifest is configured the
+        request is conditional and an unchanged file is not downloaded again,
+        its path is then added to not_modified.
+        The body is written to a .part file that is resumed with a Range
+        request after an interrupted run and renamed once it is complete
 
         Args:
             file_url (str): download url
             file_dir (str): internal folder for storage
+            sha256 (str, optional): expected sha256 of the file. Defaults to None.
+
+        Returns:
+            str | None: path of the downloaded file, None on failure
         """
         try:
             local_filename = os.path.join(file_dir, file_url.split("/")[-1])
-            with requests.get(file_url, stream=True) as r:
-                with open(local_filename, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
+            part_filename = f"{local_filename}.part"
+            validators_filename = f"{part_filename}.json"
+            headers = {"Accept-Encoding": "identity"}
+
+            offset = 0
+            if os.path.exists(part_filename) and os.path.exists(validators_filename):
+                with open(validators_filename, "r", encoding="utf-8") as f:
+                    validator = json.load(f).get("if_range")
+                offset = os.path.getsize(part_filename)
+                if offset and validator:
+                    headers["Range"] = f"bytes={offset}-"
+                    headers["If-Range"] = validator
+                else:
+                    offset = 0
+            elif self.manifest:
+                headers.update(
+                    self.manifest.conditional_headers(file_url, local_filename, sha256)
+                )
+
+            with self.session.get(file_url, stream=True, headers=headers) as r:
+                if r.status_code == 304:
+                    self.log.info(f"Not modified, keeping {local_filename}")
+                    self.not_modified.add(local_filename)
+                    return local_filename
+                if r.status_code == 416:
+                    self.log.warning(f"Discarding unusable partial file {part_filename}")
+                    os.remove(part_filename)
+                    os.remove(validators_filename)
+                    return self.dowload_file(file_url, file_dir, sha256)
+                r.raise_for_status()
+
+                if r.status_code == 206:
+                    total = int(r.headers["Content-Range"].split("/")[-1])
+                    self.log.info(f"Resuming {local_filename} from byte {offset}")
+                else:
+                    offset = 0
+                    total = int(r.headers.get("Content-Length", 0)) or None
+                    with open(validators_filename, "w", encoding="utf-8") as f:
+                        json.dump(
+                            {
+                                "if_range": r.headers.get("ETag")
+                                or r.headers.get("Last-Modified")
+                            },
+                            f,
+                        )
+
+                digest = hashlib.sha256()
+                if offset:
+                    with open(part_filename, "rb") as f:
+                        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                            digest.update(chunk)
+
+                size = offset
+                with open(part_filename, "ab" if offset else "wb") as f:
+                    for chunk in r.iter_content(chunk_size=self._chunk_size(total)):
                         f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+
+                if total is not None and size != total:
+                    raise IOError(
+                        f"Incomplete download of {file_url}: {size} of {total} bytes"
+                    )
+                if sha256 and digest.hexdigest() != sha256:
+                    os.remove(part_filename)
+                    os.remove(validators_filename)
+                    raise IOError(f"Checksum mismatch for {file_url}")
+
+                os.replace(part_filename, local_filename)
+                os.remove(validators_filename)
+                self.not_modified.discard(local_filename)
+                if self.manifest:
+                    self.manifest.update(
+                        file_url,
+                        {
+                            "etag": r.headers.get("ETag"),
+                            "last_modified": r.headers.get("Last-Modified"),
+                            "size": size,
+                            "sha256": digest.hexdigest(),
+                        },
+                    )
+            return local_filename
         except Exception as e:
-            self.log.error(e)
\ No newline at end of file
+            self.log.error(e)
+        return None
+
+
+    @staticmethod
+    def _chunk_size(total: int | None) -> int:
+        """
+        Chunk size proportional to the file size, between 64 KiB and 4 MiB
+
+        Args:
+            total (int | None): file size in bytes, None when unknown
+
+        Returns:
+            int: chunk size in bytes
+        """
+        if not total:
+            return 64 * 1024
+        return min(max(total // 256, 64 * 1024), 4 * 1024 * 1024)
+
+
+    def dowload_files(
+        self,
+        file_urls: list[str],
+        file_dir: str,
+        max_workers: int | None = None,
+        sha256s: dict[str, str] | None = None,
+    ) -> list[str | None]:
+        """
+        Download several urls concurrently sharing the pooled session
+
+        Args:
+            file_urls (list[str]): download urls
+            file_dir (str): internal folder for storage
+            max_workers (int, optional): number of concurrent downloads. Defaults to the scraper setting.
+            sha256s (dict[str, str], optional): expected sha256 by url, see dowload_file. Defaults to None.
+
+        Returns:
+            list[str | None]: downloaded paths in the same order as file_urls
+        """
+        max_workers = max_workers or self.max_workers
+        sha256s = sha256s or {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            paths = list(
+                executor.map(
+                    lambda url: self.dowload_file(url, file_dir, sha256s.get(url)),
+                    file_urls,
+                )
+            )
+        self.log.info(
+            f"{sum(path is not None for path in paths)}/{len(file_urls)} files downloaded"
+        )
+        return paths
\ No newline at end of file